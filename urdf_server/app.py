@@ -1,6 +1,8 @@
+import os
 from application import create_app
 
-app = create_app()
-
+# 开发服务器；生产部署见 wsgi.py
+# 应用只在直接运行时创建：进程池的 spawn 子进程会以 __mp_main__ 的名义重新导入本模块
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app = create_app(os.environ.get('URDF_SERVER_CONFIG', 'config.Config'))
+    app.run(host='0.0.0.0', port=5000, debug=True)
@@ -1,5 +1,9 @@
 from flask import Flask
-from .extensions import cors
+from .extensions import (
+    cors, shared_store, package_index, urdf_cache, directory_listing, compressed_variants, mesh_lod,
+    blob_store, streaming_uploader, metadata_index, job_queue, mesh_metadata, metrics,
+    change_feed, urdf_versions
+)
 
 def create_app(config_class='config.Config'):
     app = Flask(__name__)
@@ -7,11 +11,55 @@ def create_app(config_class='config.Config'):
     
     # 初始化扩展
     cors.init_app(app)
+    metrics.init_app(app)
     
     # 确保上传目录存在
     app.config['UPLOAD_FOLDER'].mkdir(exist_ok=True)
+    app.config['CACHE_FOLDER'].mkdir(exist_ok=True)
+    
+    # 多进程部署时各 worker 共享的缓存层，须在使用它的扩展之前初始化
+    shared_store.init_app(app)
+    
+    # 加载（或首次构建）package 索引
+    package_index.init_app(app)
+    urdf_cache.init_app(app)
+    directory_listing.init_app(app)
+    compressed_variants.init_app(app)
+    mesh_lod.init_app(app)
+    blob_store.init_app(app)
+    streaming_uploader.init_app(app)
+    metadata_index.init_app(app)
+    mesh_metadata.init_app(app)
+    change_feed.init_app(app)
+    urdf_versions.init_app(app)
+    
+    # 后台任务队列：注册处理函数后重新排队上次未完成的任务，再提交启动时的同步任务
+    from .services.post_processing import register_jobs, schedule_startup_jobs
+    job_queue.init_app(app)
+    register_jobs(job_queue)
+    job_queue.resume()
+    schedule_startup_jobs()
+    
+    # 导出各缓存的命中率和任务队列状态
+    from .services.kinematics import model_cache as kinematic_models
+    from .services.urdf_model import model_cache as compiled_models
+    from .services.text_window import line_index_cache
+    from .services.collision import model_cache as collision_models, bvh_cache
+    for name, cache in (
+        ('urdf', urdf_cache), ('listing', directory_listing), ('compressed', compressed_variants),
+        ('lod', mesh_lod), ('mesh_metadata', mesh_metadata), ('kinematics', kinematic_models),
+        ('compiled_model', compiled_models), ('line_index', line_index_cache),
+        ('collision_model', collision_models), ('bvh', bvh_cache), ('shared', shared_store)
+    ):
+        metrics.register_cache(name, cache)
+    metrics.register_gauge('urdf_server_jobs', 'Background jobs by state', job_queue.counts)
     
     # 注册蓝图
-    from .blueprints import file_api
+    from .blueprints import file_api, kinematics_api, search_api, jobs_api, validation_api, metrics_api
     app.register_blueprint(file_api.bp)
+    app.register_blueprint(kinematics_api.bp)
+    app.register_blueprint(search_api.bp)
+    app.register_blueprint(jobs_api.bp)
+    app.register_blueprint(validation_api.bp)
+    app.register_blueprint(metrics_api.bp)
     return app
\ No newline at end of file
@@ -1,18 +1,36 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, make_response, Response, stream_with_context
 from werkzeug.utils import secure_filename
 from ..services.file_service import (
     handle_file_upload, 
     list_files, 
-    handle_folder_upload,
-    process_urdf_content,
-    get_resource_file
+    get_processed_urdf_cached,
+    get_resource_file,
+    collect_resource_geometry
 )
-from ..services.urdf_service import save_urdf_file
+from ..services.urdf_service import save_urdf_file, patch_urdf_file, list_urdf_versions, get_urdf_version
+from ..services.bundle_service import build_bundle_plan
+from ..services.urdf_model import get_compiled_model
+from ..services.urdf_stream import should_stream, iter_processed_urdf, iter_file_content
+from ..services.text_window import read_window
+from ..utils.file_util import file_etag
+from ..services.mesh_lod import LOD_LEVELS
+from ..services.post_processing import schedule_lod_build
+from ..services.streaming_upload import handle_streaming_folder_upload
+from ..services.chunked_upload import (
+    create_upload_session,
+    get_upload_session,
+    write_chunk,
+    commit_upload_session
+)
+from ..extensions import compressed_variants, mesh_lod, streaming_uploader, metrics, change_feed
 import os
+import logging
 from pathlib import Path
 from flask import current_app
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 bp = Blueprint('file_api', __name__, url_prefix='/api/files')
 
 @bp.route('/upload', methods=['POST'])
@@ -29,24 +47,114 @@ def upload_endpoint():
 
 @bp.route('/upload-folder', methods=['POST'])
 def upload_folder_endpoint():
-    if 'files' not in request.files:
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
         return jsonify({'error': 'No files uploaded'}), 400
     
-    files = request.files.getlist('files')
-    if not files:
-        return jsonify({'error': 'No files selected'}), 400
+    # 直接读取请求体流式解析（不能先访问 request.files，否则 Werkzeug 会先把整个请求暂存）
+    result = handle_streaming_folder_upload(
+        streaming_uploader, request.stream, boundary, request.args.get('upload_id')
+    )
+    return jsonify(result), result.get('status', 200)
+
+@bp.route('/upload-progress/<upload_id>', methods=['GET'])
+def upload_progress_endpoint(upload_id):
+    """查询文件夹上传中每个文件的进度"""
+    progress = streaming_uploader.progress.get(upload_id)
+    if progress is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(progress)
+
+@bp.route('/uploads', methods=['POST'])
+def create_upload_session_endpoint():
+    """创建分块上传会话"""
+    data = request.get_json(silent=True)
+    if not data or 'filename' not in data or 'size' not in data:
+        return jsonify({'error': 'Missing filename or size'}), 400
     
-    result = handle_folder_upload(files)
+    result = create_upload_session(
+        data['filename'], data['size'], data.get('chunk_size'), data.get('sha256')
+    )
+    return jsonify(result), result.get('status', 200)
+
+@bp.route('/uploads/<session_id>', methods=['GET'])
+def get_upload_session_endpoint(session_id):
+    """查询分块上传会话的已收到/缺失块"""
+    result = get_upload_session(session_id)
+    return jsonify(result), result.get('status', 200)
+
+@bp.route('/uploads/<session_id>/chunks/<int:index>', methods=['PUT'])
+def upload_chunk_endpoint(session_id, index):
+    """上传一个块，请求体为原始字节"""
+    result = write_chunk(session_id, index, request.stream, request.headers.get('X-Chunk-SHA256'))
+    return jsonify(result), result.get('status', 200)
+
+@bp.route('/uploads/<session_id>/commit', methods=['POST'])
+def commit_upload_session_endpoint(session_id):
+    """所有块到齐后提交文件"""
+    result = commit_upload_session(session_id)
     return jsonify(result), result.get('status', 200)
 
 @bp.route('/list', methods=['GET'])
 def list_files_endpoint():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor')
     
-    result = list_files(page, per_page)
+    result = list_files(page, per_page, cursor)
     return jsonify(result), result.get('status', 200)
 
+@bp.route('/changes', methods=['GET'])
+def list_changes_endpoint():
+    """
+    目录变更事件（代替轮询 /list）
+    ?path=目录&since=事件ID（/list 响应中的 change_id）&timeout=秒
+    Accept: text/event-stream 时以 Server-Sent Events 持续推送，否则为长轮询：
+    有新事件或超时后返回 {"events": [...], "last_id": N, "reset": false}，reset 为 true 时需要重新获取完整列表
+    """
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+    request_path = request.args.get('path', '')
+    current_path = upload_folder / request_path.lstrip('/')
+    
+    # 安全检查
+    try:
+        relative_dir = str(current_path.resolve().relative_to(upload_folder.resolve()))
+    except ValueError:
+        return jsonify({'error': 'Invalid path'}), 400
+    relative_dir = '' if relative_dir == '.' else relative_dir.replace('\\', '/')
+    
+    if not current_path.is_dir():
+        return jsonify({'error': 'Path not found'}), 404
+    if not change_feed.enabled:
+        return jsonify({'error': 'Change feed disabled'}), 404
+    
+    # EventSource 重连时通过 Last-Event-ID 头带上最后收到的事件ID
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    max_timeout = current_app.config.get('CHANGE_FEED_TIMEOUT', 25)
+    try:
+        since = change_feed.last_id if since is None else int(since)
+        timeout = max(0.0, min(float(request.args.get('timeout', max_timeout)), max_timeout))
+    except ValueError:
+        return jsonify({'error': 'since and timeout must be numbers'}), 400
+    
+    if request.accept_mimetypes.best == 'text/event-stream':
+        stream = change_feed.stream(
+            since, relative_dir,
+            heartbeat=current_app.config.get('CHANGE_FEED_HEARTBEAT', 15),
+            max_duration=current_app.config.get('CHANGE_FEED_STREAM_DURATION', 300)
+        )
+        response = Response(stream, mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    
+    change_feed.subscribe(relative_dir)
+    try:
+        events, reset, last_id = change_feed.wait(since, relative_dir, timeout)
+    finally:
+        change_feed.unsubscribe(relative_dir)
+    return jsonify({'events': events, 'last_id': last_id, 'reset': reset, 'path': relative_dir})
+
 @bp.route('/<filename>', methods=['GET'])
 def get_file(filename):
     try:
@@ -54,11 +162,12 @@ def get_file(filename):
         if not file_path.exists():
             return jsonify({'error': 'File not found', 'status': 404}), 404
         
-        return send_file(
-            file_path,
-            mimetype='application/xml',  # URDF 文件是 XML 格式
-            as_attachment=False
-        )
+        with metrics.timer('send_file'):
+            return send_file(
+                file_path,
+                mimetype='application/xml',  # URDF 文件是 XML 格式
+                as_attachment=False
+            )
     except Exception as e:
         return jsonify({'error': str(e), 'status': 500}), 500
 
@@ -78,6 +187,10 @@ def get_file_content(file_path):
         if not file_path.exists():
             return jsonify({'error': 'File not found'}), 404
         
+        # 大文件（或 ?stream=1）分块输出，不把整个文件读入内存
+        if should_stream(file_path, request.args.get('stream')):
+            return Response(stream_with_context(iter_file_content(file_path)), mimetype='application/json')
+        
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
         
@@ -88,6 +201,58 @@ def get_file_content(file_path):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/<path:file_path>/text', methods=['GET'])
+def get_file_text_window(file_path):
+    """
+    按窗口读取文件原文（不经 JSON 转义），用于大文件预览
+    ?line=N&count=M 按行读取（行号从0开始）；?offset=&length= 按字节读取
+    窗口信息放在响应头 X-Total-Bytes / X-Offset / X-Total-Lines / X-Line / X-Line-Count 中
+    """
+    try:
+        upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+        file_path = upload_folder / file_path
+        
+        # 安全检查
+        try:
+            file_path.resolve().relative_to(upload_folder.resolve())
+        except ValueError:
+            return jsonify({'error': 'Invalid file path'}), 400
+        
+        if not file_path.is_file():
+            return jsonify({'error': 'File not found'}), 404
+        
+        params = {}
+        for key in ('offset', 'length', 'line', 'count'):
+            if key in request.args:
+                try:
+                    params[key] = int(request.args[key])
+                except ValueError:
+                    return jsonify({'error': f'{key} must be an integer'}), 400
+        
+        result = read_window(
+            file_path, max_bytes=current_app.config.get('TEXT_WINDOW_MAX_BYTES', 1024 * 1024), **params
+        )
+        if result['status'] != 200:
+            return jsonify(result), result['status']
+        
+        response = Response(result['data'], mimetype='text/plain')
+        response.headers['X-Total-Bytes'] = str(result['total_bytes'])
+        response.headers['X-Offset'] = str(result['offset'])
+        if 'total_lines' in result:
+            response.headers['X-Total-Lines'] = str(result['total_lines'])
+            response.headers['X-Line'] = str(result['line'])
+            response.headers['X-Line-Count'] = str(result['count'])
+        if result.get('truncated'):
+            response.headers['X-Truncated'] = '1'
+        response.headers['Access-Control-Expose-Headers'] = (
+            'X-Total-Bytes, X-Offset, X-Total-Lines, X-Line, X-Line-Count, X-Truncated'
+        )
+        response.set_etag(f"{file_etag(file_path.stat())}-{result['offset']}-{result['length']}")
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/save', methods=['POST'])
 def save_urdf():
     try:
@@ -95,13 +260,81 @@ def save_urdf():
         if not data or 'content' not in data or 'filename' not in data:
             return jsonify({'error': 'Missing content or filename'}), 400
         
+        base_version = data.get('base_version')
+        if base_version is not None and not isinstance(base_version, int):
+            return jsonify({'error': 'base_version must be an integer'}), 400
+        
         filename = secure_filename(data['filename'])
-        result = save_urdf_file(data['content'], filename)
+        result = save_urdf_file(data['content'], filename, base_version)
         
         return jsonify(result), result.get('status', 200)
     except Exception as e:
         return jsonify({'error': str(e), 'status': 500}), 500
 
+def _resolve_versioned_urdf(file_path):
+    """
+    检查版本接口的URDF路径
+    :return: (完整路径, None) 或 (None, 错误响应)
+    """
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+    full_path = upload_folder / file_path
+    
+    # 安全检查
+    try:
+        full_path.resolve().relative_to(upload_folder.resolve())
+    except ValueError:
+        return None, (jsonify({'error': 'Invalid file path'}), 400)
+    
+    if not full_path.is_file():
+        return None, (jsonify({'error': 'File not found'}), 404)
+    
+    if not full_path.name.lower().endswith('.urdf'):
+        return None, (jsonify({'error': 'Not a URDF file'}), 400)
+    
+    return full_path, None
+
+@bp.route('/<path:file_path>/versions', methods=['GET'])
+def list_versions(file_path):
+    """列出URDF的历史版本（从新到旧）"""
+    full_path, error = _resolve_versioned_urdf(file_path)
+    if error:
+        return error
+    
+    result = list_urdf_versions(full_path)
+    return jsonify(result), result.get('status', 200)
+
+@bp.route('/<path:file_path>/versions', methods=['PATCH'])
+def patch_urdf(file_path):
+    """
+    增量保存URDF
+    请求体: {"base_version": N, "edits": [{"start": 0, "end": 10, "text": "..."}],
+             "elements": [{"tag": "link", "name": "base", "xml": "<link name=\"base\">...</link>"}]}
+    base_version 不是最新版本时返回 409 和当前版本号
+    """
+    full_path, error = _resolve_versioned_urdf(file_path)
+    if error:
+        return error
+    
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('base_version'), int):
+        return jsonify({'error': 'Missing base_version'}), 400
+    edits, elements = data.get('edits'), data.get('elements')
+    if not isinstance(edits or [], list) or not isinstance(elements or [], list) or not (edits or elements):
+        return jsonify({'error': 'edits or elements must be a non-empty list'}), 400
+    
+    result = patch_urdf_file(full_path, data['base_version'], edits, elements)
+    return jsonify(result), result.get('status', 200)
+
+@bp.route('/<path:file_path>/versions/<int:version>', methods=['GET'])
+def get_version(file_path, version):
+    """获取URDF指定版本的全文"""
+    full_path, error = _resolve_versioned_urdf(file_path)
+    if error:
+        return error
+    
+    result = get_urdf_version(full_path, version)
+    return jsonify(result), result.get('status', 200)
+
 @bp.route('/<path:file_path>/urdf', methods=['GET'])
 def get_processed_urdf(file_path):
     """获取处理后的URDF文件内容"""
@@ -121,29 +354,195 @@ def get_processed_urdf(file_path):
         if not file_path.name.lower().endswith('.urdf'):
             return jsonify({'error': 'Not a URDF file'}), 400
         
-        # 处理URDF文件
-        result = process_urdf_content(file_path)
-        return jsonify(result), result.get('status', 200)
+        lod = request.args.get('lod')
+        if lod is not None and lod not in LOD_LEVELS:
+            return jsonify({'error': f"Invalid lod, expected one of {', '.join(LOD_LEVELS)}"}), 400
+        
+        # 大文件（或 ?stream=1）用 iterparse 边解析边输出，不经过缓存
+        if should_stream(file_path, request.args.get('stream')):
+            return Response(stream_with_context(iter_processed_urdf(file_path, lod)), mimetype='application/json')
+        
+        # 处理URDF文件（命中缓存时直接复用），带 ETag 以支持 304
+        result, etag = get_processed_urdf_cached(file_path, lod)
+        if etag is None:
+            return jsonify(result), result.get('status', 200)
+        
+        # 几何信息随后台分析逐步补全，不进入缓存；已分析数量计入 ETag
+        geometry = collect_resource_geometry(result['resources'])
+        response = make_response(jsonify(dict(result, geometry=geometry)))
+        response.set_etag(f"{etag}-g{geometry['analyzed']}")
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/<path:file_path>/model', methods=['GET'])
+def get_compiled_urdf_model(file_path):
+    """
+    获取URDF的编译模型（列式的连杆/关节/几何体表），客户端无需再解析XML
+    ?format=json（默认）或 binary；Accept: application/octet-stream 时同样返回二进制
+    """
+    try:
+        upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+        file_path = upload_folder / file_path
+        
+        # 安全检查
+        try:
+            file_path.resolve().relative_to(upload_folder.resolve())
+        except ValueError:
+            return jsonify({'error': 'Invalid file path'}), 400
+            
+        if not file_path.exists():
+            return jsonify({'error': 'File not found'}), 404
+            
+        if not file_path.name.lower().endswith('.urdf'):
+            return jsonify({'error': 'Not a URDF file'}), 400
+        
+        lod = request.args.get('lod')
+        if lod is not None and lod not in LOD_LEVELS:
+            return jsonify({'error': f"Invalid lod, expected one of {', '.join(LOD_LEVELS)}"}), 400
+        
+        output_format = request.args.get('format')
+        if output_format is None:
+            best = request.accept_mimetypes.best_match(['application/json', 'application/octet-stream'])
+            output_format = 'binary' if best == 'application/octet-stream' else 'json'
+        if output_format not in ('json', 'binary'):
+            return jsonify({'error': "format must be 'json' or 'binary'"}), 400
+        
+        model, etag, error = get_compiled_model(file_path, lod)
+        if model is None:
+            return jsonify(error), error.get('status', 500)
+        
+        if output_format == 'binary':
+            response = Response(model.to_binary(), mimetype='application/octet-stream')
+        else:
+            response = make_response(jsonify(model.to_json()))
+        response.set_etag(f"{etag}-model-{output_format}")
+        response.headers['Cache-Control'] = 'no-cache'
+        response.vary.add('Accept')
+        return response.make_conditional(request)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/<path:file_path>/bundle', methods=['GET'])
+def get_urdf_bundle(file_path):
+    """一次请求获取处理后的URDF及其引用的全部mesh（流式输出，支持 Range 续传）"""
+    try:
+        upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+        file_path = upload_folder / file_path
+        
+        # 安全检查
+        try:
+            file_path.resolve().relative_to(upload_folder.resolve())
+        except ValueError:
+            return jsonify({'error': 'Invalid file path'}), 400
+            
+        if not file_path.exists():
+            return jsonify({'error': 'File not found'}), 404
+            
+        if not file_path.name.lower().endswith('.urdf'):
+            return jsonify({'error': 'Not a URDF file'}), 400
+        
+        lod = request.args.get('lod')
+        if lod is not None and lod not in LOD_LEVELS:
+            return jsonify({'error': f"Invalid lod, expected one of {', '.join(LOD_LEVELS)}"}), 400
+        
+        plan, error = build_bundle_plan(file_path, lod)
+        if plan is None:
+            return jsonify(error), error.get('status', 500)
+        
+        if request.if_none_match.contains(plan.etag):
+            response = Response(status=304)
+            response.set_etag(plan.etag)
+            return response
+        
+        # Range 请求（If-Range 与当前 ETag 不一致时返回完整内容）
+        start, stop, status = 0, plan.total_length, 200
+        byte_range = request.range
+        if_range = request.if_range
+        range_valid = (if_range.etag is None and if_range.date is None) or if_range.etag == plan.etag
+        if byte_range is not None and range_valid:
+            bounds = byte_range.range_for_length(plan.total_length)
+            if bounds is None:
+                response = Response(status=416)
+                response.headers['Content-Range'] = f"bytes */{plan.total_length}"
+                return response
+            start, stop = bounds
+            status = 206
+        
+        response = Response(
+            stream_with_context(plan.iter_range(start, stop)),
+            status=status,
+            mimetype='application/x-urdf-bundle',
+            direct_passthrough=True
+        )
+        response.content_length = stop - start
+        response.accept_ranges = 'bytes'
+        if status == 206:
+            response.headers['Content-Range'] = f"bytes {start}-{stop - 1}/{plan.total_length}"
+        response.set_etag(plan.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/resource/<path:resource_path>', methods=['GET'])
 def get_resource(resource_path):
-    """获取资源文件（mesh等）"""
+    """获取资源文件（mesh等），支持 ETag/Last-Modified 条件请求和 Range 请求"""
     result = get_resource_file(resource_path)
     
     if result.get('status') != 200:
         return jsonify({'error': result.get('error')}), result.get('status')
     
     try:
-        response = send_file(
-            result['file_path'],
-            mimetype=result['content_type'],
-            as_attachment=False
-        )
-        print(f">>> Resource sent successfully: {resource_path}")
+        # URL 中的版本号与当前文件一致时可长期缓存，否则每次都需重新校验
+        versioned = request.args.get('v') == result['etag']
+        
+        send_path, etag = result['file_path'], result['etag']
+        st = os.stat(result['file_path'])
+        variant_path, encoding, compressible = None, None, False
+        
+        # 请求了简化级别（?lod=low|medium）时发送预先生成的LOD文件
+        lod = request.args.get('lod')
+        lod_path = None
+        if lod and lod != 'full':
+            lod_path, ready = mesh_lod.lookup(result['file_path'], st, lod)
+            if not ready:
+                # 简化文件在后台生成，先发送原文件；生成之前的响应不能按版本号长期缓存
+                schedule_lod_build(resource_path)
+                versioned = False
+        if lod_path is not None:
+            send_path, etag = lod_path, f"{result['etag']}.lod-{lod}"
+        else:
+            # 根据 Accept-Encoding 选择预压缩版本，不在请求中实时压缩
+            compressible = compressed_variants.is_compressible(result['file_path'], result['size'])
+            variant_path, encoding = compressed_variants.get_or_build(
+                result['file_path'], st, request.accept_encodings
+            )
+            if variant_path is not None:
+                send_path, etag = variant_path, f"{result['etag']}.{encoding}"
+        
+        # 只计入打开文件和处理条件请求的时间，文件内容由 WSGI 服务器在视图返回后发送
+        with metrics.timer('send_file'):
+            response = send_file(
+                send_path,
+                mimetype=result['content_type'],
+                as_attachment=False,
+                conditional=True,
+                etag=etag,
+                last_modified=result['last_modified'],
+                max_age=current_app.config.get('RESOURCE_MAX_AGE', 31536000) if versioned else None
+            )
+        if variant_path is not None:
+            response.headers['Content-Encoding'] = encoding
+        if compressible:
+            response.vary.add('Accept-Encoding')
+        if versioned:
+            response.cache_control.immutable = True
+        logger.debug("Resource sent: %s (%s)", resource_path, response.status_code)
         return response
     except Exception as e:
-        print(f">>> Failed to send resource: {str(e)}")
+        logger.warning("Failed to send resource %s: %s", resource_path, e)
         return jsonify({'error': str(e)}), 500
\ No newline at end of file
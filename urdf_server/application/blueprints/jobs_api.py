@@ -0,0 +1,24 @@
+from flask import Blueprint, request, jsonify
+from ..extensions import job_queue
+
+bp = Blueprint('jobs_api', __name__, url_prefix='/api/jobs')
+
+@bp.route('', methods=['GET'])
+def list_jobs():
+    """最近的后台任务，?status=queued|running|done|failed 过滤"""
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    return jsonify({
+        'jobs': job_queue.list(request.args.get('status'), limit),
+        'counts': job_queue.counts()
+    })
+
+@bp.route('/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询单个任务的状态和进度"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
\ No newline at end of file
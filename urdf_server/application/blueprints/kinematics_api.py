@@ -0,0 +1,96 @@
+from flask import Blueprint, request, jsonify, current_app
+from pathlib import Path
+from ..services.kinematics import batch_forward_kinematics
+from ..services.collision import check_collisions
+
+bp = Blueprint('kinematics_api', __name__, url_prefix='/api/kinematics')
+
+def _resolve_urdf(file_path):
+    """
+    解析并检查上传目录中的URDF路径
+    :return: (完整路径, None) 或 (None, 错误响应)
+    """
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+    full_path = upload_folder / file_path
+    
+    # 安全检查
+    try:
+        full_path.resolve().relative_to(upload_folder.resolve())
+    except ValueError:
+        return None, (jsonify({'error': 'Invalid file path'}), 400)
+    
+    if not full_path.is_file():
+        return None, (jsonify({'error': 'File not found'}), 404)
+    
+    if not full_path.name.lower().endswith('.urdf'):
+        return None, (jsonify({'error': 'Not a URDF file'}), 400)
+    
+    return full_path, None
+
+@bp.route('/<path:file_path>/fk', methods=['POST'])
+def forward_kinematics(file_path):
+    """
+    批量正运动学
+    请求体: {"configurations": [[q1, q2, ...], ...], "joint_names": [...], "links": [...], "format": "xyzquat|matrix"}
+    """
+    full_path, error = _resolve_urdf(file_path)
+    if error:
+        return error
+    
+    data = request.get_json(silent=True)
+    if not data or 'configurations' not in data:
+        return jsonify({'error': 'Missing configurations'}), 400
+    
+    configurations = data['configurations']
+    max_batch = current_app.config.get('FK_MAX_CONFIGURATIONS', 10000)
+    if not isinstance(configurations, list) or len(configurations) > max_batch:
+        return jsonify({'error': f'configurations must be a list of at most {max_batch} joint vectors'}), 400
+    
+    try:
+        result = batch_forward_kinematics(
+            full_path,
+            configurations,
+            joint_names=data.get('joint_names'),
+            links=data.get('links'),
+            pose_format=data.get('format', 'xyzquat')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result), result.get('status', 200)
+
+@bp.route('/<path:file_path>/collisions', methods=['POST'])
+def collisions(file_path):
+    """
+    批量自碰撞/间隙检测
+    请求体: {"configurations": [[q1, q2, ...], ...], "joint_names": [...], "distance": false,
+             "max_distance": 0.05, "ignore": [["link_a", "link_b"], ...], "geometry": "collision|visual"}
+    """
+    full_path, error = _resolve_urdf(file_path)
+    if error:
+        return error
+    
+    data = request.get_json(silent=True)
+    if not data or 'configurations' not in data:
+        return jsonify({'error': 'Missing configurations'}), 400
+    
+    configurations = data['configurations']
+    max_batch = current_app.config.get('COLLISION_MAX_CONFIGURATIONS', 1000)
+    if not isinstance(configurations, list) or len(configurations) > max_batch:
+        return jsonify({'error': f'configurations must be a list of at most {max_batch} joint vectors'}), 400
+    
+    try:
+        max_distance = float(data.get('max_distance', current_app.config.get('COLLISION_MAX_DISTANCE', 0.05)))
+        if max_distance < 0:
+            raise ValueError('max_distance must be non-negative')
+        result = check_collisions(
+            full_path,
+            configurations,
+            joint_names=data.get('joint_names'),
+            distance=bool(data.get('distance', False)),
+            max_distance=max_distance,
+            ignore=data.get('ignore'),
+            source=data.get('geometry', 'collision')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result), result.get('status', 200)
\ No newline at end of file
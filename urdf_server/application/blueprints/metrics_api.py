@@ -0,0 +1,11 @@
+from flask import Blueprint, Response, abort
+from ..extensions import metrics
+
+bp = Blueprint('metrics_api', __name__)
+
+@bp.route('/metrics', methods=['GET'])
+def export_metrics():
+    """Prometheus 文本格式的运行指标"""
+    if not metrics.enabled:
+        abort(404)
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
\ No newline at end of file
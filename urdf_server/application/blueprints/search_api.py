@@ -0,0 +1,55 @@
+import time
+from flask import Blueprint, request, jsonify, current_app
+from ..extensions import metadata_index
+
+bp = Blueprint('search_api', __name__, url_prefix='/api/search')
+
+SEARCH_FIELDS = ('q', 'robot', 'link', 'joint', 'joint_type', 'mesh')
+
+@bp.route('', methods=['GET'])
+def search_files():
+    """
+    检索所有已上传的URDF
+    ?q= 全文检索（机器人名/连杆/关节/mesh，前缀匹配）
+    ?robot= / ?mesh= 按字段全文检索；?link= / ?joint= / ?joint_type= 精确匹配
+    ?limit= / ?offset= 分页
+    """
+    max_limit = current_app.config.get('LIST_MAX_PER_PAGE', 1000)
+    try:
+        limit = int(request.args.get('limit', 50))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    if not 1 <= limit <= max_limit or offset < 0:
+        return jsonify({'error': f'limit must be between 1 and {max_limit}, offset must be >= 0'}), 400
+    
+    filters = {key: request.args.get(key) for key in SEARCH_FIELDS if request.args.get(key)}
+    if not filters:
+        return jsonify({'error': f"At least one of {', '.join(SEARCH_FIELDS)} is required"}), 400
+    
+    started = time.perf_counter()
+    results, total = metadata_index.search(
+        text=filters.get('q'),
+        robot=filters.get('robot'),
+        link=filters.get('link'),
+        joint=filters.get('joint'),
+        joint_type=filters.get('joint_type'),
+        mesh=filters.get('mesh'),
+        limit=limit,
+        offset=offset
+    )
+    return jsonify({
+        'results': results,
+        'total': total,
+        'limit': limit,
+        'offset': offset,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+    })
+
+@bp.route('/files/<path:file_path>', methods=['GET'])
+def describe_file(file_path):
+    """获取单个URDF的索引记录（连杆、关节类型与限位、引用的mesh）"""
+    record = metadata_index.describe(file_path)
+    if record is None:
+        return jsonify({'error': 'File not indexed'}), 404
+    return jsonify(record)
\ No newline at end of file
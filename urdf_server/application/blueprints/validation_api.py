@@ -0,0 +1,84 @@
+import sys
+import json
+import click
+from pathlib import Path
+from flask import Blueprint, request, jsonify, current_app, Response
+from ..extensions import package_index, job_queue
+from ..services.urdf_validation import iter_validation_reports
+
+# cli_group=None：命令直接注册为 `flask validate`
+bp = Blueprint('validation_api', __name__, url_prefix='/api/validate', cli_group=None)
+
+def _validation_target(relative_dir):
+    """
+    :return: (上传目录, 规范化的相对路径)，路径越界时返回 (上传目录, None)
+    """
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+    target = (upload_folder / relative_dir).resolve()
+    try:
+        relative = target.relative_to(upload_folder.resolve())
+    except ValueError:
+        return upload_folder, None
+    relative = str(relative).replace('\\', '/')
+    return upload_folder, '' if relative == '.' else relative
+
+@bp.route('', methods=['GET'])
+def validate_urdfs():
+    """
+    并行校验 ?path= 下的所有URDF（省略时为整个上传目录）
+    以 NDJSON 流式返回：每行一个文件的报告，最后一行为汇总 {"summary": true, ...}
+    """
+    upload_folder, relative_dir = _validation_target(request.args.get('path', ''))
+    if relative_dir is None:
+        return jsonify({'error': 'Invalid path'}), 400
+    if not (upload_folder / relative_dir).exists():
+        return jsonify({'error': 'Path not found'}), 404
+    
+    reports = iter_validation_reports(
+        job_queue.cpu_executor(), upload_folder, package_index.snapshot(), relative_dir,
+        max_in_flight=job_queue.cpu_workers * 4
+    )
+    return Response(
+        (json.dumps(report, ensure_ascii=False) + '\n' for report in reports),
+        mimetype='application/x-ndjson'
+    )
+
+@bp.cli.command('validate')
+@click.argument('path', default='')
+@click.option('--workers', type=int, default=None, help='校验进程数，默认为 JOB_CPU_WORKERS')
+@click.option('--json', 'as_json', is_flag=True, help='逐行输出 JSON 报告')
+@click.option('--errors-only', is_flag=True, help='只输出有错误的文件')
+def validate_command(path, workers, as_json, errors_only):
+    """校验上传目录中 PATH 下的所有URDF，存在无效文件时退出码为1"""
+    upload_folder, relative_dir = _validation_target(path)
+    if relative_dir is None or not (upload_folder / relative_dir).exists():
+        raise click.BadParameter(f"'{path}' is not inside the upload folder", param_hint='PATH')
+    
+    if workers:
+        # 命令行进程中的进程池尚未创建，按参数决定大小
+        job_queue.cpu_workers = workers
+    summary = None
+    for report in iter_validation_reports(
+        job_queue.cpu_executor(), upload_folder, package_index.snapshot(), relative_dir,
+        max_in_flight=job_queue.cpu_workers * 4
+    ):
+        if report.get('summary'):
+            summary = report
+            continue
+        if errors_only and report['valid']:
+            continue
+        if as_json:
+            click.echo(json.dumps(report, ensure_ascii=False))
+            continue
+        click.echo(f"{'OK  ' if report['valid'] else 'FAIL'} {report['path']}")
+        for error in report['errors']:
+            click.echo(f"     [{error['check']}] {error['message']}")
+    
+    if as_json:
+        click.echo(json.dumps(summary))
+    else:
+        click.echo(
+            f"{summary['files']} files, {summary['valid']} valid, {summary['invalid']} invalid "
+            f"({summary['elapsed_ms'] / 1000:.2f}s)"
+        )
+    sys.exit(1 if summary['invalid'] else 0)
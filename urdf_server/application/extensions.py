@@ -1,4 +1,32 @@
 from flask_cors import CORS
+from .services.shared_store import SharedStore
+from .services.package_index import PackageIndex
+from .services.urdf_cache import UrdfCache
+from .services.directory_listing import DirectoryListingCache
+from .services.compressed_variants import CompressedVariantStore
+from .services.mesh_lod import MeshLodStore
+from .services.blob_store import BlobStore
+from .services.upload_progress import StreamingUploader
+from .services.metadata_index import MetadataIndex
+from .services.job_queue import JobQueue
+from .services.mesh_metadata import MeshMetadataStore
+from .services.metrics import Metrics
+from .services.change_feed import ChangeFeed
+from .services.urdf_versions import UrdfVersionStore
 
 # 解耦扩展初始化
-cors = CORS()
\ No newline at end of file
+cors = CORS()
+shared_store = SharedStore()
+package_index = PackageIndex()
+urdf_cache = UrdfCache()
+directory_listing = DirectoryListingCache()
+compressed_variants = CompressedVariantStore()
+mesh_lod = MeshLodStore()
+blob_store = BlobStore()
+streaming_uploader = StreamingUploader()
+metadata_index = MetadataIndex()
+job_queue = JobQueue()
+mesh_metadata = MeshMetadataStore()
+metrics = Metrics()
+change_feed = ChangeFeed()
+urdf_versions = UrdfVersionStore()
\ No newline at end of file
@@ -0,0 +1,344 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    """
+    内容寻址的文件存储：每份内容按 sha256 只保存一次（blobs/ab/abcdef...），
+    上传目录中的逻辑路径是指向 blob 的硬链接（跨文件系统等无法硬链接时退化为复制），
+    清单表记录 逻辑路径 -> sha256，重复上传只产生元数据写入
+
+    注意：逻辑文件与 blob 共享 inode，写入必须经由本类（写临时文件再替换），不能原地修改
+    被覆盖、删除或在外部修改过的逻辑文件不再引用原来的 blob，由后台任务定期回收（collect_garbage）
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.root = None
+        self.folder = None
+        self.manifest_file = None
+        self.gc_interval = 24 * 3600
+        self.gc_grace = 3600
+        self._local = threading.local()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('BLOB_STORE_ENABLED', True)
+        self.root = Path(app.config['UPLOAD_FOLDER'])
+        self.folder = Path(app.config['BLOB_FOLDER'])
+        self.manifest_file = Path(app.config['BLOB_MANIFEST_FILE'])
+        self.gc_interval = app.config.get('BLOB_GC_INTERVAL', self.gc_interval)
+        self.gc_grace = app.config.get('BLOB_GC_GRACE', self.gc_grace)
+        if self.enabled:
+            (self.folder / 'tmp').mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS files ('
+                    'path TEXT PRIMARY KEY, sha256 TEXT NOT NULL, size INTEGER NOT NULL, '
+                    'ino INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256)')
+                # blob 最近一次写入或复用的时间，回收宽限期以此为准（不能修改 blob 的 mtime：逻辑文件与其共享 inode）
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS blobs (sha256 TEXT PRIMARY KEY, last_referenced REAL NOT NULL)'
+                )
+        app.extensions['blob_store'] = self
+
+    def _connect(self):
+        # sqlite 连接不能跨线程共享，每个线程各自持有一个连接
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.path != self.manifest_file:
+            conn = sqlite3.connect(self.manifest_file, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn, self._local.path = conn, self.manifest_file
+        return conn
+
+    def blob_path(self, digest):
+        return self.folder / digest[:2] / digest
+
+    def _relative(self, dest_path):
+        return str(Path(dest_path).relative_to(self.root)).replace('\\', '/')
+
+    def open_writer(self, dest_path):
+        """
+        打开一个增量写入器：数据边到达边写入临时文件并计算哈希，commit 时链接到 dest_path
+        未启用内容寻址存储时退化为 写临时文件 -> 替换目标文件
+        """
+        if self.enabled:
+            return BlobWriter(self)
+        return PlainFileWriter(dest_path)
+
+    def store_stream(self, stream, dest_path):
+        """
+        边读边计算哈希地写入上传内容，并把 dest_path 链接到对应的 blob
+        :param stream: 可读的二进制流（如 FileStorage.stream）
+        :param dest_path: 上传目录中的目标路径
+        :return: 内容的 sha256
+        """
+        writer = self.open_writer(dest_path)
+        try:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit(dest_path)
+
+    def store_bytes(self, data, dest_path):
+        """写入内存中的内容（如编辑器保存的URDF文本）"""
+        digest = hashlib.sha256(data).hexdigest()
+        if self.blob_path(digest).exists():
+            self._mark_referenced(digest)
+        else:
+            tmp_fd, tmp_name = _mkstemp(self.folder / 'tmp')
+            try:
+                with os.fdopen(tmp_fd, 'wb') as f:
+                    f.write(data)
+                self._commit_blob(tmp_name, digest)
+            except BaseException:
+                _unlink(tmp_name)
+                raise
+        self._link(digest, dest_path)
+        return digest
+
+    def adopt_file(self, path, digest, dest_path):
+        """
+        把已经写好的文件收入存储并链接到 dest_path（与 blob 目录不在同一文件系统上时复制）
+        :param digest: 文件内容的 sha256
+        """
+        self._commit_blob(path, digest)
+        self._link(digest, dest_path)
+        return digest
+
+    def _commit_blob(self, tmp_name, digest):
+        blob = self.blob_path(digest)
+        self._mark_referenced(digest)
+        if blob.exists():
+            # 内容已存在：丢弃临时文件，只需写元数据
+            _unlink(tmp_name)
+            return
+        blob.parent.mkdir(exist_ok=True)
+        move_file(tmp_name, blob, self.folder / 'tmp')
+
+    def _mark_referenced(self, digest):
+        """记录 blob 的引用时间：链接完成前（gc_grace 秒内）不会被回收"""
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO blobs (sha256, last_referenced) VALUES (?, ?)', (digest, time.time())
+            )
+
+    def _link(self, digest, dest_path):
+        """原子地把 dest_path 替换为指向 blob 的硬链接并记录清单"""
+        dest_path = Path(dest_path)
+        blob = self.blob_path(digest)
+        tmp_link = dest_path.with_name(f".{dest_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            try:
+                os.link(blob, tmp_link)
+            except OSError:
+                shutil.copyfile(blob, tmp_link)
+            os.replace(tmp_link, dest_path)
+        except BaseException:
+            _unlink(tmp_link)
+            raise
+
+        st = dest_path.stat()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO files (path, sha256, size, ino, mtime_ns) VALUES (?, ?, ?, ?, ?)',
+                (self._relative(dest_path), digest, st.st_size, st.st_ino, st.st_mtime_ns)
+            )
+
+    def digest_for(self, full_path, st):
+        """
+        返回逻辑文件的 sha256；文件在记录之后被外部修改过时返回None
+        :param st: 文件当前的 os.stat 结果
+        """
+        if not self.enabled:
+            return None
+        try:
+            relative_path = self._relative(full_path)
+        except ValueError:
+            return None
+        row = self._connect().execute(
+            'SELECT sha256, size, ino, mtime_ns FROM files WHERE path = ?', (relative_path,)
+        ).fetchone()
+        if row is None or (row[1], row[2], row[3]) != (st.st_size, st.st_ino, st.st_mtime_ns):
+            return None
+        return row[0]
+
+    def _gc_marker(self):
+        return self.folder / '.last_gc'
+
+    def gc_due(self):
+        """距离上次回收（任一进程）超过 gc_interval 秒"""
+        if not self.enabled or not self.gc_interval:
+            return False
+        try:
+            return time.time() - self._gc_marker().stat().st_mtime > self.gc_interval
+        except OSError:
+            return True
+
+    def prune_manifest(self):
+        """
+        删除已失效的清单记录：逻辑文件已被删除，或在记录之后被外部替换/修改（不再链接到原 blob）
+        :return: 删除的记录数
+        """
+        conn = self._connect()
+        stale = []
+        for path, size, ino, mtime_ns in conn.execute('SELECT path, size, ino, mtime_ns FROM files').fetchall():
+            try:
+                st = os.stat(self.root / path)
+            except OSError:
+                stale.append((path, size, ino, mtime_ns))
+                continue
+            if (st.st_size, st.st_ino, st.st_mtime_ns) != (size, ino, mtime_ns):
+                stale.append((path, size, ino, mtime_ns))
+        # 只删除与读取时一致的记录，期间重新写入的路径保留
+        with conn:
+            conn.executemany(
+                'DELETE FROM files WHERE path = ? AND size = ? AND ino = ? AND mtime_ns = ?', stale
+            )
+        return len(stale)
+
+    def collect_garbage(self):
+        """
+        先清理失效的清单记录，再删除不再被任何逻辑文件引用的 blob（硬链接计数为1，且不在清单中）；
+        最近 gc_grace 秒内写入或复用的 blob（blobs 表中的 last_referenced）可能正在链接，暂不删除
+        :return: 删除的 blob 数量
+        """
+        self._gc_marker().touch()
+        self.prune_manifest()
+        conn = self._connect()
+        referenced = {row[0] for row in conn.execute('SELECT DISTINCT sha256 FROM files')}
+        cutoff = time.time() - self.gc_grace
+        recent = {row[0] for row in conn.execute('SELECT sha256 FROM blobs WHERE last_referenced > ?', (cutoff,))}
+        removed = []
+        for prefix_dir in self.folder.iterdir():
+            if prefix_dir.name == 'tmp' or not prefix_dir.is_dir():
+                continue
+            for blob in prefix_dir.iterdir():
+                try:
+                    st = blob.stat()
+                except OSError:
+                    continue
+                if st.st_nlink > 1 or blob.name in referenced or blob.name in recent or st.st_mtime > cutoff:
+                    continue
+                _unlink(blob)
+                removed.append(blob.name)
+        with conn:
+            conn.executemany(
+                'DELETE FROM blobs WHERE sha256 = ? AND last_referenced <= ?', [(name, cutoff) for name in removed]
+            )
+        return len(removed)
+
+
+class BlobWriter:
+    """写入 blob 临时文件，同时计算 sha256"""
+
+    def __init__(self, store):
+        self.store = store
+        fd, self.tmp_name = _mkstemp(store.folder / 'tmp')
+        self._file = os.fdopen(fd, 'wb')
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self._hasher.update(data)
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self, dest_path):
+        """
+        完成写入：相同内容已存在时丢弃临时文件，然后把 dest_path 链接到 blob
+        :return: 内容的 sha256
+        """
+        try:
+            self._file.close()
+            digest = self._hasher.hexdigest()
+            self.store._commit_blob(self.tmp_name, digest)
+        except BaseException:
+            self.abort()
+            raise
+        self.store._link(digest, dest_path)
+        return digest
+
+    def abort(self):
+        self._file.close()
+        _unlink(self.tmp_name)
+
+
+class PlainFileWriter:
+    """未启用内容寻址存储时使用：写入目标目录中的临时文件，完成后原子替换"""
+
+    def __init__(self, dest_path):
+        dest_path = Path(dest_path)
+        fd, self.tmp_name = tempfile.mkstemp(dir=dest_path.parent, prefix=f".{dest_path.name}.", suffix='.part')
+        self._file = os.fdopen(fd, 'wb')
+        self._hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self._hasher.update(data)
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self, dest_path):
+        try:
+            self._file.close()
+            os.replace(self.tmp_name, dest_path)
+        except BaseException:
+            self.abort()
+            raise
+        return self._hasher.hexdigest()
+
+    def abort(self):
+        self._file.close()
+        _unlink(self.tmp_name)
+
+
+def move_file(src, dst, tmp_dir=None):
+    """
+    原子地把 src 移动为 dst；跨文件系统（EXDEV）等无法直接替换时，先复制到 dst 所在文件系统上的临时文件再替换
+    :param tmp_dir: 复制时临时文件所在目录，省略时为 dst 所在目录
+    """
+    try:
+        os.replace(src, dst)
+        return
+    except OSError:
+        pass
+    fd, tmp_name = tempfile.mkstemp(dir=tmp_dir or Path(dst).parent, prefix=f".{Path(dst).name}.", suffix='.part')
+    try:
+        with open(src, 'rb') as f_in, os.fdopen(fd, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out, CHUNK_SIZE)
+        os.replace(tmp_name, dst)
+    except BaseException:
+        _unlink(tmp_name)
+        raise
+    _unlink(src)
+
+
+def _mkstemp(directory):
+    return tempfile.mkstemp(dir=directory, suffix='.part')
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
@@ -0,0 +1,162 @@
+import os
+import json
+import struct
+import hashlib
+import logging
+from pathlib import Path
+from flask import current_app
+from .file_service import get_processed_urdf_cached, resource_etag
+from ..utils.file_util import is_within
+from .post_processing import schedule_lod_build
+from ..extensions import mesh_lod
+
+logger = logging.getLogger(__name__)
+
+# 包格式：
+#   MAGIC(8字节) | 版本(uint32 LE) | 目录表长度(uint32 LE) | 目录表(UTF-8 JSON) | 各条目数据（无压缩，顺序存放）
+# 目录表: {"urdf": <条目下标>, "entries": [{"name", "url", "offset", "length", "content_type"}], "unresolved": [...]}
+# offset 为相对整个包起始位置的绝对偏移，客户端可按偏移直接切片，也可以按 Range 续传
+BUNDLE_MAGIC = b'URDFBNDL'
+BUNDLE_VERSION = 1
+CHUNK_SIZE = 256 * 1024
+
+
+def _content_type(path):
+    if path.lower().endswith('.stl'):
+        return 'application/sla'
+    if path.lower().endswith('.urdf'):
+        return 'application/xml'
+    return 'application/octet-stream'
+
+
+class BundlePlan:
+    """
+    包的布局：在读取任何 mesh 数据之前就确定所有条目的偏移和总长度，
+    因此可以设置 Content-Length、计算 ETag 并响应 Range 请求
+    """
+
+    __slots__ = ('segments', 'total_length', 'etag')
+
+    def __init__(self, segments, total_length, etag):
+        # segments: [(offset, length, bytes 或 文件路径)]
+        self.segments = segments
+        self.total_length = total_length
+        self.etag = etag
+
+    def iter_range(self, start=0, stop=None):
+        """
+        按字节区间 [start, stop) 流式输出包内容，文件数据按块从磁盘读取
+        """
+        if stop is None:
+            stop = self.total_length
+        for offset, length, source in self.segments:
+            seg_start = max(start, offset)
+            seg_stop = min(stop, offset + length)
+            if seg_start >= seg_stop:
+                continue
+            if isinstance(source, bytes):
+                yield source[seg_start - offset:seg_stop - offset]
+                continue
+
+            remaining = seg_stop - seg_start
+            try:
+                with open(source, 'rb') as f:
+                    f.seek(seg_start - offset)
+                    while remaining > 0:
+                        chunk = f.read(min(CHUNK_SIZE, remaining))
+                        if not chunk:
+                            break
+                        remaining -= len(chunk)
+                        yield chunk
+            except OSError as e:
+                logger.warning("Bundle entry unreadable %s: %s", source, e)
+            if remaining > 0:
+                # 文件在规划后被截断或删除：补零以保持偏移表有效
+                logger.warning("Bundle entry changed while streaming: %s", source)
+                yield bytes(remaining)
+
+
+def build_bundle_plan(file_path, lod=None):
+    """
+    为URDF及其引用的所有mesh生成包布局
+    :param file_path: URDF文件的完整路径
+    :param lod: mesh细节级别（low/medium/full），支持LOD的mesh使用简化后的文件
+    :return: (BundlePlan, None) 或 (None, 错误结果字典)
+    """
+    result, urdf_etag = get_processed_urdf_cached(file_path, lod)
+    if urdf_etag is None:
+        return None, result
+
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+    urdf_bytes = result['content'].encode('utf-8')
+
+    entries = [{
+        'name': Path(file_path).name,
+        'url': None,
+        'length': len(urdf_bytes),
+        'content_type': 'application/xml'
+    }]
+    sources = [urdf_bytes]
+    digest = hashlib.sha1(urdf_etag.encode('ascii'))
+
+    unresolved = list(result.get('unresolved', []))
+    seen = set()
+    for relative_path in result['resources']:
+        if relative_path in seen:
+            continue
+        seen.add(relative_path)
+        full_path = upload_folder / relative_path
+        # 包内容直接从磁盘读取，不经过 /resource 接口的检查：位于上传目录之外的文件一律跳过
+        if not is_within(full_path, upload_folder):
+            unresolved.append(relative_path)
+            continue
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            continue
+        etag = resource_etag(full_path, st)
+        url = f"/api/files/resource/{relative_path}?v={etag}"
+        source, length = str(full_path), st.st_size
+        lod_path = None
+        if lod and lod != 'full':
+            lod_path, ready = mesh_lod.lookup(full_path, st, lod)
+            if not ready:
+                # 简化文件尚未生成：本次打包原文件，生成后包的 ETag 随条目 URL 改变
+                schedule_lod_build(relative_path)
+        if lod_path is not None:
+            url += f"&lod={lod}"
+            source, length = str(lod_path), os.stat(lod_path).st_size
+        digest.update(f"{url}\0".encode('utf-8'))
+        entries.append({
+            'name': relative_path,
+            'url': url,
+            'length': length,
+            'content_type': _content_type(relative_path)
+        })
+        sources.append(source)
+
+    # 目录表的长度依赖于其中的偏移值，偏移值又依赖于目录表长度：
+    # 反复序列化直到目录表长度不再变化
+    def encode_table(base):
+        offset = base
+        for entry in entries:
+            entry['offset'] = offset
+            offset += entry['length']
+        layout = {'urdf': 0, 'entries': entries, 'unresolved': unresolved}
+        return json.dumps(layout, separators=(',', ':')).encode('utf-8'), offset
+
+    prefix_size = len(BUNDLE_MAGIC) + 8
+    table, _ = encode_table(prefix_size)
+    while True:
+        table_new, total = encode_table(prefix_size + len(table))
+        if len(table_new) == len(table):
+            table = table_new
+            break
+        table = table_new
+
+    header = BUNDLE_MAGIC + struct.pack('<II', BUNDLE_VERSION, len(table)) + table
+    segments = [(0, len(header), header)]
+    for entry, source in zip(entries, sources):
+        segments.append((entry['offset'], entry['length'], source))
+
+    return BundlePlan(segments, total, digest.hexdigest()), None
@@ -0,0 +1,276 @@
+import os
+import json
+import stat
+import time
+import logging
+import threading
+from collections import deque
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CREATED, MODIFIED, DELETED = 'created', 'modified', 'deleted'
+
+
+def entry_state(st, is_dir):
+    """目录快照中条目的状态：(是否文件夹, mtime_ns, 大小)"""
+    return (is_dir, st.st_mtime_ns, 0 if is_dir else st.st_size)
+
+
+def make_entry(relative_dir, name, st, is_dir):
+    """与 scan_directory 返回的条目格式相同，客户端可以直接替换列表中的对应项"""
+    prefix = f"{relative_dir}/" if relative_dir else ''
+    return {
+        'name': name,
+        'path': prefix + name,
+        'isDirectory': is_dir,
+        'modified': st.st_mtime,
+        'size': 0 if is_dir else st.st_size
+    }
+
+
+def snapshot_directory(directory):
+    """
+    :return: {名称: 条目状态}，同时返回 stat 结果供生成事件使用
+    """
+    snapshot, stats = {}, {}
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                st = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.name] = entry_state(st, is_dir)
+            stats[entry.name] = (st, is_dir)
+    return snapshot, stats
+
+
+class WatchedDirectory:
+    __slots__ = ('mtime_ns', 'snapshot', 'subscribers', 'last_used', 'scanned')
+
+    def __init__(self, mtime_ns, snapshot):
+        self.mtime_ns = mtime_ns
+        self.snapshot = snapshot
+        self.subscribers = 0
+        self.last_used = time.monotonic()
+        self.scanned = time.monotonic()
+
+
+class ChangeFeed:
+    """
+    上传目录的变更事件流（created / modified / deleted），代替客户端轮询 /api/files/list
+      - 写入钩子：上传、保存完成时由 notify_files_written 直接发布事件
+      - 目录监视：后台线程每隔 poll_interval 检查被订阅目录的 mtime，变化时才重新扫描并与快照比较；
+        原地修改文件不会改变目录 mtime，所以每隔 rescan_interval 再完整比较一次
+    事件保存在固定长度的环形缓冲区中，客户端用上次收到的事件ID续订，缺失的事件已被淘汰时返回 reset
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.upload_folder = None
+        self.poll_interval = 2.0
+        self.rescan_interval = 30.0
+        self.watch_ttl = 60.0
+        self._events = deque(maxlen=1000)
+        # 事件ID从启动时的毫秒时间戳开始，服务重启后旧客户端的ID必然早于缓冲区，会收到 reset
+        self._last_id = int(time.time() * 1000)
+        self._watched = {}
+        self._condition = threading.Condition()
+        self._watcher = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('CHANGE_FEED_ENABLED', True)
+        self.upload_folder = Path(app.config['UPLOAD_FOLDER'])
+        self.poll_interval = app.config.get('CHANGE_FEED_POLL_INTERVAL', self.poll_interval)
+        self.rescan_interval = app.config.get('CHANGE_FEED_RESCAN_INTERVAL', self.rescan_interval)
+        self.watch_ttl = app.config.get('CHANGE_FEED_WATCH_TTL', self.watch_ttl)
+        self._events = deque(maxlen=app.config.get('CHANGE_FEED_HISTORY', 1000))
+        app.extensions['change_feed'] = self
+
+    @property
+    def last_id(self):
+        with self._condition:
+            return self._last_id
+
+    def _append(self, event_type, relative_dir, entry):
+        """追加事件并唤醒等待者，调用方持有 self._condition"""
+        self._last_id += 1
+        self._events.append({
+            'id': self._last_id,
+            'type': event_type,
+            'directory': relative_dir,
+            'path': entry['path'],
+            'entry': entry,
+            'time': time.time()
+        })
+        self._condition.notify_all()
+
+    def publish(self, relative_paths):
+        """
+        写入钩子：文件及其各级上级目录在父目录中的条目发布变更事件
+        父目录正在被监视时按快照区分新建/修改，并更新快照，监视线程不会重复发布；
+        未被监视的目录无法区分，统一发布 modified（事件带有完整条目，客户端按路径更新或插入）
+        :param relative_paths: 相对于上传目录的文件路径列表
+        """
+        if not self.enabled:
+            return
+        entries = {}
+        for relative_path in relative_paths:
+            parts = str(relative_path).replace('\\', '/').split('/')
+            for i in range(len(parts)):
+                entries.setdefault('/'.join(parts[:i + 1]), ('/'.join(parts[:i]), parts[i]))
+
+        with self._condition:
+            for path, (relative_dir, name) in entries.items():
+                try:
+                    st = os.stat(self.upload_folder / path)
+                except OSError:
+                    continue
+                is_dir = stat.S_ISDIR(st.st_mode)
+                state = entry_state(st, is_dir)
+                watched = self._watched.get(relative_dir)
+                if watched is None:
+                    event_type = MODIFIED
+                else:
+                    previous = watched.snapshot.get(name)
+                    if previous == state:
+                        continue
+                    event_type = CREATED if previous is None else MODIFIED
+                    watched.snapshot[name] = state
+                self._append(event_type, relative_dir, make_entry(relative_dir, name, st, is_dir))
+
+    def events_since(self, since, relative_dir=None):
+        """
+        :param since: 客户端收到的最后一个事件ID
+        :param relative_dir: 只返回该目录的直接子项的事件（None 为全部）
+        :return: (事件列表, 是否需要重新获取完整列表)
+        """
+        with self._condition:
+            return self._collect(since, relative_dir)
+
+    def _collect(self, since, relative_dir):
+        if since > self._last_id:
+            return [], True
+        if self._events and since < self._events[0]['id'] - 1:
+            return [], True
+        events = [
+            event for event in self._events
+            if event['id'] > since and (relative_dir is None or event['directory'] == relative_dir)
+        ]
+        return events, False
+
+    def wait(self, since, relative_dir=None, timeout=25.0):
+        """
+        长轮询：等到有新事件或超时
+        :return: (事件列表, 是否需要重新获取完整列表, 最新事件ID)
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                events, reset = self._collect(since, relative_dir)
+                if events or reset:
+                    return events, reset, self._last_id
+                # 其他目录的事件不影响结果，直接推进位置
+                since = self._last_id
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return [], False, self._last_id
+                self._condition.wait(remaining)
+
+    def subscribe(self, relative_dir):
+        """开始监视目录（首次订阅时建立快照并启动监视线程）"""
+        directory = self.upload_folder / relative_dir
+        with self._condition:
+            watched = self._watched.get(relative_dir)
+        if watched is None:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            snapshot, _ = snapshot_directory(directory)
+            with self._condition:
+                watched = self._watched.setdefault(relative_dir, WatchedDirectory(mtime_ns, snapshot))
+        with self._condition:
+            watched.subscribers += 1
+            watched.last_used = time.monotonic()
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(target=self._watch, name='change-feed-watcher', daemon=True)
+                self._watcher.start()
+
+    def unsubscribe(self, relative_dir):
+        # 长轮询的请求很短，目录在最后一次使用后保留 watch_ttl 秒，避免反复建立快照
+        with self._condition:
+            watched = self._watched.get(relative_dir)
+            if watched is not None:
+                watched.subscribers -= 1
+                watched.last_used = time.monotonic()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            now = time.monotonic()
+            with self._condition:
+                for relative_dir in [
+                    key for key, watched in self._watched.items()
+                    if watched.subscribers <= 0 and now - watched.last_used > self.watch_ttl
+                ]:
+                    del self._watched[relative_dir]
+                if not self._watched:
+                    self._watcher = None
+                    return
+                watched_dirs = list(self._watched.items())
+            for relative_dir, watched in watched_dirs:
+                try:
+                    self.check(relative_dir, watched)
+                except Exception:
+                    logger.exception("Change feed watcher failed for '%s'", relative_dir)
+
+    def check(self, relative_dir, watched):
+        """目录 mtime 变化或到达完整比较的时间时重新扫描，与快照比较后发布差异"""
+        directory = self.upload_folder / relative_dir
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            with self._condition:
+                self._watched.pop(relative_dir, None)
+            return
+        now = time.monotonic()
+        if mtime_ns == watched.mtime_ns and now - watched.scanned < self.rescan_interval:
+            return
+
+        snapshot, stats = snapshot_directory(directory)
+        with self._condition:
+            for name, state in snapshot.items():
+                previous = watched.snapshot.get(name)
+                if previous != state:
+                    st, is_dir = stats[name]
+                    self._append(CREATED if previous is None else MODIFIED, relative_dir,
+                                 make_entry(relative_dir, name, st, is_dir))
+            for name, (is_dir, _, _) in watched.snapshot.items():
+                if name not in snapshot:
+                    prefix = f"{relative_dir}/" if relative_dir else ''
+                    self._append(DELETED, relative_dir, {'name': name, 'path': prefix + name, 'isDirectory': is_dir})
+            watched.snapshot = snapshot
+            watched.mtime_ns = mtime_ns
+            watched.scanned = now
+
+    def stream(self, since, relative_dir, heartbeat=15.0, max_duration=300.0):
+        """
+        Server-Sent Events：每个事件一条消息（id 为事件ID，event 为事件类型），空闲时发送注释行保持连接
+        连接在 max_duration 后结束，浏览器的 EventSource 会带 Last-Event-ID 自动重连
+        """
+        deadline = time.monotonic() + max_duration
+        self.subscribe(relative_dir)
+        try:
+            yield "retry: 2000\n\n"
+            while time.monotonic() < deadline:
+                events, reset, last_id = self.wait(since, relative_dir, min(heartbeat, deadline - time.monotonic()))
+                if reset:
+                    yield f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+                for event in events:
+                    yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+                if not events and not reset:
+                    yield ": keepalive\n\n"
+                since = last_id
+        finally:
+            self.unsubscribe(relative_dir)
@@ -0,0 +1,251 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+from pathlib import Path
+from flask import current_app
+from ..extensions import blob_store
+from .blob_store import move_file
+from .file_service import safe_upload_path, notify_files_written
+
+logger = logging.getLogger(__name__)
+
+# 分块上传协议：
+#   1. POST   /uploads                    创建会话 {filename, size, chunk_size?, sha256?}
+#   2. PUT    /uploads/<id>/chunks/<n>    上传第 n 块（请求头 X-Chunk-SHA256 为该块的校验和），可并行
+#   3. GET    /uploads/<id>               查询已收到/缺失的块，断线后据此续传
+#   4. POST   /uploads/<id>/commit        所有块到齐后提交到上传目录
+# 每块直接写入会话数据文件的对应偏移处，提交时不再重新拼接；块的完成状态以标记文件记录，服务重启后仍有效
+
+SESSION_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+COPY_SIZE = 1024 * 1024
+
+
+def _sessions_folder():
+    return Path(current_app.config['UPLOAD_SESSION_FOLDER'])
+
+
+def _session_dir(session_id):
+    if not SESSION_ID_RE.match(session_id):
+        return None
+    return _sessions_folder() / session_id
+
+
+def _load_session(session_id):
+    session_dir = _session_dir(session_id)
+    if session_dir is None:
+        return None, None
+    try:
+        with open(session_dir / 'session.json', 'r', encoding='utf-8') as f:
+            return session_dir, json.load(f)
+    except (OSError, ValueError):
+        return None, None
+
+
+def _received_chunks(session_dir):
+    try:
+        return sorted(int(name) for name in os.listdir(session_dir / 'chunks') if name.isdigit())
+    except OSError:
+        return []
+
+
+def _session_status(session_id, session, session_dir):
+    received = _received_chunks(session_dir)
+    received_set = set(received)
+    return {
+        'session_id': session_id,
+        'filename': session['path'],
+        'size': session['size'],
+        'chunk_size': session['chunk_size'],
+        'total_chunks': session['total_chunks'],
+        'received': received,
+        'missing': [n for n in range(session['total_chunks']) if n not in received_set],
+        'status': 200
+    }
+
+
+def cleanup_expired_sessions():
+    """删除超过有效期仍未提交的会话"""
+    ttl = current_app.config.get('UPLOAD_SESSION_TTL', 24 * 3600)
+    folder = _sessions_folder()
+    if not folder.exists():
+        return
+    now = time.time()
+    for entry in os.scandir(folder):
+        try:
+            if entry.is_dir() and now - entry.stat().st_mtime > ttl:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def create_upload_session(filename, size, chunk_size=None, sha256=None):
+    """
+    创建分块上传会话
+    :param filename: 目标相对路径（与文件夹上传相同的路径保留规则）
+    :param size: 文件总字节数
+    :param chunk_size: 块大小，省略时使用配置默认值
+    :param sha256: 整个文件的 sha256（可选，提交时校验）
+    :return: 会话信息
+    """
+    try:
+        safe_path = safe_upload_path(filename)
+    except ValueError as e:
+        return {'error': str(e), 'status': 400}
+
+    if not isinstance(size, int) or size < 0:
+        return {'error': 'Invalid size', 'status': 400}
+    # 数据文件按声明的大小预先分配，必须限制上限
+    max_size = current_app.config.get('UPLOAD_SESSION_MAX_SIZE')
+    if max_size and size > max_size:
+        return {'error': f'File too large (limit {max_size} bytes)', 'status': 413}
+
+    max_chunk = current_app.config.get('UPLOAD_CHUNK_MAX_SIZE', 64 * 1024 * 1024)
+    chunk_size = chunk_size or current_app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+    if not isinstance(chunk_size, int) or not 0 < chunk_size <= max_chunk:
+        return {'error': f'chunk_size must be between 1 and {max_chunk}', 'status': 400}
+
+    if sha256 is not None and not re.match(r'^[0-9a-fA-F]{64}$', str(sha256)):
+        return {'error': 'Invalid sha256', 'status': 400}
+
+    cleanup_expired_sessions()
+
+    session_id = uuid.uuid4().hex
+    session_dir = _sessions_folder() / session_id
+    try:
+        (session_dir / 'chunks').mkdir(parents=True)
+        # 预先分配数据文件，各块直接写入自己的偏移
+        with open(session_dir / 'data', 'wb') as f:
+            f.truncate(size)
+        session = {
+            'filename': filename,
+            'path': str(safe_path).replace('\\', '/'),
+            'size': size,
+            'chunk_size': chunk_size,
+            'total_chunks': max(1, -(-size // chunk_size)),
+            'sha256': sha256.lower() if sha256 else None,
+            'created': time.time()
+        }
+        with open(session_dir / 'session.json', 'w', encoding='utf-8') as f:
+            json.dump(session, f)
+    except OSError as e:
+        shutil.rmtree(session_dir, ignore_errors=True)
+        return {'error': str(e), 'status': 500}
+
+    return _session_status(session_id, session, session_dir)
+
+
+def get_upload_session(session_id):
+    """查询会话中已收到和缺失的块"""
+    session_dir, session = _load_session(session_id)
+    if session is None:
+        return {'error': 'Upload session not found', 'status': 404}
+    return _session_status(session_id, session, session_dir)
+
+
+def write_chunk(session_id, index, stream, checksum):
+    """
+    写入一个块：边读请求体边写入数据文件对应偏移并计算 sha256，校验通过后记录完成标记
+    :param index: 块序号（从0开始）
+    :param stream: 请求体输入流
+    :param checksum: 客户端提供的该块 sha256（十六进制）
+    """
+    session_dir, session = _load_session(session_id)
+    if session is None:
+        return {'error': 'Upload session not found', 'status': 404}
+    if not 0 <= index < session['total_chunks']:
+        return {'error': 'Chunk index out of range', 'status': 400}
+    if not checksum:
+        return {'error': 'Missing X-Chunk-SHA256 header', 'status': 400}
+
+    offset = index * session['chunk_size']
+    expected_length = min(session['chunk_size'], session['size'] - offset)
+
+    # 重传已完成的块时先撤销其完成标记，校验通过后再恢复
+    marker = session_dir / 'chunks' / str(index)
+    try:
+        marker.unlink()
+    except FileNotFoundError:
+        pass
+
+    hasher = hashlib.sha256()
+    written = 0
+    try:
+        with open(session_dir / 'data', 'r+b') as f:
+            f.seek(offset)
+            while True:
+                data = stream.read(min(COPY_SIZE, expected_length - written + 1))
+                if not data:
+                    break
+                written += len(data)
+                if written > expected_length:
+                    return {'error': f'Chunk {index} exceeds expected length {expected_length}', 'status': 400}
+                hasher.update(data)
+                f.write(data)
+    except OSError as e:
+        return {'error': str(e), 'status': 500}
+
+    if written != expected_length:
+        return {'error': f'Chunk {index} has {written} bytes, expected {expected_length}', 'status': 400}
+    if hasher.hexdigest() != checksum.lower():
+        return {'error': f'Checksum mismatch for chunk {index}', 'status': 422}
+
+    marker.touch()
+    os.utime(session_dir)  # 刷新会话有效期
+    return {'session_id': session_id, 'chunk': index, 'status': 200}
+
+
+def commit_upload_session(session_id):
+    """
+    所有块到齐后，把数据文件移动（或链接到 blob）到上传目录中的目标路径
+    """
+    session_dir, session = _load_session(session_id)
+    if session is None:
+        return {'error': 'Upload session not found', 'status': 404}
+
+    status = _session_status(session_id, session, session_dir)
+    if status['missing']:
+        status.update({'error': 'Upload incomplete', 'status': 409})
+        return status
+
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+    save_path = upload_folder / session['path']
+    data_file = session_dir / 'data'
+    try:
+        digest = None
+        if blob_store.enabled or session['sha256']:
+            digest = _file_sha256(data_file)
+        if session['sha256'] and digest != session['sha256']:
+            return {'error': 'File checksum mismatch', 'status': 422}
+
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        if blob_store.enabled:
+            blob_store.adopt_file(data_file, digest, save_path)
+        else:
+            # 会话目录与上传目录可以配置在不同的文件系统上
+            move_file(data_file, save_path)
+    except OSError as e:
+        return {'error': str(e), 'status': 500}
+
+    shutil.rmtree(session_dir, ignore_errors=True)
+    job_ids = notify_files_written([session['path']])
+
+    return {
+        'message': 'File uploaded successfully',
+        'filename': session['path'],
+        'path': str(save_path),
+        'jobs': job_ids,
+        'status': 200
+    }
+
+
+def _file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(COPY_SIZE), b''):
+            hasher.update(data)
+    return hasher.hexdigest()
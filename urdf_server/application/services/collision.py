@@ -0,0 +1,617 @@
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import xml.etree.ElementTree as ET
+import numpy as np
+from flask import current_app
+from .urdf_cache import file_stamp
+from .kinematics import KinematicModel, origin_matrix, _floats
+from .mesh_lod import load_stl
+from .mesh_metadata import load_dae
+from .file_service import resolve_mesh_path
+
+logger = logging.getLogger(__name__)
+
+# 自碰撞与间隙检测
+#   - 每个 mesh 构建一棵轴对齐包围盒层次树（BVH），以数组形式保存并按文件变更戳缓存
+#   - 粗检测：所有构型的连杆世界包围盒一起做扫掠剪枝（按 x 轴排序），只有区间重叠的连杆对进入细检测
+#   - 细检测：所有（构型, 连杆对）的节点对放在同一个数组中逐层向下展开，
+#     叶子之间做三角形相交（分离轴）或三角形距离计算
+# 相邻连杆（由关节直接相连）默认不检测
+
+LEAF_SIZE = 8
+# 细检测中每批处理的三角形对数，限制临时数组的内存
+TRIANGLE_BATCH = 65536
+
+
+class MeshBVH:
+    """
+    三角形网格的 BVH：节点按数组保存，叶子的三角形在 triangles 中连续存放
+    left/right 为子节点下标（叶子为 -1），first/count 为节点覆盖的三角形区间
+    """
+
+    __slots__ = ('triangles', 'node_min', 'node_max', 'left', 'right', 'first', 'count')
+
+    def __init__(self, triangles, leaf_size=LEAF_SIZE):
+        triangles = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 3)
+        lower, upper = triangles.min(axis=1), triangles.max(axis=1)
+        centroid = (lower + upper) / 2
+        order = np.arange(len(triangles))
+
+        node_min, node_max, left, right, first, count = [], [], [], [], [], []
+
+        def new_node():
+            for column in (node_min, node_max):
+                column.append(None)
+            for column in (left, right, first, count):
+                column.append(-1)
+            return len(left) - 1
+
+        stack = [(new_node(), 0, len(triangles))] if len(triangles) else []
+        while stack:
+            node, start, stop = stack.pop()
+            index = order[start:stop]
+            node_min[node] = lower[index].min(axis=0)
+            node_max[node] = upper[index].max(axis=0)
+            first[node], count[node] = start, stop - start
+            if stop - start <= leaf_size:
+                continue
+            # 沿质心分布最长的轴按中位数划分
+            points = centroid[index]
+            axis = int(np.argmax(points.max(axis=0) - points.min(axis=0)))
+            middle = (stop - start) // 2
+            order[start:stop] = index[np.argpartition(points[:, axis], middle)]
+            left[node], right[node] = new_node(), new_node()
+            stack.append((left[node], start, start + middle))
+            stack.append((right[node], start + middle, stop))
+
+        self.triangles = triangles[order]
+        self.node_min = np.array(node_min, dtype=np.float64).reshape(-1, 3)
+        self.node_max = np.array(node_max, dtype=np.float64).reshape(-1, 3)
+        self.left = np.array(left, dtype=np.int64)
+        self.right = np.array(right, dtype=np.int64)
+        self.first = np.array(first, dtype=np.int64)
+        self.count = np.array(count, dtype=np.int64)
+
+
+def box_triangles(size):
+    sx, sy, sz = np.asarray(size, dtype=np.float64) / 2
+    corners = np.array([[x, y, z] for x in (-sx, sx) for y in (-sy, sy) for z in (-sz, sz)])
+    faces = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+             (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)]
+    return corners[np.array(faces)]
+
+
+def cylinder_triangles(radius, length, segments=24):
+    angle = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    ring = np.stack([radius * np.cos(angle), radius * np.sin(angle), np.zeros(segments)], axis=1)
+    bottom, top = ring - [0, 0, length / 2], ring + [0, 0, length / 2]
+    nxt = np.roll(np.arange(segments), -1)
+    center_bottom = np.broadcast_to([0, 0, -length / 2], (segments, 3))
+    center_top = np.broadcast_to([0, 0, length / 2], (segments, 3))
+    return np.concatenate([
+        np.stack([bottom, bottom[nxt], top[nxt]], axis=1),
+        np.stack([bottom, top[nxt], top], axis=1),
+        np.stack([center_bottom, bottom[nxt], bottom], axis=1),
+        np.stack([center_top, top, top[nxt]], axis=1),
+    ])
+
+
+def sphere_triangles(radius, rings=12, segments=24):
+    theta = np.linspace(0, np.pi, rings + 1)
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    grid = radius * np.stack([
+        np.sin(theta)[:, None] * np.cos(phi)[None, :],
+        np.sin(theta)[:, None] * np.sin(phi)[None, :],
+        np.broadcast_to(np.cos(theta)[:, None], (rings + 1, segments))
+    ], axis=-1)
+    i, j = np.meshgrid(np.arange(rings), np.arange(segments), indexing='ij')
+    jn = (j + 1) % segments
+    quads_a = np.stack([grid[i, j], grid[i + 1, j], grid[i + 1, jn]], axis=-2).reshape(-1, 3, 3)
+    quads_b = np.stack([grid[i, j], grid[i + 1, jn], grid[i, jn]], axis=-2).reshape(-1, 3, 3)
+    return np.concatenate([quads_a, quads_b])
+
+
+def load_mesh_triangles(file_path):
+    suffix = Path(file_path).suffix.lower()
+    if suffix == '.stl':
+        return load_stl(file_path)
+    if suffix == '.dae':
+        return load_dae(file_path)[1]
+    raise ValueError(f"Unsupported mesh format for collision checking: {suffix}")
+
+
+class BVHCache:
+    """mesh 文件与基本几何体的 BVH 缓存（文件按变更戳校验，LRU淘汰）"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, stamp, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        bvh = MeshBVH(build())
+        with self._lock:
+            self._entries[key] = (stamp, bvh)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return bvh
+
+    def mesh(self, file_path):
+        return self.get(str(file_path), file_stamp(file_path), lambda: load_mesh_triangles(file_path))
+
+
+bvh_cache = BVHCache()
+
+
+class CollisionModel:
+    """
+    URDF 的碰撞模型：每个几何元素是一个刚体（body），所有刚体的 BVH 拼接成一组全局数组
+    body_link (N,)、body_local (N, 4, 4)（连杆坐标系下的变换，含 mesh 缩放）、body_root (N,)
+    """
+
+    def __init__(self, file_path, source='collision', upload_folder=None):
+        root = ET.parse(file_path).getroot()
+        self.kinematics = KinematicModel(root)
+        self.link_names = self.kinematics.link_names
+        link_index = {name: i for i, name in enumerate(self.link_names)}
+        upload_folder = Path(upload_folder or current_app.config['UPLOAD_FOLDER'])
+
+        self.dependencies = []
+        self.skipped = []
+        bvhs, body_link, body_local = [], [], []
+        for link in root.findall('link'):
+            elements = link.findall(source)
+            if not elements and source == 'collision':
+                # 没有碰撞几何时退回到显示几何
+                elements = link.findall('visual')
+            for element in elements:
+                geometry = element.find('geometry')
+                if geometry is None or len(geometry) == 0:
+                    continue
+                try:
+                    bvh, scale = self._load_geometry(geometry[0], file_path, upload_folder)
+                except (OSError, ValueError, ET.ParseError) as e:
+                    self.skipped.append({'link': link.get('name'), 'error': str(e)})
+                    continue
+                if bvh is None or not len(bvh.left):
+                    continue
+                local = origin_matrix(element.find('origin'))
+                local[:3, :3] = local[:3, :3] * scale
+                bvhs.append(bvh)
+                body_link.append(link_index[link.get('name')])
+                body_local.append(local)
+
+        self.body_link = np.array(body_link, dtype=np.int64)
+        self.body_local = np.array(body_local, dtype=np.float64).reshape(-1, 4, 4)
+
+        # 拼接所有 BVH：子节点下标与三角形区间加上各自的偏移
+        node_offsets = np.cumsum([0] + [len(bvh.left) for bvh in bvhs])
+        triangle_offsets = np.cumsum([0] + [len(bvh.triangles) for bvh in bvhs])
+        self.body_root = node_offsets[:-1].astype(np.int64)
+        if bvhs:
+            self.node_min = np.concatenate([bvh.node_min for bvh in bvhs])
+            self.node_max = np.concatenate([bvh.node_max for bvh in bvhs])
+            self.left = np.concatenate([np.where(bvh.left >= 0, bvh.left + off, -1)
+                                        for bvh, off in zip(bvhs, node_offsets)])
+            self.right = np.concatenate([np.where(bvh.right >= 0, bvh.right + off, -1)
+                                         for bvh, off in zip(bvhs, node_offsets)])
+            self.first = np.concatenate([bvh.first + off for bvh, off in zip(bvhs, triangle_offsets)])
+            self.count = np.concatenate([bvh.count for bvh in bvhs])
+            self.triangles = np.concatenate([bvh.triangles for bvh in bvhs])
+        else:
+            self.node_min = self.node_max = np.zeros((0, 3))
+            self.left = self.right = self.first = self.count = np.zeros(0, dtype=np.int64)
+            self.triangles = np.zeros((0, 3, 3))
+
+        # 相邻连杆（父子关系）默认不检测
+        L = len(self.link_names)
+        self.allowed = ~np.eye(L, dtype=bool)
+        kin = self.kinematics
+        self.allowed[kin.parent_link, kin.child_link] = False
+        self.allowed[kin.child_link, kin.parent_link] = False
+
+    def _load_geometry(self, shape, file_path, upload_folder):
+        """
+        :return: (BVH, 缩放向量)
+        """
+        if shape.tag == 'mesh':
+            filename = shape.get('filename')
+            if not filename:
+                raise ValueError('<mesh> without filename')
+            resolved = resolve_mesh_path(filename, str(file_path), upload_folder)
+            if resolved is None:
+                raise ValueError(f"Unresolved mesh reference '{filename}'")
+            full_path = resolved[0]
+            self.dependencies.append((full_path, file_stamp(full_path)))
+            return bvh_cache.mesh(full_path), _floats(shape.get('scale'), (1, 1, 1))
+        if shape.tag == 'box':
+            size = tuple(_floats(shape.get('size'), (0, 0, 0)))
+            return bvh_cache.get(('box', size), None, lambda: box_triangles(size)), np.ones(3)
+        if shape.tag == 'cylinder':
+            radius, length = float(shape.get('radius', 0)), float(shape.get('length', 0))
+            return bvh_cache.get(('cylinder', radius, length), None,
+                                 lambda: cylinder_triangles(radius, length)), np.ones(3)
+        if shape.tag == 'sphere':
+            radius = float(shape.get('radius', 0))
+            return bvh_cache.get(('sphere', radius), None, lambda: sphere_triangles(radius)), np.ones(3)
+        raise ValueError(f"Unsupported geometry <{shape.tag}>")
+
+    def body_poses(self, link_poses):
+        """
+        :param link_poses: (B, L, 4, 4)
+        :return: (B, N, 4, 4) 各刚体的世界位姿
+        """
+        return link_poses[:, self.body_link] @ self.body_local
+
+
+class CollisionModelCache:
+    """碰撞模型缓存：URDF 或其引用的任何 mesh 变化后重新构建（LRU淘汰）"""
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path, source='collision'):
+        key = (str(file_path), source)
+        stamp = file_stamp(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp and all(
+            file_stamp(path) == dep_stamp for path, dep_stamp in entry[1].dependencies
+        ):
+            with self._lock:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return entry[1]
+        with self._lock:
+            self.misses += 1
+        model = CollisionModel(file_path, source)
+        with self._lock:
+            self._entries[key] = (stamp, model)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return model
+
+
+model_cache = CollisionModelCache()
+
+
+# ---- 几何计算（全部按批处理，输入的第一维为批次） ----
+
+def _dot(a, b):
+    return np.einsum('...i,...i->...', a, b)
+
+
+def transform_boxes(box_min, box_max, pose):
+    """轴对齐包围盒经过仿射变换后的包围盒（中心变换，半边长乘以 |R|）"""
+    center = (box_min + box_max) / 2
+    half = (box_max - box_min) / 2
+    R, t = pose[:, :3, :3], pose[:, :3, 3]
+    center = np.einsum('kij,kj->ki', R, center) + t
+    half = np.einsum('kij,kj->ki', np.abs(R), half)
+    return center - half, center + half
+
+
+def box_distance(a_min, a_max, b_min, b_max):
+    """两个包围盒之间的距离（重叠时为0），是其中几何体距离的下界"""
+    gap = np.maximum(0, np.maximum(b_min - a_max, a_min - b_max))
+    return np.sqrt(_dot(gap, gap))
+
+
+def transform_points(points, pose):
+    """
+    :param points: (K, ..., 3)
+    :param pose: (K, 4, 4)
+    """
+    return np.einsum('kij,k...j->k...i', pose[:, :3, :3], points) + pose[:, None, :3, 3].reshape(
+        (len(pose),) + (1,) * (points.ndim - 2) + (3,)
+    )
+
+
+def triangles_intersect(A, B):
+    """
+    分离轴测试：两个面法向、9 个边叉积，以及共面情形需要的 6 个面内边法向
+    :param A: (K, 3, 3)
+    :param B: (K, 3, 3)
+    :return: (K,) 是否相交（接触也算相交）
+    """
+    edges_a = np.roll(A, -1, axis=1) - A
+    edges_b = np.roll(B, -1, axis=1) - B
+    normal_a = np.cross(edges_a[:, 0], edges_a[:, 1])
+    normal_b = np.cross(edges_b[:, 0], edges_b[:, 1])
+    axes = [normal_a, normal_b]
+    axes += [np.cross(edges_a[:, i], edges_b[:, j]) for i in range(3) for j in range(3)]
+    axes += [np.cross(normal_a, edges_a[:, i]) for i in range(3)]
+    axes += [np.cross(normal_b, edges_b[:, i]) for i in range(3)]
+    axes = np.stack(axes, axis=1)  # (K, 17, 3)
+    proj_a = np.einsum('kav,kpv->kap', axes, A)
+    proj_b = np.einsum('kav,kpv->kap', axes, B)
+    separated = (proj_a.max(axis=2) < proj_b.min(axis=2)) | (proj_b.max(axis=2) < proj_a.min(axis=2))
+    return ~separated.any(axis=1)
+
+
+def point_triangle_distance(p, a, b, c):
+    """点到三角形的距离（按 Voronoi 区域求最近点），所有参数为 (K, 3)"""
+    ab, ac = b - a, c - a
+    ap, bp, cp = p - a, p - b, p - c
+    d1, d2 = _dot(ab, ap), _dot(ac, ap)
+    d3, d4 = _dot(ab, bp), _dot(ac, bp)
+    d5, d6 = _dot(ab, cp), _dot(ac, cp)
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denominator = va + vb + vc
+        closest = a + ab * (vb / denominator)[:, None] + ac * (vc / denominator)[:, None]
+        # 按优先级从低到高覆盖：面内 < 边BC < 边AC < 顶点C < 边AB < 顶点B < 顶点A
+        regions = (
+            ((va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0),
+             lambda: b + (c - b) * ((d4 - d3) / ((d4 - d3) + (d5 - d6)))[:, None]),
+            ((vb <= 0) & (d2 >= 0) & (d6 <= 0), lambda: a + ac * (d2 / (d2 - d6))[:, None]),
+            ((d6 >= 0) & (d5 <= d6), lambda: c),
+            ((vc <= 0) & (d1 >= 0) & (d3 <= 0), lambda: a + ab * (d1 / (d1 - d3))[:, None]),
+            ((d3 >= 0) & (d4 <= d3), lambda: b),
+            ((d1 <= 0) & (d2 <= 0), lambda: a),
+        )
+        for mask, point in regions:
+            if mask.any():
+                closest = np.where(mask[:, None], point(), closest)
+    distance = np.linalg.norm(p - closest, axis=1)
+    # 退化三角形的结果无效，由边之间的距离兜底
+    return np.where(np.isfinite(distance), distance, np.inf)
+
+
+def segment_distance(p1, q1, p2, q2, eps=1e-12):
+    """两条线段之间的距离，所有参数为 (K, 3)"""
+    d1, d2, r = q1 - p1, q2 - p2, p1 - p2
+    a, e, f = _dot(d1, d1), _dot(d2, d2), _dot(d2, r)
+    c, b = _dot(d1, r), _dot(d1, d2)
+    denominator = a * e - b * b
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.where(denominator > eps, np.clip((b * f - c * e) / denominator, 0, 1), 0.0)
+        t = np.where(e > eps, (b * s + f) / e, 0.0)
+        # t 超出 [0, 1] 时截断并重新计算 s
+        s = np.where(t < 0, np.where(a > eps, np.clip(-c / a, 0, 1), 0.0), s)
+        s = np.where(t > 1, np.where(a > eps, np.clip((b - c) / a, 0, 1), 0.0), s)
+        t = np.clip(t, 0, 1)
+        # 第一条线段退化为点
+        degenerate = a <= eps
+        s = np.where(degenerate, 0.0, s)
+        t = np.where(degenerate, np.where(e > eps, np.clip(f / e, 0, 1), 0.0), t)
+    return np.linalg.norm((p1 + d1 * s[:, None]) - (p2 + d2 * t[:, None]), axis=1)
+
+
+def triangle_distance(A, B):
+    """
+    两个三角形之间的距离（相交时为0）：不相交时最近点对必然是“顶点-三角形”或“边-边”
+    :param A: (K, 3, 3)
+    :param B: (K, 3, 3)
+    """
+    distance = np.full(len(A), np.inf)
+    for i in range(3):
+        distance = np.minimum(distance, point_triangle_distance(A[:, i], B[:, 0], B[:, 1], B[:, 2]))
+        distance = np.minimum(distance, point_triangle_distance(B[:, i], A[:, 0], A[:, 1], A[:, 2]))
+        for j in range(3):
+            distance = np.minimum(distance, segment_distance(
+                A[:, i], A[:, (i + 1) % 3], B[:, j], B[:, (j + 1) % 3]
+            ))
+    distance[triangles_intersect(A, B)] = 0.0
+    return distance
+
+
+# ---- 粗检测 ----
+
+def broad_phase(model, body_poses, allowed, margin=0.0):
+    """
+    扫掠剪枝：所有构型的刚体包围盒按 x 轴排序（每个构型占据互不重叠的区间），
+    只对 x 区间重叠的刚体对再检查另外两个轴，结果规模与重叠对数成正比
+    :param body_poses: (B, N, 4, 4)
+    :param allowed: (L, L) 需要检测的连杆对
+    :param margin: 包围盒外扩距离（间隙查询时为最大查询距离）
+    :return: (构型下标, 刚体i, 刚体j)，均为 (P,)
+    """
+    B, N = body_poses.shape[:2]
+    empty = np.zeros(0, dtype=np.int64)
+    if B == 0 or N < 2:
+        return empty, empty, empty
+    roots = np.broadcast_to(model.body_root, (B, N)).reshape(-1)
+    box_min, box_max = transform_boxes(
+        model.node_min[roots], model.node_max[roots], body_poses.reshape(-1, 4, 4)
+    )
+    box_min -= margin / 2
+    box_max += margin / 2
+
+    # 把各构型的 x 区间平移到互不重叠的位置，合并成一次排序
+    origin = box_min[:, 0].min()
+    span = box_max[:, 0].max() - origin + 1.0
+    config = np.repeat(np.arange(B), N)
+    low = box_min[:, 0] - origin + config * 2 * span
+    high = box_max[:, 0] - origin + config * 2 * span
+
+    order = np.argsort(low, kind='stable')
+    sorted_low = low[order]
+    stop = np.searchsorted(sorted_low, high[order], side='right')
+    position = np.arange(len(order))
+    counts = np.maximum(stop - position - 1, 0)
+    first = np.repeat(position, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    a, b = order[first], order[first + 1 + offsets]
+
+    overlap = np.all((box_min[a] <= box_max[b]) & (box_min[b] <= box_max[a]), axis=1)
+    a, b = a[overlap], b[overlap]
+    body_a, body_b = a % N, b % N
+    keep = allowed[model.body_link[body_a], model.body_link[body_b]]
+    a, body_a, body_b = a[keep], body_a[keep], body_b[keep]
+    return a // N, body_a, body_b
+
+
+# ---- 细检测 ----
+
+def _leaf_triangle_pairs(model, query, node_a, node_b):
+    """展开叶子节点对为三角形对"""
+    count_a, count_b = model.count[node_a], model.count[node_b]
+    pairs = count_a * count_b
+    pair_index = np.repeat(np.arange(len(query)), pairs)
+    local = np.arange(pairs.sum()) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+    tri_a = model.first[node_a][pair_index] + local // count_b[pair_index]
+    tri_b = model.first[node_b][pair_index] + local % count_b[pair_index]
+    return query[pair_index], tri_a, tri_b
+
+
+def _descend(model, query, node_a, node_b, size_a, size_b):
+    """非叶子节点对展开为子节点对：展开较大的一侧（叶子不再展开）"""
+    leaf_a = model.left[node_a] < 0
+    leaf_b = model.left[node_b] < 0
+    split_a = ~leaf_a & (leaf_b | (size_a >= size_b))
+    split_b = ~split_a
+    return (
+        np.concatenate([query[split_a], query[split_a], query[split_b], query[split_b]]),
+        np.concatenate([model.left[node_a[split_a]], model.right[node_a[split_a]], node_a[split_b], node_a[split_b]]),
+        np.concatenate([node_b[split_a], node_b[split_a], model.left[node_b[split_b]], model.right[node_b[split_b]]]),
+    )
+
+
+def narrow_phase(model, pose_a, pose_b, root_a, root_b, max_distance=None):
+    """
+    同时遍历所有查询（刚体对）的 BVH 节点对
+    :param pose_a: (Q, 4, 4) 刚体 a 的世界位姿
+    :param max_distance: None 时只判断是否相交；否则计算不超过该值的最小距离
+    :return: 相交时 (Q,) bool；距离查询时 (Q,) 距离，超过 max_distance 的为 inf
+    """
+    Q = len(root_a)
+    if max_distance is None:
+        hit = np.zeros(Q, dtype=bool)
+    else:
+        # 上界：初始为查询距离，遍历中由节点代表点之间的距离和三角形距离不断收紧
+        bound = np.full(Q, float(max_distance))
+    query, node_a, node_b = np.arange(Q), root_a, root_b
+
+    while len(query):
+        if max_distance is None:
+            keep = ~hit[query]
+            query, node_a, node_b = query[keep], node_a[keep], node_b[keep]
+        a_min, a_max = transform_boxes(model.node_min[node_a], model.node_max[node_a], pose_a[query])
+        b_min, b_max = transform_boxes(model.node_min[node_b], model.node_max[node_b], pose_b[query])
+        gap = box_distance(a_min, a_max, b_min, b_max)
+        if max_distance is None:
+            keep = gap <= 0
+        else:
+            # 两个节点各取一个顶点，它们的距离是节点间最小距离的上界
+            rep_a = transform_points(model.triangles[model.first[node_a], 0][:, None], pose_a[query])[:, 0]
+            rep_b = transform_points(model.triangles[model.first[node_b], 0][:, None], pose_b[query])[:, 0]
+            np.minimum.at(bound, query, np.linalg.norm(rep_a - rep_b, axis=1))
+            keep = gap <= bound[query]
+        query, node_a, node_b = query[keep], node_a[keep], node_b[keep]
+        size_a, size_b = _dot(a_max - a_min, a_max - a_min)[keep], _dot(b_max - b_min, b_max - b_min)[keep]
+
+        leaves = (model.left[node_a] < 0) & (model.left[node_b] < 0)
+        if leaves.any():
+            pair_query, tri_a, tri_b = _leaf_triangle_pairs(model, query[leaves], node_a[leaves], node_b[leaves])
+            for start in range(0, len(pair_query), TRIANGLE_BATCH):
+                q = pair_query[start:start + TRIANGLE_BATCH]
+                A = transform_points(model.triangles[tri_a[start:start + TRIANGLE_BATCH]], pose_a[q])
+                B = transform_points(model.triangles[tri_b[start:start + TRIANGLE_BATCH]], pose_b[q])
+                if max_distance is None:
+                    hit[q[triangles_intersect(A, B)]] = True
+                else:
+                    np.minimum.at(bound, q, triangle_distance(A, B))
+        rest = ~leaves
+        query, node_a, node_b = _descend(model, query[rest], node_a[rest], node_b[rest], size_a[rest], size_b[rest])
+
+    if max_distance is None:
+        return hit
+    return np.where(bound < max_distance, bound, np.inf)
+
+
+def check_collisions(file_path, configurations, joint_names=None, distance=False, max_distance=0.05,
+                     ignore=None, source='collision'):
+    """
+    批量自碰撞/间隙检测
+    :param configurations: N 个关节向量 (N, M)
+    :param joint_names: 关节向量各列对应的关节名（可选）
+    :param distance: 是否计算最小距离（只计算不超过 max_distance 的距离）
+    :param ignore: 不检测的连杆对 [[link_a, link_b], ...]
+    :param source: 使用 collision 还是 visual 几何
+    :return: 结果字典
+    """
+    if source not in ('collision', 'visual'):
+        return {'error': "geometry must be 'collision' or 'visual'", 'status': 400}
+    try:
+        model = model_cache.get(file_path, source)
+    except (ET.ParseError, ValueError) as e:
+        return {'error': f"Error compiling URDF: {str(e)}", 'status': 400}
+
+    index = {name: i for i, name in enumerate(model.link_names)}
+    allowed = model.allowed
+    if ignore:
+        allowed = allowed.copy()
+        for pair in ignore:
+            if len(pair) != 2 or pair[0] not in index or pair[1] not in index:
+                return {'error': f"Invalid ignore pair: {pair}", 'status': 400}
+            allowed[index[pair[0]], index[pair[1]]] = allowed[index[pair[1]], index[pair[0]]] = False
+
+    try:
+        link_poses = model.kinematics.forward(configurations, joint_names)
+    except ValueError as e:
+        return {'error': str(e), 'status': 400}
+    body_poses = model.body_poses(link_poses)
+    B = len(body_poses)
+
+    config, body_a, body_b = broad_phase(model, body_poses, allowed, margin=max_distance if distance else 0.0)
+    pose_a, pose_b = body_poses[config, body_a], body_poses[config, body_b]
+    root_a, root_b = model.body_root[body_a], model.body_root[body_b]
+
+    if distance:
+        distances = narrow_phase(model, pose_a, pose_b, root_a, root_b, max_distance=max_distance)
+        colliding = distances <= 0
+    else:
+        colliding = narrow_phase(model, pose_a, pose_b, root_a, root_b)
+
+    link_a, link_b = model.body_link[body_a], model.body_link[body_b]
+    collision = np.zeros(B, dtype=bool)
+    collision[config[colliding]] = True
+    pairs = [[] for _ in range(B)]
+    for c, la, lb in sorted(set(zip(config[colliding].tolist(), link_a[colliding].tolist(), link_b[colliding].tolist()))):
+        pair = sorted((model.link_names[la], model.link_names[lb]))
+        if pair not in pairs[c]:
+            pairs[c].append(pair)
+
+    result = {
+        'joint_names': joint_names or model.kinematics.movable_names,
+        'collision': collision.tolist(),
+        'pairs': pairs,
+        'checked_pairs': int(len(config)),
+        'status': 200
+    }
+    if distance:
+        min_distance = np.full(B, np.inf)
+        np.minimum.at(min_distance, config, distances)
+        closest = [None] * B
+        if len(config):
+            # 每个构型中距离最小的刚体对
+            order = np.lexsort((distances, config))
+            first = order[np.r_[True, config[order][1:] != config[order][:-1]]]
+            for k in first[np.isfinite(distances[first])]:
+                closest[config[k]] = sorted((model.link_names[link_a[k]], model.link_names[link_b[k]]))
+        result['max_distance'] = max_distance
+        result['min_distance'] = [float(d) if np.isfinite(d) else None for d in min_distance]
+        result['closest'] = closest
+    if model.skipped:
+        result['skipped'] = model.skipped
+    return result
@@ -0,0 +1,179 @@
+import os
+import gzip
+import time
+import shutil
+import logging
+import threading
+from pathlib import Path
+from ..utils.file_util import file_etag, prune_folder
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，未安装时只生成 gzip 版本
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+def _gzip_file(src, dst):
+    with open(src, 'rb') as f_in, gzip.GzipFile(dst, 'wb', compresslevel=9, mtime=0) as f_out:
+        shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+
+
+def _brotli_file(src, dst):
+    compressor = brotli.Compressor(quality=11)
+    with open(src, 'rb') as f_in, open(dst, 'wb') as f_out:
+        for chunk in iter(lambda: f_in.read(1024 * 1024), b''):
+            f_out.write(compressor.process(chunk))
+        f_out.write(compressor.finish())
+
+
+class CompressedVariantStore:
+    """
+    mesh 文件的预压缩版本（gzip / brotli）缓存
+    变体文件以原文件的 ETag 命名，原文件变化后自然失效；缓存目录按大小和存活时间清理
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.folder = None
+        self.extensions = set()
+        self.min_size = 1024
+        self.max_bytes = 0
+        self.max_age = 0
+        self._lock = threading.Lock()
+        self._building = {}
+        self._last_prune = 0
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('MESH_COMPRESSION_ENABLED', True)
+        self.folder = Path(app.config['MESH_VARIANT_FOLDER'])
+        self.extensions = {ext.lower() for ext in app.config.get('MESH_COMPRESS_EXTENSIONS', ('stl', 'dae', 'obj'))}
+        self.min_size = app.config.get('MESH_COMPRESS_MIN_SIZE', self.min_size)
+        self.max_bytes = app.config.get('MESH_VARIANT_MAX_BYTES', 0)
+        self.max_age = app.config.get('MESH_VARIANT_MAX_AGE', 0)
+        if self.enabled:
+            self.folder.mkdir(parents=True, exist_ok=True)
+        app.extensions['compressed_variants'] = self
+
+    @property
+    def encodings(self):
+        """按优先级排列的可用编码"""
+        return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def is_compressible(self, file_path, size):
+        suffix = Path(file_path).suffix.lower().lstrip('.')
+        return self.enabled and suffix in self.extensions and size >= self.min_size
+
+    def _variant_path(self, etag, encoding):
+        return self.folder / f"{etag}.{encoding}"
+
+    def _skip_path(self, etag, encoding):
+        # 压缩后没有明显变小（如二进制STL）时记录标记，避免重复尝试
+        return self.folder / f"{etag}.{encoding}.skip"
+
+    def lookup(self, st, encoding):
+        """
+        查找已存在的变体文件
+        :return: 变体文件路径；不存在或不值得压缩时返回None
+        """
+        path = self._variant_path(file_etag(st), encoding)
+        return path if path.exists() else None
+
+    def build(self, file_path, st=None, run=None):
+        """
+        为文件生成所有可用编码的变体（已存在的跳过）
+        :param file_path: 原文件完整路径
+        :param st: 原文件的 os.stat 结果，省略时重新获取
+        :param run: 执行压缩函数的方式 run(fn, src, dst)，如后台任务的进程池；省略时在当前线程执行
+        """
+        if st is None:
+            st = os.stat(file_path)
+        if not self.is_compressible(file_path, st.st_size):
+            return
+
+        etag = file_etag(st)
+        for encoding in self.encodings:
+            self._build_one(file_path, st.st_size, etag, encoding, run)
+        self.maybe_prune()
+
+    def _build_one(self, file_path, size, etag, encoding, run=None):
+        variant_path = self._variant_path(etag, encoding)
+        skip_path = self._skip_path(etag, encoding)
+        if variant_path.exists() or skip_path.exists():
+            return
+
+        # 同一变体只允许一个线程生成
+        with self._lock:
+            event = self._building.get(variant_path)
+            owner = event is None
+            if owner:
+                event = self._building[variant_path] = threading.Event()
+        if not owner:
+            event.wait()
+            return
+
+        tmp_path = variant_path.with_name(f"{variant_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            compress = _brotli_file if encoding == 'br' else _gzip_file
+            if run is None:
+                compress(file_path, tmp_path)
+            else:
+                run(compress, file_path, tmp_path)
+            if tmp_path.stat().st_size < size * 0.9:
+                os.replace(tmp_path, variant_path)
+            else:
+                tmp_path.unlink()
+                skip_path.touch()
+        except OSError as e:
+            logger.warning("Failed to build %s variant for %s: %s", encoding, file_path, e)
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+        finally:
+            with self._lock:
+                self._building.pop(variant_path, None)
+            event.set()
+
+    def get_or_build(self, file_path, st, accept_encodings):
+        """
+        根据 Accept-Encoding 选择变体，缺失时生成一次
+        :param accept_encodings: request.accept_encodings
+        :return: (变体路径, 编码)；无合适变体时返回 (None, None)
+        """
+        if not self.is_compressible(file_path, st.st_size):
+            return None, None
+
+        encoding = accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return None, None
+
+        path = self.lookup(st, encoding)
+        with self._lock:
+            if path is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if path is None:
+            self.build(file_path, st)
+            path = self.lookup(st, encoding)
+        return (path, encoding) if path is not None else (None, None)
+
+    def maybe_prune(self, interval=60):
+        """距离上次清理超过 interval 秒时执行一次清理"""
+        now = time.time()
+        if now - self._last_prune < interval:
+            return
+        self._last_prune = now
+        self.prune()
+
+    def prune(self):
+        """删除过期变体，并在总大小超限时按最久未修改优先淘汰"""
+        if not self.enabled or not self.folder.exists():
+            return
+        prune_folder(self.folder, self.max_bytes, self.max_age)
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import base64
+import bisect
+import threading
+from collections import OrderedDict
+
+
+def sort_key(item):
+    """文件夹在前，再按名称（忽略大小写）排序；名称本身作为最后的决胜键保证顺序稳定"""
+    return (0 if item['isDirectory'] else 1, item['name'].lower(), item['name'])
+
+
+def encode_cursor(item):
+    raw = json.dumps(list(sort_key(item)), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    解析分页游标
+    :return: 排序键元组，游标无效时抛出 ValueError
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        return (int(key[0]), str(key[1]), str(key[2]))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def scan_directory(directory, relative_dir):
+    """
+    单次 os.scandir 扫描目录，每个条目最多 stat 一次
+    :param directory: 目录的完整路径
+    :param relative_dir: 目录相对于上传目录的路径（''表示根目录）
+    :return: 已排序的条目列表
+    """
+    prefix = f"{relative_dir}/" if relative_dir else ''
+    items = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                st = entry.stat()
+            except OSError:
+                continue
+            items.append({
+                'name': entry.name,
+                'path': prefix + entry.name,
+                'isDirectory': is_dir,
+                'modified': st.st_mtime,
+                'size': 0 if is_dir else st.st_size  # 文件夹大小设为0
+            })
+    items.sort(key=sort_key)
+    return items
+
+
+class DirectoryListing:
+    __slots__ = ('mtime_ns', 'items', 'keys', 'generation', 'scanned')
+
+    def __init__(self, mtime_ns, items, generation=None, scanned=None):
+        self.mtime_ns = mtime_ns
+        self.items = items
+        self.generation = generation
+        self.scanned = time.time() if scanned is None else scanned
+        self.keys = [sort_key(item) for item in items]
+
+    def page(self, page, per_page):
+        start = (page - 1) * per_page
+        return self.items[start:start + per_page], start
+
+    def after(self, cursor_key, per_page):
+        start = bisect.bisect_right(self.keys, cursor_key)
+        return self.items[start:start + per_page], start
+
+
+class DirectoryListingCache:
+    """
+    按目录缓存排序后的列表结果（LRU淘汰）
+    目录 mtime 变化（新增/删除条目）或上传写入时失效，翻页时不再重复扫描目录；
+    在应用之外原地修改文件不会改变目录 mtime，列表中的 size/modified 最多在 ttl 秒后重新扫描时更新
+    启用共享缓存时列表同时写入共享存储，并以共享的写入计数代替逐个删除条目，
+    某个 worker 进程中的上传会使所有进程缓存的列表失效
+    """
+
+    def __init__(self, app=None):
+        self.max_entries = 256
+        self.ttl = 30
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.shared = None
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('LISTING_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('LISTING_CACHE_TTL', self.ttl)
+        store = app.extensions.get('shared_store')
+        self.shared = store if store is not None and store.enabled else None
+        app.extensions['directory_listing'] = self
+        if self.shared is not None:
+            self.warm()
+
+    def warm(self):
+        """从共享存储载入最近使用的目录列表"""
+        for relative_dir, value in self.shared.recent('listing'):
+            self._store(relative_dir, DirectoryListing(
+                value['mtime_ns'], value['items'], value['generation'], value.get('scanned', 0)
+            ))
+
+    def invalidate(self, relative_dir):
+        with self._lock:
+            self._entries.pop(relative_dir, None)
+        if self.shared is not None:
+            self.shared.delete('listing', relative_dir)
+
+    def invalidate_path(self, relative_path):
+        """使某个文件路径的所有上级目录的列表失效（新建的目录会改变每一级的列表）"""
+        self.invalidate_paths([relative_path])
+
+    def invalidate_paths(self, relative_paths):
+        """批量版本的 invalidate_path，共享模式下只递增一次写入计数"""
+        if not relative_paths:
+            return
+        if self.shared is not None:
+            self.shared.bump('listing')
+            return
+        with self._lock:
+            self._entries.pop('', None)
+            for relative_path in relative_paths:
+                parts = str(relative_path).replace('\\', '/').split('/')[:-1]
+                for i in range(len(parts)):
+                    self._entries.pop('/'.join(parts[:i + 1]), None)
+
+    def _is_valid(self, listing, mtime_ns, generation):
+        return (
+            listing.mtime_ns == mtime_ns and listing.generation == generation and
+            (not self.ttl or time.time() - listing.scanned < self.ttl)
+        )
+
+    def get(self, directory, relative_dir, scan=scan_directory):
+        """
+        获取目录列表，命中且目录未变化时不访问目录内容
+        :param directory: 目录的完整路径
+        :param relative_dir: 目录相对于上传目录的路径，作为缓存键
+        :param scan: 未命中时的扫描函数，签名同 scan_directory
+        :return: DirectoryListing
+        """
+        mtime_ns = os.stat(directory).st_mtime_ns
+        generation = self.shared.generation('listing') if self.shared is not None else None
+        with self._lock:
+            listing = self._entries.get(relative_dir)
+            if listing is not None and self._is_valid(listing, mtime_ns, generation):
+                self._entries.move_to_end(relative_dir)
+                self.hits += 1
+                return listing
+
+        if self.shared is not None:
+            value = self.shared.get('listing', relative_dir)
+            if value is not None:
+                listing = DirectoryListing(mtime_ns, value['items'], value['generation'], value.get('scanned', 0))
+                if value['mtime_ns'] == mtime_ns and self._is_valid(listing, mtime_ns, generation):
+                    with self._lock:
+                        self.hits += 1
+                    return self._store(relative_dir, listing)
+
+        with self._lock:
+            self.misses += 1
+        listing = DirectoryListing(mtime_ns, scan(directory, relative_dir), generation)
+        self._store(relative_dir, listing)
+        if self.shared is not None:
+            self.shared.put('listing', relative_dir, {
+                'mtime_ns': mtime_ns, 'generation': generation, 'scanned': listing.scanned, 'items': listing.items
+            })
+        return listing
+
+    def _store(self, relative_dir, listing):
+        with self._lock:
+            self._entries[relative_dir] = listing
+            self._entries.move_to_end(relative_dir)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return listing
@@ -1,11 +1,70 @@
 import os
+import logging
 from pathlib import Path
 from flask import current_app, request
-from ..utils.file_util import is_allowed_file
+from ..utils.file_util import is_allowed_file, file_etag, is_within
+from ..extensions import (
+    package_index, urdf_cache, directory_listing, mesh_lod, blob_store,
+    mesh_metadata, metrics, change_feed
+)
+from .directory_listing import encode_cursor, decode_cursor, scan_directory
+from .post_processing import schedule_post_processing, schedule_mesh_analysis
 from werkzeug.utils import secure_filename
 import xml.etree.ElementTree as ET
 from collections import deque
 
+logger = logging.getLogger(__name__)
+
+def notify_files_written(relative_paths, precompress=True):
+    """
+    文件写入上传目录后调用，增量更新 package 索引并使相关缓存失效，发布目录变更事件，
+    压缩版本和元数据索引交给后台任务生成
+    :param relative_paths: 相对于上传目录的文件路径列表
+    :param precompress: 是否为其中的 mesh 生成压缩版本
+    :return: 提交的后台任务ID列表
+    """
+    for relative_path in relative_paths:
+        package_index.add_path(relative_path)
+    directory_listing.invalidate_paths(relative_paths)
+    package_index.save()
+    urdf_cache.notify_write()
+    change_feed.publish(relative_paths)
+    return schedule_post_processing(relative_paths, precompress)
+
+def save_uploaded_file(file, save_path):
+    """
+    保存上传的文件：启用内容寻址存储时边写边计算哈希，相同内容只保存一份
+    :param file: werkzeug FileStorage
+    :param save_path: 上传目录中的目标路径
+    """
+    if blob_store.enabled:
+        blob_store.store_stream(file.stream, save_path)
+    else:
+        file.save(save_path)
+
+def resource_etag(full_path, st):
+    """
+    资源文件的 ETag：有内容哈希时使用哈希，否则使用 inode + mtime + size
+    :param st: 文件的 os.stat 结果
+    """
+    digest = blob_store.digest_for(full_path, st)
+    return f"sha256-{digest[:32]}" if digest else file_etag(st)
+
+def safe_upload_path(filename):
+    """
+    文件夹上传中的相对路径：只对文件名进行安全处理，保留路径结构
+    :param filename: 客户端提供的相对路径（如 webkitRelativePath）
+    :return: 安全的相对路径；路径试图跳出上传目录时抛出 ValueError
+    """
+    # 分割路径和文件名
+    path_parts = Path(filename.replace('\\', '/')).parts
+    if not path_parts or any(part in ('..', '') for part in path_parts) or Path(filename).is_absolute():
+        raise ValueError(f"Invalid upload path: {filename}")
+    safe_path = Path(*path_parts[:-1], secure_filename(path_parts[-1]))
+    if not safe_path.name:
+        raise ValueError(f"Invalid upload path: {filename}")
+    return safe_path
+
 def handle_file_upload(file):
     if not is_allowed_file(file.filename):
         return {'error': 'File type not allowed', 'status': 400}
@@ -14,61 +73,26 @@ def handle_file_upload(file):
     save_path = Path(current_app.config['UPLOAD_FOLDER']) / filename
     
     try:
-        file.save(save_path)
+        save_uploaded_file(file, save_path)
+        job_ids = notify_files_written([filename])
         return {
             'message': 'File uploaded successfully',
             'filename': filename,
             'path': str(save_path),
+            'jobs': job_ids,
             'status': 200
         }
     except Exception as e:
         return {'error': str(e), 'status': 500}
 
-def handle_folder_upload(files):
+def list_files(page=1, per_page=20, cursor=None):
     """
-    处理文件夹上传，保持原始文件夹结构
-    :param files: 上传的文件列表
-    :return: 包含上传结果的字典
+    分页列出目录内容（文件夹在前，按名称排序）
+    :param page: 页码（从1开始），提供 cursor 时忽略
+    :param per_page: 每页条目数
+    :param cursor: 上一页返回的 next_cursor，目录内容变化时翻页位置依然稳定
+    :return: 当前页条目、总数、总页数和下一页游标
     """
-    uploaded_files = []
-    errors = []
-    
-    for file in files:
-        if file.filename:
-            try:
-                # 分割路径和文件名
-                path_parts = Path(file.filename).parts
-                # 只对文件名进行安全处理，保留路径结构
-                safe_path = Path(*path_parts[:-1], secure_filename(path_parts[-1]))
-                # 构建完整的保存路径
-                save_path = Path(current_app.config['UPLOAD_FOLDER']) / safe_path
-                
-                # 确保目标目录存在
-                save_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                # 保存文件
-                file.save(save_path)
-                uploaded_files.append({
-                    'filename': str(safe_path),
-                    'path': str(save_path)
-                })
-            except Exception as e:
-                errors.append({
-                    'file': file.filename,
-                    'error': str(e)
-                })
-    
-    result = {
-        'uploaded_files': uploaded_files,
-        'status': 200 if not errors else 400
-    }
-    
-    if errors:
-        result['errors'] = errors
-    
-    return result
-
-def list_files(page=1, per_page=20):
     try:
         upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
         if not upload_folder.exists():
@@ -80,143 +104,183 @@ def list_files(page=1, per_page=20):
 
         # 安全检查：确保路径不会超出上传文件夹
         try:
-            current_path.relative_to(upload_folder)
+            relative_dir = str(current_path.resolve().relative_to(upload_folder.resolve()))
         except ValueError:
             return {'error': 'Invalid path', 'status': 400}
+        relative_dir = '' if relative_dir == '.' else relative_dir.replace('\\', '/')
 
-        if not current_path.exists():
+        if not current_path.is_dir():
             return {'error': 'Path not found', 'status': 404}
 
-        # 获取当前目录下的所有文件和文件夹
-        items = []
-        for item in current_path.iterdir():
-            # 计算相对于 upload_folder 的路径
-            relative_path = str(item.relative_to(upload_folder)).replace('\\', '/')
-            item_info = {
-                'name': item.name,
-                'path': relative_path,
-                'isDirectory': item.is_dir(),
-                'modified': item.stat().st_mtime
-            }
-            
-            # 如果是文件，添加文件大小
-            if item.is_file():
-                item_info['size'] = item.stat().st_size
-            else:
-                item_info['size'] = 0  # 文件夹大小设为0
-                
-            items.append(item_info)
+        per_page = max(1, min(per_page, current_app.config.get('LIST_MAX_PER_PAGE', 1000)))
+        page = max(1, page)
 
-        # 对文件夹和文件分别排序
-        folders = sorted([item for item in items if item['isDirectory']], key=lambda x: x['name'].lower())
-        files = sorted([item for item in items if not item['isDirectory']], key=lambda x: x['name'].lower())
-        
-        # 合并排序后的列表，文件夹在前
-        sorted_items = folders + files
+        # 先记下变更事件位置再扫描：客户端从这里订阅 /changes，扫描期间发生的变更不会遗漏
+        change_id = change_feed.last_id
         
+        # 单次 scandir 扫描，结果按目录缓存
+        listing = directory_listing.get(
+            current_path, relative_dir, scan=metrics.timed('scan_directory', scan_directory)
+        )
+        if cursor:
+            try:
+                items, start = listing.after(decode_cursor(cursor), per_page)
+            except ValueError:
+                return {'error': 'Invalid cursor', 'status': 400}
+            page = start // per_page + 1
+        else:
+            items, start = listing.page(page, per_page)
+
+        # 合并 mesh 几何信息（尚未分析的 mesh 提交后台任务，结果在之后的请求中出现）
+        items = [
+            dict(item, geometry=lookup_mesh_metadata(upload_folder / item['path'], item['path']))
+            if not item['isDirectory'] and mesh_metadata.supports(item['name']) else item
+            for item in items
+        ]
+
+        total = len(listing.items)
+        has_more = start + len(items) < total
         return {
-            'files': sorted_items,
+            'files': items,
             'current_path': request_path,
+            'page': page,
+            'per_page': per_page,
+            'total': total,
+            'total_pages': max(1, -(-total // per_page)),
+            'next_cursor': encode_cursor(items[-1]) if items and has_more else None,
+            'change_id': change_id,
             'status': 200
         }
     except Exception as e:
         return {'error': str(e), 'status': 500}
 
+def lookup_mesh_metadata(full_path, relative_path, st=None):
+    """
+    查找 mesh 的几何信息（包围盒、三角形/顶点数、表面积），不在请求中同步计算
+    :param relative_path: 相对于上传目录的路径，尚未分析时据此提交后台任务
+    :return: 几何信息字典，尚未分析时返回None
+    """
+    try:
+        if st is None:
+            st = os.stat(full_path)
+    except OSError:
+        return None
+    meta = mesh_metadata.lookup(resource_etag(full_path, st))
+    if meta is None:
+        schedule_mesh_analysis(relative_path)
+        return None
+    # 分析失败的文件只有失败标记，不再重新提交
+    return None if mesh_metadata.is_failure(meta) else meta
+
+def collect_resource_geometry(resources):
+    """
+    汇总URDF引用的各个 mesh 的几何信息
+    :param resources: process_urdf_content 返回的 resources（相对路径列表）
+    :return: {'meshes': {相对路径: 几何信息或None}, 'triangles', 'vertices', 'analyzed', 'total'}
+    """
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+    meshes = {}
+    for relative_path in dict.fromkeys(resources):
+        if mesh_metadata.supports(relative_path):
+            meshes[relative_path] = lookup_mesh_metadata(upload_folder / relative_path, relative_path)
+    # 每个 mesh 按被引用的次数计入总数
+    analyzed = [meshes[path] for path in resources if meshes.get(path)]
+    return {
+        'meshes': meshes,
+        'triangles': sum(meta['triangles'] for meta in analyzed),
+        'vertices': sum(meta['vertices'] for meta in analyzed),
+        'analyzed': sum(1 for meta in meshes.values() if meta),
+        'total': len(meshes)
+    }
+
 def find_file_in_tree(root_dir, target_path):
     """
-    在目录树中递归查找目标文件
-    :param root_dir: 根目录（UPLOAD_FOLDER）
+    通过 package 索引查找目标文件（不再递归遍历目录树）
+    :param root_dir: 根目录（UPLOAD_FOLDER，索引已绑定该目录，保留参数以兼容调用方）
     :param target_path: 要查找的目标路径（package后的完整路径，如 staubli_tx2_90_support/meshes/...）
     :return: 找到的文件完整路径，如果未找到返回None
     """
-    root_dir = Path(root_dir)
-    target_path = target_path.replace('\\', '/')
-    target_parts = target_path.split('/')
-    first_dir = target_parts[0]  # 第一级目录名
-    target_file = target_parts[-1]  # 目标文件名
+    # 索引中按目录名直接定位 package 根目录，浅层目录优先（原先的根目录直查情形已被覆盖）
+    with metrics.timer('find_file_in_tree'):
+        return package_index.resolve(target_path)
+
+def versioned_resource_url(base_url, relative_path, full_path, lod=None):
+    """
+    生成带版本号的资源URL（?v=<ETag>），文件变化后URL随之变化，客户端可长期缓存
+    :param lod: 细节级别（low/medium），仅对支持LOD的mesh附加
+    """
+    query = ''
+    if lod and lod != 'full' and mesh_lod.supports(full_path, lod):
+        query = f"&lod={lod}"
+    try:
+        return f"{base_url}/{relative_path}?v={resource_etag(full_path, os.stat(full_path))}{query}"
+    except OSError:
+        return f"{base_url}/{relative_path}"
+
+def resolve_mesh_path(original_path, file_path, upload_folder):
+    """
+    解析mesh的 filename 属性（package:// 或相对URDF文件的路径）
+    :param original_path: 原始 filename 属性值
+    :param file_path: URDF文件的完整路径
+    :param upload_folder: 上传目录
+    :return: (完整路径, 相对于上传目录的路径)，找不到文件或文件位于上传目录之外时返回None
+    """
+    # 处理package://格式的路径
+    if original_path.startswith('package://'):
+        # 去掉package://前缀，在目录树中查找文件
+        full_path = find_file_in_tree(upload_folder, original_path[len('package://'):])
+        if not full_path:
+            return None
+    else:
+        # 处理相对路径
+        urdf_dir = os.path.dirname(file_path)
+        full_path = os.path.normpath(os.path.join(urdf_dir, original_path))
+        if not os.path.exists(full_path):
+            return None
     
-    # 递归查找第一级目录
-    def find_first_dir(current_dir):
-        try:
-            # 检查当前目录是否为目标目录
-            if current_dir.name == first_dir:
-                # 尝试完整路径
-                full_path = current_dir.parent / target_path
-                if full_path.exists():
-                    # 额外验证：检查文件名是否匹配
-                    if full_path.name == target_file:
-                        return full_path
-            
-            # 递归搜索子目录
-            for item in current_dir.iterdir():
-                if item.is_dir():
-                    result = find_first_dir(item)
-                    if result:
-                        return result
-        except (PermissionError, OSError):
-            pass  # 忽略权限错误
-        
+    # 安全检查：../ 或符号链接不能指向上传目录之外
+    if not is_within(full_path, upload_folder):
         return None
     
-    # 如果目标路径只有一级，直接在根目录下查找
-    if len(target_parts) == 2:  # 只有目录和文件名
-        try:
-            full_path = root_dir / target_path
-            if full_path.exists():
-                return full_path
-        except (PermissionError, OSError):
-            pass
-    
-    return find_first_dir(root_dir)
+    # 转换为相对于upload_folder的路径
+    relative_path = os.path.relpath(full_path, upload_folder).replace('\\', '/')
+    return full_path, relative_path
 
-def process_urdf_content(file_path):
+def process_urdf_content(file_path, lod=None):
     """
     处理URDF文件内容，解析并调整资源文件的路径
     :param file_path: URDF文件的完整路径
+    :param lod: mesh细节级别（low/medium/full），None 等同于 full
     :return: 处理后的URDF内容和相关资源文件列表
     """
     try:
-        tree = ET.parse(file_path)
+        with metrics.timer('urdf_parse'):
+            tree = ET.parse(file_path)
         root = tree.getroot()
         base_url = "/api/files/resource"
         resources = []
+        unresolved = []
         upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
         
         # 查找所有mesh标签
         for mesh in root.findall(".//mesh"):
             if 'filename' in mesh.attrib:
                 original_path = mesh.attrib['filename']
-                
-                # 处理package://格式的路径
-                if original_path.startswith('package://'):
-                    # 去掉package://前缀
-                    search_path = original_path[len('package://'):]
-                    # 在目录树中查找文件
-                    found_path = find_file_in_tree(upload_folder, search_path)
-                    
-                    if found_path:
-                        # 转换为相对于upload_folder的路径
-                        relative_path = os.path.relpath(found_path, upload_folder)
-                        relative_path = relative_path.replace('\\', '/')
-                        resources.append(relative_path)
-                        new_url = f"{base_url}/{relative_path}"
-                        mesh.attrib['filename'] = new_url
+                resolved = resolve_mesh_path(original_path, file_path, upload_folder)
+                if resolved:
+                    full_path, relative_path = resolved
+                    resources.append(relative_path)
+                    mesh.attrib['filename'] = versioned_resource_url(base_url, relative_path, full_path, lod)
                 else:
-                    # 处理相对路径
-                    urdf_dir = os.path.dirname(file_path)
-                    full_path = os.path.normpath(os.path.join(urdf_dir, original_path))
-                    if os.path.exists(full_path):
-                        relative_path = os.path.relpath(full_path, upload_folder)
-                        relative_path = relative_path.replace('\\', '/')
-                        resources.append(relative_path)
-                        new_url = f"{base_url}/{relative_path}"
-                        mesh.attrib['filename'] = new_url
+                    unresolved.append(original_path)
         
-        modified_content = ET.tostring(root, encoding='unicode')
+        with metrics.timer('urdf_serialize'):
+            modified_content = ET.tostring(root, encoding='unicode')
         
         return {
             'content': modified_content,
             'resources': resources,
+            'unresolved': unresolved,
             'status': 200
         }
     except Exception as e:
@@ -225,27 +289,46 @@ def process_urdf_content(file_path):
             'status': 500
         }
 
+def get_processed_urdf_cached(file_path, lod=None):
+    """
+    带缓存的 process_urdf_content
+    :param file_path: URDF文件的完整路径
+    :param lod: mesh细节级别（low/medium/full）
+    :return: (处理结果字典, ETag)，处理失败时 ETag 为None
+    """
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+    if lod == 'full':
+        lod = None
+    return urdf_cache.get(
+        file_path, lambda path: process_urdf_content(path, lod), upload_folder,
+        variant=f"lod={lod}" if lod else None
+    )
+
 def get_resource_file(resource_path):
     """
     获取资源文件（mesh等）
     :param resource_path: 资源文件的相对路径
-    :return: 文件路径和状态信息
+    :return: 文件路径、缓存校验信息和状态信息
     """
     try:
-        print(f"\n>>> Resource request: {resource_path}")
+        logger.debug("Resource request: %s", resource_path)
         
         upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
         file_path = upload_folder / resource_path
         
         # 安全检查：确保文件路径不会超出上传目录
         try:
-            file_path.relative_to(upload_folder)
+            file_path.resolve().relative_to(upload_folder.resolve())
         except ValueError:
-            print(f">>> Resource request failed: Invalid path")
+            logger.debug("Resource request failed: Invalid path %s", resource_path)
             return {'error': 'Invalid resource path', 'status': 400}
         
-        if not file_path.exists():
-            print(f">>> Resource request failed: File not found")
+        try:
+            st = file_path.stat()
+        except OSError:
+            st = None
+        if st is None or not file_path.is_file():
+            logger.debug("Resource request failed: File not found %s", resource_path)
             return {'error': 'Resource not found', 'status': 404}
         
         # 添加文件类型信息
@@ -253,12 +336,15 @@ def get_resource_file(resource_path):
         if file_path.suffix.lower() == '.stl':
             file_type = 'application/sla'  # STL文件的MIME类型
         
-        print(f">>> Resource request successful: {file_path}")
+        logger.debug("Resource request successful: %s", file_path)
         return {
             'file_path': str(file_path),
             'content_type': file_type,
+            'etag': resource_etag(file_path, st),
+            'last_modified': st.st_mtime,
+            'size': st.st_size,
             'status': 200
         }
     except Exception as e:
-        print(f">>> Resource request failed: {str(e)}")
+        logger.warning("Resource request failed: %s", e)
         return {'error': str(e), 'status': 500}
\ No newline at end of file
@@ -0,0 +1,354 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+# 进程池子进程不创建应用，只拿到这里列出的配置项（由 _init_cpu_worker 写入 worker_config）
+CPU_WORKER_CONFIG = ('UPLOAD_FOLDER',)
+worker_config = {}
+
+
+def process_pool_context():
+    """
+    进程池统一用 spawn 启动：服务进程里有多个线程，fork 出的子进程可能继承其他线程持有的锁（如导入锁）而卡死；
+    spawn 也是 Windows 上唯一的方式，各平台行为一致
+    """
+    return multiprocessing.get_context('spawn')
+
+
+def _init_cpu_worker(config):
+    worker_config.update(config)
+
+
+class Job:
+    __slots__ = ('id', 'kind', 'key', 'args', 'status', 'progress', 'message', 'error', 'result',
+                 'created', 'started', 'finished')
+
+    def __init__(self, job_id, kind, key, args, status=QUEUED, created=None):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.args = args
+        self.status = status
+        self.progress = 0.0
+        self.message = None
+        self.error = None
+        self.result = None
+        self.created = created or time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'args': self.args,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'error': self.error,
+            'result': self.result,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished
+        }
+
+
+class JobContext:
+    """传给任务处理函数：报告进度，并把CPU密集的步骤交给进程池"""
+
+    __slots__ = ('job', '_queue')
+
+    def __init__(self, job, queue):
+        self.job = job
+        self._queue = queue
+
+    def set_progress(self, progress, message=None):
+        self.job.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.job.message = message
+
+    def run_cpu(self, fn, *args):
+        """
+        在进程池中执行 fn(*args) 并等待结果
+        fn 必须是模块级函数，参数和返回值必须可以 pickle
+        """
+        return self._queue.cpu_executor().submit(fn, *args).result()
+
+
+class JobQueue:
+    """
+    进程内后台任务队列：
+      - 任务在线程池中执行（I/O 部分），CPU 密集的步骤通过 JobContext.run_cpu 交给有界进程池
+      - 相同类型和参数的任务在排队期间只保留一个（已开始执行的任务可能读到旧数据，不参与去重）
+      - 任务状态记录在 SQLite 日志中，服务重启后未完成的任务重新排队
+      - 多个 worker 进程共用同一个日志时，每个未完成的任务带有所属进程的租约，由该进程定期续租；
+        只有租约过期（所属进程已退出）的任务才会被其他进程接手，正在执行的任务不会被重复排队
+    处理函数通过 register 注册，签名为 handler(ctx, **args)，在应用上下文中执行
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.journal_file = None
+        self.history_ttl = 24 * 3600
+        self.lease_ttl = 60
+        self.owner = None
+        self.cpu_workers = 2
+        self._handlers = {}
+        self._jobs = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._io_executor = None
+        self._cpu_executor = None
+        self._last_prune = 0
+        self._lease_keeper = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.journal_file = Path(app.config['JOB_JOURNAL_FILE'])
+        self.history_ttl = app.config.get('JOB_HISTORY_TTL', self.history_ttl)
+        self.lease_ttl = app.config.get('JOB_LEASE_TTL', self.lease_ttl)
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        self.cpu_workers = app.config.get('JOB_CPU_WORKERS', self.cpu_workers)
+        if self._io_executor is None:
+            self._io_executor = ThreadPoolExecutor(
+                max_workers=app.config.get('JOB_IO_WORKERS', 4),
+                thread_name_prefix='job'
+            )
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, kind TEXT NOT NULL, key TEXT NOT NULL, args TEXT NOT NULL, '
+                'status TEXT NOT NULL, progress REAL, message TEXT, error TEXT, result TEXT, '
+                'created REAL, started REAL, finished REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)')
+            # 早期的日志没有租约字段
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for column, column_type in (('owner', 'TEXT'), ('lease', 'REAL')):
+                if column not in columns:
+                    conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {column_type}')
+        app.extensions['job_queue'] = self
+
+    def _connect(self):
+        # sqlite 连接不能跨线程共享，每个线程各自持有一个连接
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.path != self.journal_file:
+            conn = sqlite3.connect(self.journal_file, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn, self._local.path = conn, self.journal_file
+        return conn
+
+    def cpu_executor(self):
+        # 进程池在第一次需要时才创建，避免每个 worker 进程在启动时都拉起子进程
+        with self._lock:
+            if self._cpu_executor is None:
+                config = {name: str(self.app.config[name]) for name in CPU_WORKER_CONFIG}
+                self._cpu_executor = ProcessPoolExecutor(
+                    max_workers=self.cpu_workers, mp_context=process_pool_context(),
+                    initializer=_init_cpu_worker, initargs=(config,)
+                )
+            return self._cpu_executor
+
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+
+    def _journal(self, job):
+        lease = None if job.status in (DONE, FAILED) else time.time() + self.lease_ttl
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO jobs '
+                '(id, kind, key, args, status, progress, message, error, result, created, started, finished, '
+                'owner, lease) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (job.id, job.kind, job.key, json.dumps(job.args), job.status, job.progress, job.message,
+                 job.error, json.dumps(job.result), job.created, job.started, job.finished,
+                 self.owner, lease)
+            )
+
+    def submit(self, kind, **args):
+        """
+        提交任务；相同任务已在排队时直接返回已有任务的ID
+        :return: 任务ID
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        key = f"{kind}:{json.dumps(args, sort_keys=True)}"
+        with self._lock:
+            job_id = self._pending.get(key)
+            if job_id is not None:
+                return job_id
+            job = Job(uuid.uuid4().hex, kind, key, args)
+            self._jobs[job.id] = job
+            self._pending[key] = job.id
+        self._journal(job)
+        self._io_executor.submit(self._run, job)
+        self._maybe_prune()
+        return job.id
+
+    def _run(self, job):
+        with self._lock:
+            if self._pending.get(job.key) == job.id:
+                del self._pending[job.key]
+        job.status = RUNNING
+        job.started = time.time()
+        self._journal(job)
+        try:
+            with self.app.app_context():
+                job.result = self._handlers[job.kind](JobContext(job, self), **job.args)
+            job.status = DONE
+            job.progress = 1.0
+        except Exception as e:
+            logger.warning("Job %s (%s %s) failed: %s", job.id, job.kind, job.args, e)
+            job.status = FAILED
+            job.error = str(e)
+        job.finished = time.time()
+        try:
+            self._journal(job)
+        except sqlite3.Error as e:
+            logger.warning("Failed to journal job %s: %s", job.id, e)
+
+    def resume(self):
+        """
+        重新排队租约已过期的未完成任务（在所有处理函数注册之后调用）
+        同时启动续租线程，之后每隔 lease_ttl/3 秒续租本进程的任务，并接手其他进程退出后留下的任务
+        """
+        with self._lock:
+            if self._lease_keeper is None or not self._lease_keeper.is_alive():
+                self._lease_keeper = threading.Thread(target=self._keep_leases, name='job-lease', daemon=True)
+                self._lease_keeper.start()
+
+        conn = self._connect()
+        rows = conn.execute(
+            'SELECT id, kind, key, args, created FROM jobs WHERE status IN (?, ?) AND (lease IS NULL OR lease < ?)',
+            (QUEUED, RUNNING, time.time())
+        ).fetchall()
+        resumed = 0
+        for job_id, kind, key, args, created in rows:
+            with self._lock:
+                if job_id in self._jobs or key in self._pending:
+                    continue
+                if kind not in self._handlers:
+                    continue
+            # 条件更新保证同一个任务只被一个进程接手
+            with conn:
+                claimed = conn.execute(
+                    'UPDATE jobs SET owner = ?, lease = ? '
+                    'WHERE id = ? AND status IN (?, ?) AND (lease IS NULL OR lease < ?)',
+                    (self.owner, time.time() + self.lease_ttl, job_id, QUEUED, RUNNING, time.time())
+                ).rowcount
+            if not claimed:
+                continue
+            with self._lock:
+                if key in self._pending:
+                    continue
+                job = Job(job_id, kind, key, json.loads(args), created=created)
+                self._jobs[job.id] = job
+                self._pending[key] = job.id
+            self._io_executor.submit(self._run, job)
+            resumed += 1
+        if resumed:
+            logger.info("Resumed %d unfinished jobs", resumed)
+        return resumed
+
+    def _keep_leases(self):
+        while True:
+            time.sleep(self.lease_ttl / 3)
+            try:
+                self._renew_leases()
+                self.resume()
+            except Exception:
+                logger.exception("Failed to renew job leases")
+
+    def _renew_leases(self):
+        with self._lock:
+            job_ids = [job.id for job in self._jobs.values() if job.status in (QUEUED, RUNNING)]
+        if not job_ids:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                'UPDATE jobs SET owner = ?, lease = ? WHERE id = ? AND status IN (?, ?)',
+                ((self.owner, time.time() + self.lease_ttl, job_id, QUEUED, RUNNING) for job_id in job_ids)
+            )
+
+    def get(self, job_id):
+        """任务状态；内存中没有时（已被清理或服务重启过）从日志中读取"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        row = self._connect().execute(
+            'SELECT id, kind, args, status, progress, message, error, result, created, started, finished '
+            'FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0],
+            'kind': row[1],
+            'args': json.loads(row[2]),
+            'status': row[3],
+            'progress': row[4],
+            'message': row[5],
+            'error': row[6],
+            'result': json.loads(row[7]) if row[7] else None,
+            'created': row[8],
+            'started': row[9],
+            'finished': row[10]
+        }
+
+    def list(self, status=None, limit=100):
+        """最近的任务（内存中的），按创建时间倒序"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if status is None or job.status == status]
+        jobs.sort(key=lambda job: job.created, reverse=True)
+        return [job.to_dict() for job in jobs[:limit]]
+
+    def counts(self):
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def wait(self, job_ids, timeout=None):
+        """等待任务结束（主要用于命令行工具和测试）"""
+        deadline = None if timeout is None else time.time() + timeout
+        for job_id in job_ids:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job.status in (DONE, FAILED):
+                    break
+                if deadline is not None and time.time() > deadline:
+                    return False
+                time.sleep(0.01)
+        return True
+
+    def _maybe_prune(self, interval=60):
+        now = time.time()
+        if now - self._last_prune < interval:
+            return
+        self._last_prune = now
+        cutoff = now - self.history_ttl
+        with self._lock:
+            for job_id in [k for k, job in self._jobs.items() if job.finished and job.finished < cutoff]:
+                del self._jobs[job_id]
+        with self._connect() as conn:
+            conn.execute('DELETE FROM jobs WHERE finished IS NOT NULL AND finished < ?', (cutoff,))
+
+    def shutdown(self, wait=True):
+        if self._io_executor is not None:
+            self._io_executor.shutdown(wait=wait)
+        if self._cpu_executor is not None:
+            self._cpu_executor.shutdown(wait=wait)
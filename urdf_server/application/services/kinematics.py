@@ -0,0 +1,317 @@
+import threading
+from collections import OrderedDict
+import xml.etree.ElementTree as ET
+import numpy as np
+from .urdf_cache import file_stamp
+
+# 关节类型编码
+FIXED, REVOLUTE, PRISMATIC = 0, 1, 2
+JOINT_TYPES = {
+    'fixed': FIXED,
+    'revolute': REVOLUTE,
+    'continuous': REVOLUTE,
+    'prismatic': PRISMATIC,
+    # floating / planar 需要多自由度，这里按固定关节处理
+    'floating': FIXED,
+    'planar': FIXED,
+}
+
+
+def _floats(text, default):
+    if not text:
+        return np.array(default, dtype=np.float64)
+    return np.array([float(v) for v in text.split()], dtype=np.float64)
+
+
+def rpy_to_matrix(rpy):
+    """URDF 固定轴 roll-pitch-yaw 转旋转矩阵：R = Rz(yaw) @ Ry(pitch) @ Rx(roll)"""
+    r, p, y = rpy
+    cr, sr, cp, sp, cy, sy = np.cos(r), np.sin(r), np.cos(p), np.sin(p), np.cos(y), np.sin(y)
+    return np.array([
+        [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+        [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+        [-sp, cp * sr, cp * cr]
+    ])
+
+
+def origin_matrix(origin):
+    """<origin xyz rpy> 转 4x4 齐次变换"""
+    T = np.eye(4)
+    if origin is not None:
+        T[:3, :3] = rpy_to_matrix(_floats(origin.get('rpy'), (0, 0, 0)))
+        T[:3, 3] = _floats(origin.get('xyz'), (0, 0, 0))
+    return T
+
+
+def matrix_to_quaternion(R):
+    """
+    批量旋转矩阵转四元数 (x, y, z, w)
+    :param R: (..., 3, 3)
+    """
+    m = R
+    trace = m[..., 0, 0] + m[..., 1, 1] + m[..., 2, 2]
+    # 四个候选分量的平方（乘4），取最大者作为主元保证数值稳定
+    candidates = np.stack([
+        1 + 2 * m[..., 0, 0] - trace,
+        1 + 2 * m[..., 1, 1] - trace,
+        1 + 2 * m[..., 2, 2] - trace,
+        1 + trace
+    ], axis=-1)
+    pivot = np.argmax(candidates, axis=-1)
+    s = np.sqrt(np.maximum(np.take_along_axis(candidates, pivot[..., None], axis=-1)[..., 0], 1e-12))
+
+    d21, d02, d10 = m[..., 2, 1] - m[..., 1, 2], m[..., 0, 2] - m[..., 2, 0], m[..., 1, 0] - m[..., 0, 1]
+    s21, s02, s10 = m[..., 2, 1] + m[..., 1, 2], m[..., 0, 2] + m[..., 2, 0], m[..., 1, 0] + m[..., 0, 1]
+    ss = s * s
+    # 第 k 行为以第 k 个分量为主元时的 4*q_k*q（未归一化）
+    rows = np.stack([
+        np.stack([ss, s10, s02, d21], axis=-1),
+        np.stack([s10, ss, s21, d02], axis=-1),
+        np.stack([s02, s21, ss, d10], axis=-1),
+        np.stack([d21, d02, d10, ss], axis=-1),
+    ], axis=-2)
+    q = np.take_along_axis(rows, pivot[..., None, None], axis=-2)[..., 0, :] / (2 * s)[..., None]
+    q *= np.where(q[..., 3:4] < 0, -1.0, 1.0)
+    return q
+
+
+class KinematicModel:
+    """
+    编译后的运动学树：关节按树深度分层，每层在所有构型上一次性计算
+    数组：origins (J, 4, 4)、axes (J, 3)、types (J,)、parent_link/child_link (J,)
+    """
+
+    def __init__(self, root):
+        links = [link.get('name') for link in root.findall('link')]
+        self.link_names = links
+        link_index = {name: i for i, name in enumerate(links)}
+
+        joints = root.findall('joint')
+        self.joint_names = [joint.get('name') for joint in joints]
+        count = len(joints)
+        self.origins = np.zeros((count, 4, 4))
+        self.axes = np.zeros((count, 3))
+        self.types = np.zeros(count, dtype=np.int8)
+        self.parent_link = np.zeros(count, dtype=np.int64)
+        self.child_link = np.zeros(count, dtype=np.int64)
+        self.lower = np.full(count, -np.inf)
+        self.upper = np.full(count, np.inf)
+        mimic = []
+
+        for j, joint in enumerate(joints):
+            joint_type = joint.get('type', 'fixed')
+            if joint_type not in JOINT_TYPES:
+                raise ValueError(f"Unsupported joint type '{joint_type}' in joint '{joint.get('name')}'")
+            parent, child = joint.find('parent'), joint.find('child')
+            if parent is None or child is None:
+                raise ValueError(f"Joint '{joint.get('name')}' is missing parent or child")
+            try:
+                self.parent_link[j] = link_index[parent.get('link')]
+                self.child_link[j] = link_index[child.get('link')]
+            except KeyError as e:
+                raise ValueError(f"Joint '{joint.get('name')}' references unknown link {e}")
+            self.types[j] = JOINT_TYPES[joint_type]
+            self.origins[j] = origin_matrix(joint.find('origin'))
+            axis = joint.find('axis')
+            axis = _floats(axis.get('xyz') if axis is not None else None, (1, 0, 0))
+            norm = np.linalg.norm(axis)
+            self.axes[j] = axis / norm if norm > 0 else (1, 0, 0)
+            limit = joint.find('limit')
+            if limit is not None and joint_type in ('revolute', 'prismatic'):
+                self.lower[j] = float(limit.get('lower', 0))
+                self.upper[j] = float(limit.get('upper', 0))
+            mimic_el = joint.find('mimic')
+            if mimic_el is not None and self.types[j] != FIXED:
+                mimic.append((j, mimic_el.get('joint'),
+                              float(mimic_el.get('multiplier', 1)), float(mimic_el.get('offset', 0))))
+
+        # 树结构：每个连杆最多一个父关节
+        parent_joint = np.full(len(links), -1, dtype=np.int64)
+        for j in range(count):
+            if parent_joint[self.child_link[j]] != -1:
+                raise ValueError(f"Link '{links[self.child_link[j]]}' has more than one parent joint")
+            parent_joint[self.child_link[j]] = j
+        self.parent_joint = parent_joint
+        self.root_links = [i for i in range(len(links)) if parent_joint[i] == -1]
+
+        # 按深度分层（深度 = 到根的关节数），检测环
+        depth = np.full(count, -1, dtype=np.int64)
+        for j in range(count):
+            chain = []
+            k = j
+            while k != -1 and depth[k] == -1:
+                if k in chain:
+                    raise ValueError('Kinematic loop detected')
+                chain.append(k)
+                k = parent_joint[self.parent_link[k]]
+            base = -1 if k == -1 else depth[k]
+            for offset, joint_idx in enumerate(reversed(chain)):
+                depth[joint_idx] = base + 1 + offset
+        self.levels = [np.flatnonzero(depth == d) for d in range(int(depth.max()) + 1)] if count else []
+
+        # 可动关节及 mimic 映射：q_full = q @ selection + offset
+        independent = [j for j in range(count) if self.types[j] != FIXED and j not in {m[0] for m in mimic}]
+        self.movable_joints = np.array(independent, dtype=np.int64)
+        self.movable_names = [self.joint_names[j] for j in independent]
+        position = {j: i for i, j in enumerate(independent)}
+        self.selection = np.zeros((len(independent), count))
+        self.offset = np.zeros(count)
+        for i, j in enumerate(independent):
+            self.selection[i, j] = 1.0
+        joint_index = {name: j for j, name in enumerate(self.joint_names)}
+        for j, source, multiplier, offset in mimic:
+            source_j = joint_index.get(source)
+            if source_j not in position:
+                raise ValueError(f"Mimic joint '{self.joint_names[j]}' references non-movable joint '{source}'")
+            self.selection[position[source_j], j] = multiplier
+            self.offset[j] = offset
+
+    @classmethod
+    def from_file(cls, file_path):
+        return cls(ET.parse(file_path).getroot())
+
+    def expand(self, q, joint_names=None):
+        """
+        把按 joint_names 顺序给出的关节值展开成所有关节的值
+        :param q: (B, M)
+        :return: (B, J)
+        """
+        q = np.asarray(q, dtype=np.float64)
+        if q.ndim != 2:
+            raise ValueError('configurations must be a 2-D array')
+        if joint_names is not None:
+            order = {name: i for i, name in enumerate(self.movable_names)}
+            unknown = [name for name in joint_names if name not in order]
+            if unknown:
+                raise ValueError(f"Unknown or non-movable joints: {', '.join(unknown)}")
+            full = np.zeros((q.shape[0], len(self.movable_names)))
+            full[:, [order[name] for name in joint_names]] = q
+            q = full
+        if q.shape[1] != len(self.movable_names):
+            raise ValueError(f"Expected {len(self.movable_names)} joint values, got {q.shape[1]}")
+        return q @ self.selection + self.offset
+
+    def joint_motion(self, joints, values):
+        """
+        批量计算关节运动变换
+        :param joints: 关节下标 (L,)
+        :param values: 关节值 (B, L)
+        :return: (B, L, 4, 4)
+        """
+        B, L = values.shape
+        T = np.broadcast_to(np.eye(4), (B, L, 4, 4)).copy()
+        types = self.types[joints]
+        axes = self.axes[joints]
+
+        revolute = types == REVOLUTE
+        if revolute.any():
+            # Rodrigues 公式：R = I + sinθ K + (1 - cosθ) K²
+            k = axes[revolute]
+            K = np.zeros((len(k), 3, 3))
+            K[:, 0, 1], K[:, 0, 2], K[:, 1, 2] = -k[:, 2], k[:, 1], -k[:, 0]
+            K[:, 1, 0], K[:, 2, 0], K[:, 2, 1] = k[:, 2], -k[:, 1], k[:, 0]
+            K2 = K @ K
+            theta = values[:, revolute]
+            T[:, revolute, :3, :3] = (
+                np.eye(3) + np.sin(theta)[..., None, None] * K + (1 - np.cos(theta))[..., None, None] * K2
+            )
+
+        prismatic = types == PRISMATIC
+        if prismatic.any():
+            # 先取平移列的视图，避免布尔索引与标量索引混用时维度被移到最前
+            translation = T[..., :3, 3]
+            translation[:, prismatic] = values[:, prismatic, None] * axes[prismatic]
+        return T
+
+    def forward(self, q, joint_names=None):
+        """
+        批量正运动学
+        :param q: (B, M) 关节值
+        :param joint_names: q 的列对应的关节名，省略时按 movable_names 顺序
+        :return: (B, N_links, 4, 4) 各连杆在根坐标系中的位姿
+        """
+        values = self.expand(q, joint_names)
+        B = values.shape[0]
+        poses = np.broadcast_to(np.eye(4), (B, len(self.link_names), 4, 4)).copy()
+        for joints in self.levels:
+            parent_poses = poses[:, self.parent_link[joints]]
+            motion = self.joint_motion(joints, values[:, joints])
+            poses[:, self.child_link[joints]] = parent_poses @ self.origins[joints] @ motion
+        return poses
+
+
+class KinematicModelCache:
+    """编译后的运动学模型缓存（按文件变更戳校验，LRU淘汰）"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path):
+        key = str(file_path)
+        stamp = file_stamp(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        model = KinematicModel.from_file(file_path)
+        with self._lock:
+            self._entries[key] = (stamp, model)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return model
+
+
+model_cache = KinematicModelCache()
+
+
+def batch_forward_kinematics(file_path, configurations, joint_names=None, links=None, pose_format='xyzquat'):
+    """
+    对一批关节构型计算连杆位姿
+    :param file_path: URDF文件的完整路径
+    :param configurations: N 个关节向量 (N, M)
+    :param joint_names: 关节向量各列对应的关节名（可选）
+    :param links: 只返回这些连杆（可选）
+    :param pose_format: 'xyzquat'（位置 + 四元数 x,y,z,w）或 'matrix'（4x4）
+    :return: 结果字典
+    """
+    try:
+        model = model_cache.get(file_path)
+    except (ET.ParseError, ValueError) as e:
+        return {'error': f"Error compiling URDF: {str(e)}", 'status': 400}
+
+    try:
+        poses = model.forward(configurations, joint_names)
+    except ValueError as e:
+        return {'error': str(e), 'status': 400}
+
+    link_names = model.link_names
+    if links:
+        index = {name: i for i, name in enumerate(link_names)}
+        unknown = [name for name in links if name not in index]
+        if unknown:
+            return {'error': f"Unknown links: {', '.join(unknown)}", 'status': 400}
+        poses = poses[:, [index[name] for name in links]]
+        link_names = list(links)
+
+    if pose_format == 'matrix':
+        data = poses
+    elif pose_format == 'xyzquat':
+        data = np.concatenate([poses[..., :3, 3], matrix_to_quaternion(poses[..., :3, :3])], axis=-1)
+    else:
+        return {'error': "format must be 'xyzquat' or 'matrix'", 'status': 400}
+
+    return {
+        'joint_names': joint_names or model.movable_names,
+        'links': link_names,
+        'format': pose_format,
+        'poses': data.tolist(),
+        'status': 200
+    }
@@ -0,0 +1,236 @@
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+import numpy as np
+from ..utils.file_util import file_etag, prune_folder
+
+logger = logging.getLogger(__name__)
+
+LOD_LEVELS = ('low', 'medium', 'full')
+
+_BINARY_STL_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attr', '<u2')
+])
+
+
+def load_stl(file_path):
+    """
+    读取STL文件（自动识别ASCII/二进制）
+    :return: 三角形顶点数组，形状为 (N, 3, 3) 的 float32
+    """
+    with open(file_path, 'rb') as f:
+        data = f.read()
+
+    # 二进制STL：80字节头 + uint32三角形数 + 每个三角形50字节
+    if len(data) >= 84:
+        count = int(np.frombuffer(data, dtype='<u4', count=1, offset=80)[0])
+        if len(data) == 84 + count * _BINARY_STL_DTYPE.itemsize:
+            records = np.frombuffer(data, dtype=_BINARY_STL_DTYPE, count=count, offset=84)
+            return np.ascontiguousarray(records['vertices'], dtype=np.float32)
+
+    # ASCII STL：取每个 vertex 关键字后的三个数
+    tokens = np.array(data.split())
+    idx = np.flatnonzero(tokens == b'vertex')
+    if len(idx) == 0 or len(idx) % 3:
+        raise ValueError(f"Invalid STL file: {file_path}")
+    coords = tokens[idx[:, None] + np.arange(1, 4)].astype(np.float32)
+    return coords.reshape(-1, 3, 3)
+
+
+def index_triangles(triangles):
+    """
+    顶点去重，将三角形汤转换为索引网格
+    :return: (vertices (V, 3), faces (F, 3))
+    """
+    vertices, inverse = np.unique(triangles.reshape(-1, 3), axis=0, return_inverse=True)
+    return vertices, inverse.reshape(-1, 3).astype(np.int64)
+
+
+def face_normals(vertices, faces):
+    """单位面法向量（退化三角形为零向量）"""
+    tri = vertices[faces]
+    normals = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def decimate(vertices, faces, resolution):
+    """
+    顶点聚类简化：把包围盒划分成网格，同一格内的顶点合并为其均值，丢弃退化和重复的三角形
+    :param resolution: 包围盒最长边上的网格数
+    :return: (vertices, faces)
+    """
+    lo = vertices.min(axis=0)
+    extent = float((vertices.max(axis=0) - lo).max())
+    if extent <= 0 or len(faces) == 0:
+        return vertices, faces
+
+    cell = extent / resolution
+    keys = np.floor((vertices - lo) / cell).astype(np.int64)
+    _, cluster, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    cluster = cluster.reshape(-1)
+
+    new_vertices = np.zeros((len(counts), 3), dtype=np.float64)
+    np.add.at(new_vertices, cluster, vertices)
+    new_vertices = (new_vertices / counts[:, None]).astype(vertices.dtype)
+
+    new_faces = cluster[faces]
+    keep = (
+        (new_faces[:, 0] != new_faces[:, 1]) &
+        (new_faces[:, 1] != new_faces[:, 2]) &
+        (new_faces[:, 0] != new_faces[:, 2])
+    )
+    new_faces = new_faces[keep]
+
+    # 去掉重复的三角形（顶点顺序无关）
+    if len(new_faces):
+        _, unique_idx = np.unique(np.sort(new_faces, axis=1), axis=0, return_index=True)
+        new_faces = new_faces[np.sort(unique_idx)]
+    return new_vertices, new_faces
+
+
+def write_binary_stl(file_path, vertices, faces):
+    """以二进制STL写出索引网格，附带预先计算的面法向量"""
+    records = np.zeros(len(faces), dtype=_BINARY_STL_DTYPE)
+    records['normal'] = face_normals(vertices, faces)
+    records['vertices'] = vertices[faces]
+    with open(file_path, 'wb') as f:
+        f.write(b'urdf_server LOD'.ljust(80, b'\0'))
+        f.write(np.uint32(len(faces)).tobytes())
+        f.write(records.tobytes())
+
+
+class MeshLodStore:
+    """
+    STL mesh 的多级细节（LOD）派生文件
+    派生文件以原文件 ETag 命名，原文件变化后自然失效；三角形数低于阈值的 mesh 直接使用原文件，
+    无法解析的 mesh 记录失败标记，原文件变化之前不再重试；缓存目录按大小和存活时间清理
+    LOD 在后台任务中生成（schedule_lod_build），生成完成之前请求简化级别时发送原文件
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.folder = None
+        self.resolutions = {}
+        self.min_faces = 0
+        self.max_bytes = 0
+        self.max_age = 0
+        self._lock = threading.Lock()
+        self._last_prune = 0
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('MESH_LOD_ENABLED', True)
+        self.folder = Path(app.config['MESH_LOD_FOLDER'])
+        self.resolutions = dict(app.config.get('MESH_LOD_RESOLUTIONS', {'low': 32, 'medium': 128}))
+        self.min_faces = app.config.get('MESH_LOD_MIN_FACES', 5000)
+        self.max_bytes = app.config.get('MESH_LOD_MAX_BYTES', 0)
+        self.max_age = app.config.get('MESH_LOD_MAX_AGE', 0)
+        if self.enabled:
+            self.folder.mkdir(parents=True, exist_ok=True)
+        app.extensions['mesh_lod'] = self
+
+    def supports(self, file_path, level):
+        return (
+            self.enabled and level in self.resolutions and
+            Path(file_path).suffix.lower() == '.stl'
+        )
+
+    def _artifact_path(self, etag, level):
+        return self.folder / f"{etag}.{level}.stl"
+
+    def _original_marker(self, etag):
+        # mesh 已经足够小时记录标记，所有级别都直接使用原文件
+        return self.folder / f"{etag}.original"
+
+    def _failed_marker(self, etag):
+        return self.folder / f"{etag}.failed"
+
+    def lookup(self, file_path, st, level):
+        """
+        查找指定级别的LOD文件（请求中不生成，缺失时由调用方提交后台任务 schedule_lod_build）
+        :return: (LOD文件路径, 是否已有结果)；路径为None时使用原文件：不支持、mesh足够小、无法解析或尚未生成
+        """
+        if not self.supports(file_path, level):
+            return None, True
+
+        etag = file_etag(st)
+        path = self._artifact_path(etag, level)
+        if path.exists():
+            with self._lock:
+                self.hits += 1
+            return path, True
+        if self._original_marker(etag).exists() or self._failed_marker(etag).exists():
+            with self._lock:
+                self.hits += 1
+            return None, True
+        with self._lock:
+            self.misses += 1
+        return None, False
+
+    def maybe_prune(self, interval=60):
+        """距离上次清理超过 interval 秒时执行一次清理"""
+        now = time.time()
+        if now - self._last_prune < interval:
+            return
+        self._last_prune = now
+        self.prune()
+
+    def prune(self):
+        """删除过期的LOD文件和标记，并在总大小超限时按最久未修改优先淘汰"""
+        if not self.enabled or not self.folder.exists():
+            return
+        prune_folder(self.folder, self.max_bytes, self.max_age)
+
+    def build(self, file_path, st=None, run=None):
+        """
+        解析STL并生成所有LOD级别，无法解析时记录失败标记
+        :param run: run(fn, *args) 在其他地方（如进程池）执行简化，省略时在当前线程执行
+        """
+        etag = file_etag(st or os.stat(file_path))
+        if self._original_marker(etag).exists() or self._failed_marker(etag).exists():
+            return
+        targets = {
+            level: (resolution, str(self._artifact_path(etag, level)))
+            for level, resolution in self.resolutions.items()
+        }
+        if all(os.path.exists(path) for _, path in targets.values()):
+            return
+
+        try:
+            args = (str(file_path), targets, self.min_faces)
+            built = build_lod_files(*args) if run is None else run(build_lod_files, *args)
+            if not built:
+                self._original_marker(etag).touch()
+        except (OSError, ValueError) as e:
+            logger.warning("Failed to build LOD for %s: %s", file_path, e)
+            try:
+                self._failed_marker(etag).touch()
+            except OSError:
+                pass
+        self.maybe_prune()
+
+
+def build_lod_files(file_path, targets, min_faces):
+    """
+    生成各级LOD文件（模块级函数，可在进程池中执行）
+    :param targets: {级别: (网格分辨率, 输出路径)}
+    :return: 生成的级别数；三角形数低于 min_faces 时不生成，返回0
+    """
+    vertices, faces = index_triangles(load_stl(file_path))
+    if len(faces) < min_faces:
+        return 0
+
+    for resolution, path in targets.values():
+        lod_vertices, lod_faces = decimate(vertices, faces, resolution)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        write_binary_stl(tmp_path, lod_vertices, lod_faces)
+        os.replace(tmp_path, path)
+    return len(targets)
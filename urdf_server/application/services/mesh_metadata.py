@@ -0,0 +1,238 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import xml.etree.ElementTree as ET
+import numpy as np
+from .mesh_lod import load_stl
+
+logger = logging.getLogger(__name__)
+
+ANALYZABLE_EXTENSIONS = ('.stl', '.dae')
+
+
+def _summarize(vertices, triangles, unique_vertices, fmt):
+    """
+    :param vertices: 顶点坐标 (V, 3)
+    :param triangles: 三角形顶点坐标 (F, 3, 3)
+    """
+    if len(triangles):
+        edges_a = triangles[:, 1] - triangles[:, 0]
+        edges_b = triangles[:, 2] - triangles[:, 0]
+        area = float(0.5 * np.linalg.norm(np.cross(edges_a, edges_b), axis=1).sum(dtype=np.float64))
+    else:
+        area = 0.0
+    if len(vertices):
+        lower = vertices.min(axis=0).astype(np.float64)
+        upper = vertices.max(axis=0).astype(np.float64)
+        bbox = {
+            'min': lower.tolist(),
+            'max': upper.tolist(),
+            'size': (upper - lower).tolist(),
+            'center': ((upper + lower) / 2).tolist()
+        }
+    else:
+        bbox = None
+    return {
+        'format': fmt,
+        'triangles': int(len(triangles)),
+        'vertices': int(unique_vertices),
+        'bbox': bbox,
+        'surface_area': area
+    }
+
+
+def analyze_stl(file_path):
+    triangles = load_stl(file_path).astype(np.float64)
+    points = triangles.reshape(-1, 3)
+    unique_vertices = len(np.unique(points, axis=0)) if len(points) else 0
+    return _summarize(points, triangles, unique_vertices, 'stl')
+
+
+def _collada_ns(root):
+    return root.tag[:root.tag.index('}') + 1] if root.tag.startswith('{') else ''
+
+
+def load_dae(file_path):
+    """
+    读取COLLADA：汇总所有 <geometry> 的 <triangles>/<polylist>/<polygons>（多边形按扇形三角化）
+    坐标按 <asset><unit meter> 换算为米；不展开场景节点的变换与实例化
+    :return: (被引用的顶点坐标 (V, 3), 三角形顶点坐标 (F, 3, 3), 顶点数)
+    """
+    root = ET.parse(file_path).getroot()
+    ns = _collada_ns(root)
+    unit = root.find(f'{ns}asset/{ns}unit')
+    scale = float(unit.get('meter', 1)) if unit is not None else 1.0
+
+    all_vertices = []
+    all_triangles = []
+    unique_vertices = 0
+    for mesh in root.iter(f'{ns}mesh'):
+        sources = {}
+        for source in mesh.findall(f'{ns}source'):
+            array = source.find(f'{ns}float_array')
+            if array is not None and array.text:
+                accessor = source.find(f'{ns}technique_common/{ns}accessor')
+                stride = int(accessor.get('stride', 3)) if accessor is not None else 3
+                values = np.array(array.text.split(), dtype=np.float64)
+                sources[source.get('id')] = values[:len(values) // stride * stride].reshape(-1, stride)[:, :3]
+
+        vertex_sources = {}
+        for vertices in mesh.findall(f'{ns}vertices'):
+            for vertex_input in vertices.findall(f'{ns}input'):
+                if vertex_input.get('semantic') == 'POSITION':
+                    vertex_sources[vertices.get('id')] = vertex_input.get('source', '').lstrip('#')
+
+        positions_used = set()
+        for tag in ('triangles', 'polylist', 'polygons'):
+            for primitive in mesh.findall(f'{ns}{tag}'):
+                inputs = primitive.findall(f'{ns}input')
+                if not inputs:
+                    continue
+                stride = max(int(i.get('offset', 0)) for i in inputs) + 1
+                vertex_input = next((i for i in inputs if i.get('semantic') == 'VERTEX'), None)
+                if vertex_input is None:
+                    continue
+                source_id = vertex_sources.get(vertex_input.get('source', '').lstrip('#'))
+                positions = sources.get(source_id)
+                if positions is None:
+                    continue
+                offset = int(vertex_input.get('offset', 0))
+
+                if tag == 'polygons':
+                    chunks = [p.text for p in primitive.findall(f'{ns}p') if p.text]
+                    counts = [len(text.split()) // stride for text in chunks]
+                    text = ' '.join(chunks)
+                else:
+                    p = primitive.find(f'{ns}p')
+                    text = p.text if p is not None and p.text else ''
+                    counts = None
+                    if tag == 'polylist':
+                        vcount = primitive.find(f'{ns}vcount')
+                        counts = vcount.text.split() if vcount is not None and vcount.text else []
+                indices = np.array(text.split(), dtype=np.int64)
+                indices = indices[:len(indices) // stride * stride].reshape(-1, stride)[:, offset]
+
+                if counts is None:
+                    faces = indices[:len(indices) // 3 * 3].reshape(-1, 3)
+                else:
+                    # 扇形三角化：多边形 (v0, v1, ..., vn-1) -> (v0, vi, vi+1)
+                    counts = np.asarray(counts, dtype=np.int64)
+                    counts = counts[np.cumsum(counts) <= len(indices)]
+                    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+                    fan = np.maximum(counts - 2, 0)
+                    polygon = np.repeat(np.arange(len(counts)), fan)
+                    local = np.arange(fan.sum()) - np.repeat(np.cumsum(fan) - fan, fan) + 1
+                    first = starts[polygon]
+                    faces = np.stack(
+                        [indices[first], indices[first + local], indices[first + local + 1]], axis=1
+                    )
+
+                faces = faces[(faces >= 0).all(axis=1) & (faces < len(positions)).all(axis=1)]
+                all_triangles.append(positions[faces] * scale)
+                positions_used.add(source_id)
+
+        for source_id in positions_used:
+            all_vertices.append(sources[source_id] * scale)
+            unique_vertices += len(sources[source_id])
+
+    vertices = np.concatenate(all_vertices) if all_vertices else np.zeros((0, 3))
+    triangles = np.concatenate(all_triangles) if all_triangles else np.zeros((0, 3, 3))
+    return vertices, triangles, unique_vertices
+
+
+def analyze_dae(file_path):
+    vertices, triangles, unique_vertices = load_dae(file_path)
+    return _summarize(vertices, triangles, unique_vertices, 'dae')
+
+
+def analyze_mesh(file_path):
+    """按扩展名分析 mesh（模块级函数，可在进程池中执行）"""
+    suffix = Path(file_path).suffix.lower()
+    if suffix == '.stl':
+        return analyze_stl(file_path)
+    if suffix == '.dae':
+        return analyze_dae(file_path)
+    raise ValueError(f"Unsupported mesh format: {suffix}")
+
+
+class MeshMetadataStore:
+    """
+    mesh 几何信息（包围盒、三角形/顶点数、表面积）的旁路存储
+    以内容标识（resource_etag，启用内容寻址存储时为 sha256）为键，每个键一个 JSON 文件，内存中保留最近使用的条目
+    无法分析的文件保存失败标记 {'error': ...}，内容变化（标识改变）之前不再重复分析
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.folder = None
+        self.max_entries = 4096
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('MESH_METADATA_ENABLED', True)
+        self.folder = Path(app.config['MESH_METADATA_FOLDER'])
+        if self.enabled:
+            self.folder.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._entries.clear()
+        app.extensions['mesh_metadata'] = self
+
+    def supports(self, file_path):
+        return self.enabled and Path(file_path).suffix.lower() in ANALYZABLE_EXTENSIONS
+
+    def _path(self, key):
+        return self.folder / f"{key}.json"
+
+    def lookup(self, key):
+        """
+        :param key: mesh 内容标识
+        :return: 几何信息字典，尚未分析时返回None
+        """
+        with self._lock:
+            meta = self._entries.get(key)
+            if meta is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return meta
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        self._remember(key, meta)
+        return meta
+
+    def store(self, key, meta):
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+        self._remember(key, meta)
+
+    def store_failure(self, key, error):
+        """记录分析失败（格式错误、不支持的格式等）"""
+        self.store(key, {'error': str(error)})
+
+    @staticmethod
+    def is_failure(meta):
+        return 'error' in meta
+
+    def _remember(self, key, meta):
+        with self._lock:
+            self._entries[key] = meta
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
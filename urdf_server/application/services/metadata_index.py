@@ -0,0 +1,277 @@
+import os
+import sqlite3
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE, robot TEXT, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,
+    link_count INTEGER NOT NULL, joint_count INTEGER NOT NULL, mesh_count INTEGER NOT NULL, error TEXT
+);
+CREATE TABLE IF NOT EXISTS links (path TEXT NOT NULL, name TEXT);
+CREATE TABLE IF NOT EXISTS joints (
+    path TEXT NOT NULL, name TEXT, type TEXT, parent TEXT, child TEXT, lower REAL, upper REAL
+);
+CREATE TABLE IF NOT EXISTS meshes (path TEXT NOT NULL, filename TEXT);
+CREATE INDEX IF NOT EXISTS links_path ON links (path);
+CREATE INDEX IF NOT EXISTS links_name ON links (name, path);
+CREATE INDEX IF NOT EXISTS joints_path ON joints (path);
+CREATE INDEX IF NOT EXISTS joints_name ON joints (name, path);
+CREATE INDEX IF NOT EXISTS joints_type ON joints (type, path);
+CREATE INDEX IF NOT EXISTS meshes_path ON meshes (path);
+-- 全文检索表的 rowid 与 files.id 相同
+CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(robot, links, joints, meshes);
+'''
+
+
+def extract_metadata(file_path):
+    """
+    解析URDF的可检索元数据
+    :return: (机器人名, [连杆名], [(关节名, 类型, 父连杆, 子连杆, 下限, 上限)], [mesh文件名])
+    """
+    root = ET.parse(file_path).getroot()
+    links = [link.get('name') for link in root.findall('link')]
+    joints = []
+    for joint in root.findall('joint'):
+        parent, child, limit = joint.find('parent'), joint.find('child'), joint.find('limit')
+        joints.append((
+            joint.get('name'), joint.get('type'),
+            parent.get('link') if parent is not None else None,
+            child.get('link') if child is not None else None,
+            _float_or_none(limit.get('lower')) if limit is not None else None,
+            _float_or_none(limit.get('upper')) if limit is not None else None
+        ))
+    meshes = [mesh.get('filename') for mesh in root.iter('mesh') if mesh.get('filename')]
+    return root.get('name'), links, joints, meshes
+
+
+def _float_or_none(value):
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def fts_query(text):
+    """把用户输入转换为 FTS5 查询：每个词作为短语并做前缀匹配，词之间为 AND"""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"*' for term in terms if term)
+
+
+class MetadataIndex:
+    """
+    所有已上传URDF的元数据索引（SQLite + FTS5）
+    记录机器人名、连杆/关节名、关节类型与限位、引用的mesh、文件大小与修改时间
+    首次启动时全量扫描，之后由上传/保存操作增量更新；
+    每次启动时再由后台任务与上传目录对比一次（sync），在应用之外添加或修改的URDF也会被索引
+    """
+
+    VERSION = '1'
+
+    def __init__(self, app=None):
+        self.root = None
+        self.index_file = None
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.root = Path(app.config['UPLOAD_FOLDER'])
+        self.index_file = Path(app.config['METADATA_INDEX_FILE'])
+        app.extensions['metadata_index'] = self
+        conn = self._connect()
+        with conn:
+            conn.executescript(SCHEMA)
+        meta = dict(conn.execute('SELECT key, value FROM meta'))
+        if meta.get('version') != self.VERSION or meta.get('root') != str(self.root):
+            self.sync()
+            with conn:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                    (('version', self.VERSION), ('root', str(self.root)))
+                )
+
+    def _connect(self):
+        # sqlite 连接不能跨线程共享，每个线程各自持有一个连接
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.path != self.index_file:
+            conn = sqlite3.connect(self.index_file, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.path = conn, self.index_file
+        return conn
+
+    def _delete(self, conn, relative_path):
+        row = conn.execute('SELECT id FROM files WHERE path = ?', (relative_path,)).fetchone()
+        if row is None:
+            return
+        conn.execute('DELETE FROM search_fts WHERE rowid = ?', row)
+        for table in ('files', 'links', 'joints', 'meshes'):
+            conn.execute(f'DELETE FROM {table} WHERE path = ?', (relative_path,))
+
+    def _index_file(self, conn, relative_path, st):
+        full_path = self.root / relative_path
+        self._delete(conn, relative_path)
+        try:
+            robot, links, joints, meshes = extract_metadata(full_path)
+            error = None
+        except (ET.ParseError, OSError) as e:
+            robot, links, joints, meshes = None, [], [], []
+            error = str(e)
+
+        file_id = conn.execute(
+            'INSERT INTO files (path, robot, size, mtime_ns, link_count, joint_count, mesh_count, error) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (relative_path, robot, st.st_size, st.st_mtime_ns, len(links), len(joints), len(meshes), error)
+        ).lastrowid
+        conn.executemany('INSERT INTO links (path, name) VALUES (?, ?)', ((relative_path, name) for name in links))
+        conn.executemany(
+            'INSERT INTO joints (path, name, type, parent, child, lower, upper) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            ((relative_path,) + joint for joint in joints)
+        )
+        conn.executemany(
+            'INSERT INTO meshes (path, filename) VALUES (?, ?)', ((relative_path, mesh) for mesh in meshes)
+        )
+        conn.execute(
+            'INSERT INTO search_fts (rowid, robot, links, joints, meshes) VALUES (?, ?, ?, ?, ?)',
+            (
+                file_id, robot or '',
+                ' '.join(name for name in links if name),
+                ' '.join(f"{joint[0] or ''} {joint[1] or ''}" for joint in joints),
+                ' '.join(meshes)
+            )
+        )
+
+    def update_paths(self, relative_paths):
+        """
+        增量更新：重新索引写入的URDF，已不存在的文件从索引中删除
+        :param relative_paths: 相对于上传目录的文件路径列表（非URDF文件被忽略）
+        """
+        paths = [str(p).replace('\\', '/') for p in relative_paths if str(p).lower().endswith('.urdf')]
+        if not paths:
+            return
+        conn = self._connect()
+        with self._write_lock, conn:
+            for relative_path in paths:
+                try:
+                    st = os.stat(self.root / relative_path)
+                except OSError:
+                    self._delete(conn, relative_path)
+                    continue
+                self._index_file(conn, relative_path, st)
+
+    def sync(self):
+        """
+        与上传目录全量对比：新增或 size/mtime 变化的文件重新索引，已删除的文件移出索引
+        :return: (重新索引的文件数, 删除的文件数)
+        """
+        conn = self._connect()
+        known = {path: (size, mtime_ns) for path, size, mtime_ns in conn.execute(
+            'SELECT path, size, mtime_ns FROM files'
+        )}
+        found = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.lower().endswith('.urdf'):
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(full_path)
+                except OSError:
+                    continue
+                found[os.path.relpath(full_path, self.root).replace('\\', '/')] = st
+
+        changed = [path for path, st in found.items() if known.get(path) != (st.st_size, st.st_mtime_ns)]
+        removed = [path for path in known if path not in found]
+        with self._write_lock, conn:
+            for relative_path in removed:
+                self._delete(conn, relative_path)
+            for relative_path in changed:
+                self._index_file(conn, relative_path, found[relative_path])
+        if changed or removed:
+            logger.info("Metadata index synced: %d indexed, %d removed", len(changed), len(removed))
+        return len(changed), len(removed)
+
+    def search(self, text=None, robot=None, link=None, joint=None, joint_type=None, mesh=None,
+               limit=50, offset=0):
+        """
+        检索URDF文件，各条件之间为 AND
+        :param text: 在机器人名/连杆/关节/mesh 中全文检索（前缀匹配）
+        :param robot: 机器人名（全文检索）
+        :param link: 连杆名（精确匹配）
+        :param joint: 关节名（精确匹配）
+        :param joint_type: 关节类型（精确匹配）
+        :param mesh: mesh文件名（全文检索）
+        :return: (结果列表, 总数)
+        """
+        clauses = []
+        params = []
+        match = []
+        for column, value in ((None, text), ('robot', robot), ('meshes', mesh)):
+            query = fts_query(value) if value else ''
+            if query:
+                match.append(f'{column} : ({query})' if column else f'({query})')
+        source = 'files f'
+        if match:
+            # 有全文条件时以 FTS 结果驱动查询
+            source = 'search_fts JOIN files f ON f.id = search_fts.rowid'
+            clauses.append('search_fts MATCH ?')
+            params.append(' AND '.join(match))
+        for value, condition in (
+            (link, 'EXISTS (SELECT 1 FROM links l WHERE l.name = ? AND l.path = f.path)'),
+            (joint, 'EXISTS (SELECT 1 FROM joints j WHERE j.name = ? AND j.path = f.path)'),
+            (joint_type, 'EXISTS (SELECT 1 FROM joints j WHERE j.type = ? AND j.path = f.path)'),
+        ):
+            if value:
+                clauses.append(condition)
+                params.append(value)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        conn = self._connect()
+        total = conn.execute(f'SELECT COUNT(*) FROM {source} {where}', params).fetchone()[0]
+        rows = conn.execute(
+            'SELECT f.path, f.robot, f.size, f.mtime_ns, f.link_count, f.joint_count, f.mesh_count, f.error '
+            f'FROM {source} {where} ORDER BY f.path LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        ).fetchall()
+        results = [{
+            'path': path,
+            'robot': robot_name,
+            'size': size,
+            'modified': mtime_ns / 1e9,
+            'link_count': link_count,
+            'joint_count': joint_count,
+            'mesh_count': mesh_count,
+            'error': error
+        } for path, robot_name, size, mtime_ns, link_count, joint_count, mesh_count, error in rows]
+        return results, total
+
+    def describe(self, relative_path):
+        """返回单个文件的完整索引记录（连杆、关节及限位、mesh），不存在时返回None"""
+        conn = self._connect()
+        row = conn.execute(
+            'SELECT robot, size, mtime_ns, error FROM files WHERE path = ?', (relative_path,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'path': relative_path,
+            'robot': row[0],
+            'size': row[1],
+            'modified': row[2] / 1e9,
+            'error': row[3],
+            'links': [name for (name,) in conn.execute('SELECT name FROM links WHERE path = ?', (relative_path,))],
+            'joints': [
+                {'name': name, 'type': joint_type, 'parent': parent, 'child': child, 'lower': lower, 'upper': upper}
+                for name, joint_type, parent, child, lower, upper in conn.execute(
+                    'SELECT name, type, parent, child, lower, upper FROM joints WHERE path = ?', (relative_path,)
+                )
+            ],
+            'meshes': [name for (name,) in conn.execute('SELECT filename FROM meshes WHERE path = ?', (relative_path,))]
+        }
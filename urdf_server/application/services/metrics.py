@@ -0,0 +1,245 @@
+import io
+import time
+import pstats
+import bisect
+import logging
+import cProfile
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from flask import current_app, request, g
+
+logger = logging.getLogger(__name__)
+
+# 从 0.1ms 到 10s，覆盖缓存命中的微秒级操作和大文件解析
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} counter")
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in sorted(values):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+
+
+class Histogram:
+    """
+    固定分桶的直方图：每次观测只做一次二分查找和几次加法
+    桶内保存非累积计数，导出时再累加为 Prometheus 的 le 语义
+    """
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [各桶计数..., +Inf 计数, 总和]
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        with self._lock:
+            snapshot = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                label_text = _format_labels(self.labelnames, labels, (('le', bound),))
+                lines.append(f"{self.name}_bucket{label_text} {cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {series[-1]}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+
+
+class Metrics:
+    """
+    进程内的运行指标，以 Prometheus 文本格式导出：
+      - 每个请求的次数、耗时和响应字节数（按视图函数区分）
+      - 热点操作的耗时（目录扫描、package 查找、XML 解析/序列化、send_file）
+      - 各缓存的命中/未命中次数（导出时从缓存对象读取，不增加请求路径上的开销）
+    请求带 X-Profile 头且允许分析时，用 cProfile 记录该请求并保存摘要
+    """
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.profiling = None
+        self.profile_folder = None
+        self.profile_limit = 40
+        self._caches = {}
+        self._gauges = {}
+        self._profile_lock = threading.Lock()
+        self.requests = Counter(
+            'urdf_server_requests_total', 'HTTP requests by endpoint, method and status',
+            ('endpoint', 'method', 'status')
+        )
+        self.request_seconds = Histogram(
+            'urdf_server_request_duration_seconds', 'Time spent in the view until the response is returned',
+            ('endpoint',)
+        )
+        self.response_bytes = Counter(
+            'urdf_server_response_bytes_total', 'Response body bytes (responses with a known length)',
+            ('endpoint',)
+        )
+        self.operation_seconds = Histogram(
+            'urdf_server_operation_duration_seconds', 'Time spent in instrumented operations',
+            ('operation',)
+        )
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', True)
+        self.profiling = app.config.get('REQUEST_PROFILING')
+        self.profile_folder = Path(app.config['PROFILE_FOLDER'])
+        self.profile_limit = app.config.get('PROFILE_STATS_LIMIT', self.profile_limit)
+        if self.enabled:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+            app.teardown_request(self._teardown_request)
+        app.extensions['metrics'] = self
+
+    def register_cache(self, name, cache):
+        """登记一个带 hits/misses 计数的缓存，导出时读取"""
+        self._caches[name] = cache
+
+    def register_gauge(self, name, help_text, collect):
+        """
+        登记一个导出时计算的量
+        :param collect: 返回 {标签值: 数值} 的函数，标签名为 state
+        """
+        self._gauges[name] = (help_text, collect)
+
+    @contextmanager
+    def timer(self, operation):
+        """记录 with 块的耗时"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.operation_seconds.observe((operation,), time.perf_counter() - started)
+
+    def timed(self, operation, fn):
+        """包装函数，记录每次调用的耗时"""
+        def wrapper(*args, **kwargs):
+            with self.timer(operation):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        # 未配置 REQUEST_PROFILING 时跟随调试模式
+        profiling = current_app.debug if self.profiling is None else self.profiling
+        if profiling and request.headers.get('X-Profile'):
+            # cProfile 同一时间只分析一个请求
+            if self._profile_lock.acquire(blocking=False):
+                g.profiler = cProfile.Profile()
+                g.profiler.enable()
+
+    def _after_request(self, response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self._profile_lock.release()
+            response.headers['X-Profile-File'] = self._save_profile(profiler)
+
+        endpoint = request.endpoint or 'unmatched'
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            self.request_seconds.observe((endpoint,), time.perf_counter() - started)
+        self.requests.inc((endpoint, request.method, str(response.status_code)))
+        if response.content_length and request.method != 'HEAD':
+            self.response_bytes.inc((endpoint,), response.content_length)
+        return response
+
+    def _teardown_request(self, exc):
+        # 未处理的异常不会经过 after_request，这里确保分析器停止、锁被释放
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self._profile_lock.release()
+
+    def _save_profile(self, profiler):
+        """
+        保存请求的 cProfile 摘要（按累计耗时排序）
+        流式响应的内容在视图返回之后才生成，不包含在内
+        :return: 摘要文件名
+        """
+        out = io.StringIO()
+        out.write(f"{request.method} {request.full_path}\n\n")
+        stats = pstats.Stats(profiler, stream=out)
+        stats.sort_stats('cumulative').print_stats(self.profile_limit)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unmatched'}-{threading.get_ident()}.txt"
+        self.profile_folder.mkdir(parents=True, exist_ok=True)
+        (self.profile_folder / name).write_text(out.getvalue(), encoding='utf-8')
+        logger.info("Profiled %s %s -> %s", request.method, request.path, name)
+        return name
+
+    def render(self):
+        """导出所有指标（Prometheus 文本格式 0.0.4）"""
+        lines = []
+        self.requests.render(lines)
+        self.request_seconds.render(lines)
+        self.response_bytes.render(lines)
+        self.operation_seconds.render(lines)
+
+        caches = sorted(self._caches.items())
+        for metric, attr, help_text in (
+            ('urdf_server_cache_hits_total', 'hits', 'Cache lookups served from the cache'),
+            ('urdf_server_cache_misses_total', 'misses', 'Cache lookups that had to compute or load'),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for name, cache in caches:
+                lines.append(f'{metric}{{cache="{name}"}} {getattr(cache, attr)}')
+        lines.append('# HELP urdf_server_cache_hit_ratio Hits / (hits + misses) since start')
+        lines.append('# TYPE urdf_server_cache_hit_ratio gauge')
+        for name, cache in caches:
+            total = cache.hits + cache.misses
+            lines.append(f'urdf_server_cache_hit_ratio{{cache="{name}"}} {cache.hits / total if total else 0.0}')
+
+        for metric, (help_text, collect) in sorted(self._gauges.items()):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for state, value in sorted(collect().items()):
+                lines.append(f'{metric}{{state="{_escape(state)}"}} {value}')
+        return '\n'.join(lines) + '\n'
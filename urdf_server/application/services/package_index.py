@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from ..utils.file_util import is_within
+
+
+class PackageIndex:
+    """
+    package:// 解析索引：目录名 -> 该名称在上传目录中出现的所有目录（相对路径）
+    索引只在首次启动时全量扫描一次，之后由上传/保存操作增量更新，并持久化到磁盘；
+    在应用之外直接复制到上传目录的 package 没有经过上传钩子，解析未命中时重新扫描（每 rescan_interval 秒最多一次）
+    启用共享缓存（多进程部署）时索引保存在共享的 SQLite 表中，任一进程的更新对其他进程立即可见；
+    此时 PACKAGE_INDEX_FILE 只用于在共享表为空时导入，之后的增量更新不再写回该文件
+    """
+
+    VERSION = 1
+
+    def __init__(self, app=None):
+        self.root = None
+        self.index_file = None
+        self._packages = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.shared = None
+        self.rescan_interval = 60
+        self._last_rescan = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.root = Path(app.config['UPLOAD_FOLDER'])
+        self.index_file = Path(app.config['PACKAGE_INDEX_FILE'])
+        self.rescan_interval = app.config.get('PACKAGE_INDEX_RESCAN_INTERVAL', self.rescan_interval)
+        store = app.extensions.get('shared_store')
+        self.shared = store if store is not None and store.enabled else None
+        app.extensions['package_index'] = self
+        if self.shared is not None and self.shared.packages_loaded():
+            return
+        if not self.load():
+            self.rebuild()
+        if self.shared is not None:
+            # 首个启动的进程把本地快照导入共享表
+            self.shared.replace_packages(self._packages)
+
+    def load(self):
+        """
+        从磁盘加载索引快照
+        :return: 快照有效且与当前上传目录匹配时返回True
+        """
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if data.get('version') != self.VERSION or data.get('root') != str(self.root):
+            return False
+
+        with self._lock:
+            self._packages = {name: set(dirs) for name, dirs in data.get('packages', {}).items()}
+            self._dirty = False
+        return True
+
+    @classmethod
+    def from_snapshot(cls, root, packages):
+        """
+        由 snapshot() 的结果构造只读副本（如在校验子进程中使用），不会写回磁盘
+        """
+        index = cls()
+        index.root = Path(root)
+        index._packages = {name: set(dirs) for name, dirs in packages.items()}
+        return index
+
+    def snapshot(self):
+        """当前索引的可序列化副本：目录名 -> 相对路径列表"""
+        if self.shared is not None:
+            return {name: sorted(dirs) for name, dirs in self.shared.all_packages().items()}
+        with self._lock:
+            return {name: sorted(dirs) for name, dirs in self._packages.items()}
+
+    def save(self):
+        """将索引原子地写入磁盘（写临时文件后替换）"""
+        if self.index_file is None:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                'version': self.VERSION,
+                'root': str(self.root),
+                'packages': {name: sorted(dirs) for name, dirs in self._packages.items()}
+            }
+            self._dirty = False
+
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.index_file.with_name(self.index_file.name + '.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.index_file)
+        except OSError:
+            with self._lock:
+                self._dirty = True
+
+    def rebuild(self):
+        """全量扫描上传目录，重建索引"""
+        packages = {}
+        for dirpath, dirnames, _ in os.walk(self.root):
+            for dirname in dirnames:
+                relative_dir = os.path.relpath(os.path.join(dirpath, dirname), self.root)
+                packages.setdefault(dirname, set()).add(relative_dir.replace('\\', '/'))
+
+        with self._lock:
+            self._packages = packages
+            self._dirty = True
+        self.save()
+        if self.shared is not None:
+            self.shared.replace_packages(packages)
+
+    def add_path(self, relative_path, is_dir=False):
+        """
+        登记新写入的文件（或目录）所在的各级目录
+        :param relative_path: 相对于上传目录的路径
+        :param is_dir: relative_path 本身是否为目录
+        """
+        parts = Path(str(relative_path).replace('\\', '/')).parts
+        if not is_dir:
+            parts = parts[:-1]
+
+        if self.shared is not None:
+            self.shared.add_packages([(parts[i], '/'.join(parts[:i + 1])) for i in range(len(parts))])
+            return
+        with self._lock:
+            for i in range(len(parts)):
+                relative_dir = '/'.join(parts[:i + 1])
+                dirs = self._packages.setdefault(parts[i], set())
+                if relative_dir not in dirs:
+                    dirs.add(relative_dir)
+                    self._dirty = True
+
+    def roots(self, package_name):
+        """
+        返回名为 package_name 的所有目录（相对路径），浅层目录优先
+        """
+        if self.shared is not None:
+            dirs = self.shared.package_dirs(package_name)
+        else:
+            with self._lock:
+                dirs = list(self._packages.get(package_name, ()))
+        return sorted(dirs, key=lambda d: (d.count('/'), d))
+
+    def resolve(self, target_path):
+        """
+        解析 package 后的路径（如 staubli_tx2_90_support/meshes/...）
+        :return: 找到的文件完整路径，如果未找到或位于上传目录之外返回None
+        """
+        target_path = target_path.replace('\\', '/')
+        package_name, _, rest = target_path.partition('/')
+        if not rest:
+            return None
+
+        found = self._find(package_name, rest)
+        if found is None and self._rescan_due():
+            self.rebuild()
+            found = self._find(package_name, rest)
+        return found
+
+    def _rescan_due(self):
+        now = time.monotonic()
+        with self._lock:
+            if self.index_file is None or (
+                    self._last_rescan is not None and now - self._last_rescan < self.rescan_interval):
+                return False
+            self._last_rescan = now
+        return True
+
+    def _find(self, package_name, rest):
+        stale = []
+        found = None
+        for relative_dir in self.roots(package_name):
+            package_dir = self.root / relative_dir
+            full_path = package_dir / rest
+            # rest 中的 ../ 或符号链接不能指向上传目录之外
+            if full_path.is_file() and is_within(full_path, self.root):
+                found = full_path
+                break
+            if not package_dir.is_dir():
+                stale.append(relative_dir)
+
+        # 清理已被删除的目录
+        if stale and self.shared is not None:
+            self.shared.remove_packages(package_name, stale)
+        elif stale:
+            with self._lock:
+                dirs = self._packages.get(package_name, set())
+                dirs.difference_update(stale)
+                if not dirs:
+                    self._packages.pop(package_name, None)
+                self._dirty = True
+            self.save()
+
+        return found
@@ -0,0 +1,139 @@
+import os
+from concurrent.futures import BrokenExecutor
+from pathlib import Path
+from flask import current_app
+from ..extensions import (
+    compressed_variants, metadata_index, mesh_metadata, mesh_lod, job_queue, urdf_versions, blob_store
+)
+from .mesh_metadata import analyze_mesh
+
+# 上传后的派生数据（压缩版本、元数据索引、mesh 几何信息）在后台任务中生成，上传请求不再等待
+
+
+def precompress_job(ctx, path):
+    """为上传的 mesh 生成压缩版本，压缩本身在进程池中执行"""
+    full_path = Path(current_app.config['UPLOAD_FOLDER']) / path
+    try:
+        st = os.stat(full_path)
+    except FileNotFoundError:
+        return {'path': path, 'skipped': True}
+    compressed_variants.build(full_path, st, run=ctx.run_cpu)
+    return {'path': path}
+
+
+def build_lod_job(ctx, path):
+    """为请求过简化级别的 mesh 生成各级LOD文件，简化本身在进程池中执行"""
+    full_path = Path(current_app.config['UPLOAD_FOLDER']) / path
+    try:
+        st = os.stat(full_path)
+    except FileNotFoundError:
+        return {'path': path, 'skipped': True}
+    mesh_lod.build(full_path, st, run=ctx.run_cpu)
+    return {'path': path}
+
+
+def index_metadata_job(ctx, path):
+    """更新单个URDF的元数据索引"""
+    metadata_index.update_paths([path])
+    return {'path': path}
+
+
+def analyze_mesh_job(ctx, path):
+    """分析 mesh 的包围盒、三角形数和表面积，解析与计算在进程池中执行"""
+    from .file_service import resource_etag  # file_service 在模块级导入了本模块
+    full_path = Path(current_app.config['UPLOAD_FOLDER']) / path
+    try:
+        st = os.stat(full_path)
+    except FileNotFoundError:
+        return {'path': path, 'skipped': True}
+    key = resource_etag(full_path, st)
+    if mesh_metadata.lookup(key) is None:
+        try:
+            meta = ctx.run_cpu(analyze_mesh, str(full_path))
+        except BrokenExecutor:
+            # 进程池异常与文件无关，下次请求时重新提交
+            raise
+        except Exception as e:
+            mesh_metadata.store_failure(key, e)
+            raise
+        mesh_metadata.store(key, meta)
+    return {'path': path, 'key': key}
+
+
+def compact_versions_job(ctx, path):
+    """删除URDF超出保留数量的旧版本"""
+    full_path = Path(current_app.config['UPLOAD_FOLDER']) / path
+    return {'path': path, 'removed': urdf_versions.compact(full_path)}
+
+
+def sync_metadata_job(ctx):
+    """元数据索引与上传目录全量对比"""
+    indexed, removed = metadata_index.sync()
+    return {'indexed': indexed, 'removed': removed}
+
+
+def collect_blobs_job(ctx):
+    """回收不再被引用的 blob"""
+    return {'removed': blob_store.collect_garbage()}
+
+
+def register_jobs(queue):
+    queue.register('precompress', precompress_job)
+    queue.register('build_lod', build_lod_job)
+    queue.register('index_metadata', index_metadata_job)
+    queue.register('analyze_mesh', analyze_mesh_job)
+    queue.register('compact_versions', compact_versions_job)
+    queue.register('collect_blobs', collect_blobs_job)
+    queue.register('sync_metadata', sync_metadata_job)
+
+
+def schedule_startup_jobs():
+    """
+    服务启动时提交的任务：元数据索引与上传目录同步一次（只比较 size/mtime，不阻塞启动）
+    :return: 任务ID列表
+    """
+    return [job_queue.submit('sync_metadata')]
+
+
+def schedule_lod_build(relative_path):
+    """LOD文件缺失时提交生成任务（重复提交会合并为一个任务）"""
+    return job_queue.submit('build_lod', path=str(relative_path).replace('\\', '/'))
+
+
+def schedule_mesh_analysis(relative_path):
+    """为尚未分析的 mesh 提交分析任务（重复提交会合并为一个任务）"""
+    return job_queue.submit('analyze_mesh', path=str(relative_path).replace('\\', '/'))
+
+
+def schedule_version_compaction(relative_path, version_count):
+    """
+    版本数超过保留数量一定比例后提交压缩任务，避免每次保存都触发
+    :return: 任务ID列表
+    """
+    if version_count <= urdf_versions.keep + max(1, urdf_versions.keep // 10):
+        return []
+    return [job_queue.submit('compact_versions', path=str(relative_path).replace('\\', '/'))]
+
+
+def schedule_post_processing(relative_paths, precompress=True):
+    """
+    为写入的文件提交后台任务
+    :param relative_paths: 相对于上传目录的文件路径列表
+    :param precompress: 是否为其中的 mesh 生成压缩版本
+    :return: 任务ID列表
+    """
+    job_ids = []
+    for relative_path in relative_paths:
+        relative_path = str(relative_path).replace('\\', '/')
+        if relative_path.lower().endswith('.urdf'):
+            job_ids.append(job_queue.submit('index_metadata', path=relative_path))
+            continue
+        # 这里只按扩展名筛选，文件大小在任务中检查
+        if precompress and compressed_variants.is_compressible(relative_path, compressed_variants.min_size):
+            job_ids.append(job_queue.submit('precompress', path=relative_path))
+        if mesh_metadata.supports(relative_path):
+            job_ids.append(schedule_mesh_analysis(relative_path))
+    # 写入会覆盖旧文件，按间隔顺带回收不再引用的 blob
+    if blob_store.gc_due():
+        job_ids.append(job_queue.submit('collect_blobs'))
+    return job_ids
\ No newline at end of file
@@ -0,0 +1,215 @@
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, used REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (namespace, used);
+CREATE TABLE IF NOT EXISTS generations (namespace TEXT PRIMARY KEY, value INTEGER NOT NULL);
+-- package 索引：目录名 -> 目录相对路径
+CREATE TABLE IF NOT EXISTS packages (name TEXT NOT NULL, dir TEXT NOT NULL, PRIMARY KEY (name, dir));
+'''
+
+# 超过该大小的值压缩后保存
+COMPRESS_THRESHOLD = 4096
+
+
+def encode_value(value):
+    data = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if len(data) >= COMPRESS_THRESHOLD:
+        return b'z' + zlib.compress(data, 1)
+    return b'j' + data
+
+
+def decode_value(blob):
+    blob = bytes(blob)
+    data = zlib.decompress(blob[1:]) if blob[:1] == b'z' else blob[1:]
+    return json.loads(data)
+
+
+class SharedStore:
+    """
+    多个 worker 进程共享的缓存层（SQLite WAL + mmap 读取，所有进程读同一份页缓存）
+      - entries：按命名空间保存的缓存条目（处理后的URDF、目录列表），作为各进程内存 LRU 之后的第二级缓存；
+        条目自带文件变更戳，读出后与内存条目同样校验，不会返回过期内容
+      - generations：按命名空间的失效计数，任一进程写入文件后递增，其他进程据此丢弃内存中的条目
+      - packages：package 索引，所有进程看到同一份，上传后立即对其他进程可见
+    数据库文件在重启后保留，新启动的进程从中预热最近使用的条目，不必各自重新解析
+    """
+
+    VERSION = '1'
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.db_file = None
+        self.max_entries = 4096
+        self.warm_entries = 256
+        self.mmap_size = 256 * 1024 * 1024
+        self._local = threading.local()
+        self._touched = {}
+        self._lock = threading.Lock()  # 保护 _touched 与命中计数
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('SHARED_CACHE_ENABLED', False)
+        self.db_file = Path(app.config['SHARED_CACHE_FILE'])
+        self.max_entries = app.config.get('SHARED_CACHE_MAX_ENTRIES', self.max_entries)
+        self.warm_entries = app.config.get('SHARED_CACHE_WARM_ENTRIES', self.warm_entries)
+        self.mmap_size = app.config.get('SHARED_CACHE_MMAP_SIZE', self.mmap_size)
+        if self.enabled:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            conn = self._connect()
+            with conn:
+                conn.executescript(SCHEMA)
+            # 上传目录变化（或格式升级）后缓存内容不再适用
+            meta = dict(conn.execute('SELECT key, value FROM meta'))
+            root = str(Path(app.config['UPLOAD_FOLDER']))
+            if meta.get('version') != self.VERSION or meta.get('root') != root:
+                with conn:
+                    conn.execute('DELETE FROM entries')
+                    conn.execute('DELETE FROM packages')
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                        (('version', self.VERSION), ('root', root), ('packages', ''))
+                    )
+        app.extensions['shared_store'] = self
+
+    def _connect(self):
+        # sqlite 连接不能跨线程共享，每个线程各自持有一个连接（fork 之后也会在子进程中重新建立）
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.path != self.db_file:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+            self._local.conn, self._local.path = conn, self.db_file
+        return conn
+
+    def get(self, namespace, key):
+        """:return: 保存的值，不存在时返回 None"""
+        row = self._connect().execute(
+            'SELECT value FROM entries WHERE namespace = ? AND key = ?', (namespace, key)
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._touch(namespace, key)
+        return decode_value(row[0])
+
+    def _touch(self, namespace, key, interval=60):
+        # 使用时间只用于预热和淘汰的排序，同一条目每分钟最多更新一次，读取路径上基本没有写入
+        now = time.time()
+        with self._lock:
+            if now - self._touched.get((namespace, key), 0) < interval:
+                return
+            self._touched[(namespace, key)] = now
+        try:
+            with self._connect() as conn:
+                conn.execute('UPDATE entries SET used = ? WHERE namespace = ? AND key = ?', (now, namespace, key))
+        except sqlite3.OperationalError as e:
+            logger.debug("Shared cache touch skipped: %s", e)
+
+    def put(self, namespace, key, value):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries (namespace, key, value, used) VALUES (?, ?, ?, ?)',
+                    (namespace, key, encode_value(value), time.time())
+                )
+        except sqlite3.OperationalError as e:
+            # 共享层只是加速，写入失败（如其他进程长时间持有写锁）不影响请求
+            logger.warning("Shared cache write failed: %s", e)
+            return
+        self._maybe_evict(namespace)
+
+    def _maybe_evict(self, namespace):
+        conn = self._connect()
+        count = conn.execute('SELECT COUNT(*) FROM entries WHERE namespace = ?', (namespace,)).fetchone()[0]
+        # 超出上限一成后再批量淘汰最久未使用的条目
+        if count <= self.max_entries + self.max_entries // 10:
+            return
+        with conn:
+            conn.execute(
+                'DELETE FROM entries WHERE namespace = ? AND key IN ('
+                'SELECT key FROM entries WHERE namespace = ? ORDER BY used LIMIT ?)',
+                (namespace, namespace, count - self.max_entries)
+            )
+
+    def delete(self, namespace, key):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (namespace, key))
+
+    def recent(self, namespace, limit=None):
+        """
+        最近使用的条目，用于启动时预热内存缓存
+        :return: [(key, value)]，按使用时间从旧到新（依次放入 LRU 后最新的在末尾）
+        """
+        rows = self._connect().execute(
+            'SELECT key, value FROM entries WHERE namespace = ? ORDER BY used DESC LIMIT ?',
+            (namespace, self.warm_entries if limit is None else limit)
+        ).fetchall()
+        return [(key, decode_value(value)) for key, value in reversed(rows)]
+
+    def generation(self, namespace):
+        row = self._connect().execute(
+            'SELECT value FROM generations WHERE namespace = ?', (namespace,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, namespace):
+        """递增命名空间的失效计数，所有进程中依赖旧计数的条目失效"""
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO generations (namespace, value) VALUES (?, 1) '
+                'ON CONFLICT (namespace) DO UPDATE SET value = value + 1',
+                (namespace,)
+            )
+
+    # ---- package 索引 ----
+
+    def packages_loaded(self):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'packages'").fetchone()
+        return bool(row and row[0])
+
+    def replace_packages(self, packages):
+        """:param packages: {目录名: 相对路径集合}"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM packages')
+            conn.executemany(
+                'INSERT OR IGNORE INTO packages (name, dir) VALUES (?, ?)',
+                ((name, relative_dir) for name, dirs in packages.items() for relative_dir in dirs)
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('packages', '1')")
+
+    def add_packages(self, pairs):
+        """:param pairs: [(目录名, 相对路径)]"""
+        with self._connect() as conn:
+            conn.executemany('INSERT OR IGNORE INTO packages (name, dir) VALUES (?, ?)', pairs)
+
+    def remove_packages(self, name, dirs):
+        with self._connect() as conn:
+            conn.executemany('DELETE FROM packages WHERE name = ? AND dir = ?', ((name, d) for d in dirs))
+
+    def package_dirs(self, name):
+        return [row[0] for row in self._connect().execute('SELECT dir FROM packages WHERE name = ?', (name,))]
+
+    def all_packages(self):
+        packages = {}
+        for name, relative_dir in self._connect().execute('SELECT name, dir FROM packages'):
+            packages.setdefault(name, []).append(relative_dir)
+        return packages
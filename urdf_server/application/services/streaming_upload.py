@@ -0,0 +1,140 @@
+import logging
+from pathlib import Path
+from flask import current_app
+from werkzeug.sansio.multipart import MultipartDecoder, File, Field, Data, Epilogue, NeedData
+from ..extensions import blob_store
+from .file_service import safe_upload_path, notify_files_written
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 256 * 1024
+
+
+def _finish_file(progress, upload_id, display_name, writer, save_path):
+    """在线程池中完成单个文件：提交 blob / 替换目标文件（压缩版本由后台任务生成）"""
+    progress.update(upload_id, display_name, status='writing')
+    try:
+        writer.commit(save_path)
+    except Exception as e:
+        progress.update(upload_id, display_name, status='error', error=str(e))
+        raise
+    progress.update(upload_id, display_name, status='done')
+
+
+def handle_streaming_folder_upload(uploader, stream, boundary, upload_id=None):
+    """
+    流式处理文件夹上传：multipart 的每个部分到达时直接写入磁盘（不经 Werkzeug 暂存），每个目录只创建一次
+    文件数据（连同 sha256 计算）在请求线程中随请求体顺序写入临时文件，请求体本身只能顺序读取；
+    每个文件收完后交给有界线程池完成提交（blob 去重、硬链接/替换目标文件、写清单），与后续文件的接收并行
+    :param uploader: StreamingUploader
+    :param stream: 请求体输入流
+    :param boundary: multipart 边界
+    :param upload_id: 客户端指定的上传ID，用于查询进度
+    :return: uploaded_files（filename 为相对路径，path 为完整路径）、upload_id、jobs，
+             部分文件失败时 status 为400并附带 errors
+    """
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+    progress = uploader.progress
+    upload_id = progress.start(upload_id)
+
+    decoder = MultipartDecoder(
+        boundary.encode('latin-1'),
+        max_form_memory_size=current_app.config.get('MAX_FORM_MEMORY_SIZE', 500_000),
+        max_parts=current_app.config.get('MAX_FORM_PARTS', 100_000)
+    )
+    created_dirs = set()
+    pending = []
+    errors = []
+    current = None  # (原始文件名, 相对路径, 目标路径, writer)；None 表示跳过当前部分
+    saw_file_field = False
+
+    def start_part(event):
+        if event.name != 'files' or not event.filename:
+            return None
+        safe_path = safe_upload_path(event.filename)
+        save_path = upload_folder / safe_path
+        parent = save_path.parent
+        if parent not in created_dirs:
+            parent.mkdir(parents=True, exist_ok=True)
+            created_dirs.add(parent)
+        display_name = str(safe_path)
+        progress.update(upload_id, display_name, status='receiving', received=0)
+        return (event.filename, safe_path, save_path, blob_store.open_writer(save_path))
+
+    try:
+        finished = False
+        while not finished:
+            chunk = stream.read(READ_SIZE)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, NeedData):
+                if isinstance(event, Epilogue):
+                    finished = True
+                    break
+                if isinstance(event, File):
+                    saw_file_field = saw_file_field or event.name == 'files'
+                    try:
+                        current = start_part(event)
+                    except Exception as e:
+                        errors.append({'file': event.filename, 'error': str(e)})
+                        current = None
+                elif isinstance(event, Field):
+                    current = None
+                elif isinstance(event, Data) and current is not None:
+                    filename, safe_path, save_path, writer = current
+                    try:
+                        writer.write(event.data)
+                        progress.add_received(upload_id, str(safe_path), len(event.data))
+                    except Exception as e:
+                        writer.abort()
+                        progress.update(upload_id, str(safe_path), status='error', error=str(e))
+                        errors.append({'file': filename, 'error': str(e)})
+                        current = None
+                        event = decoder.next_event()
+                        continue
+                    if not event.more_data:
+                        future = uploader.executor.submit(
+                            _finish_file, progress, upload_id, str(safe_path), writer, save_path
+                        )
+                        pending.append((filename, safe_path, save_path, future))
+                        current = None
+                event = decoder.next_event()
+            if not chunk and not finished:
+                raise ValueError('Unexpected end of multipart data')
+    except Exception as e:
+        if current is not None:
+            current[3].abort()
+        errors.append({'file': current[0] if current else None, 'error': str(e)})
+
+    uploaded_files = []
+    for filename, safe_path, save_path, future in pending:
+        try:
+            future.result()
+            uploaded_files.append({
+                'filename': str(safe_path),
+                'path': str(save_path)
+            })
+        except Exception as e:
+            errors.append({
+                'file': filename,
+                'error': str(e)
+            })
+
+    # 批量上传结束后统一更新索引与缓存，派生数据交给后台任务
+    job_ids = notify_files_written([item['filename'] for item in uploaded_files])
+    progress.finish(upload_id)
+
+    if not saw_file_field and not errors:
+        return {'error': 'No files uploaded', 'upload_id': upload_id, 'status': 400}
+
+    result = {
+        'uploaded_files': uploaded_files,
+        'upload_id': upload_id,
+        'jobs': job_ids,
+        'status': 200 if not errors else 400
+    }
+
+    if errors:
+        result['errors'] = errors
+
+    return result
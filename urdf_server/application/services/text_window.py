@@ -0,0 +1,115 @@
+import mmap
+import threading
+from collections import OrderedDict
+import numpy as np
+from .urdf_cache import file_stamp
+
+# 按字节或按行读取文件窗口（mmap），不把整个文件读入内存
+# 行偏移索引在第一次按行访问时分块扫描生成并缓存，之后跳转到任意行为 O(1)
+SCAN_SIZE = 8 * 1024 * 1024
+
+
+class LineIndex:
+    """offsets[i] 为第 i 行起始的字节偏移，最后一项为文件大小，行数 = len(offsets) - 1"""
+
+    __slots__ = ('stamp', 'offsets')
+
+    def __init__(self, stamp, offsets):
+        self.stamp = stamp
+        self.offsets = offsets
+
+    @property
+    def line_count(self):
+        return len(self.offsets) - 1
+
+
+def build_line_index(mm, size):
+    """分块扫描换行符，每块只占用 SCAN_SIZE 大小的临时内存"""
+    parts = [np.zeros(1, dtype=np.int64)]
+    for start in range(0, size, SCAN_SIZE):
+        block = np.frombuffer(mm, dtype=np.uint8, count=min(SCAN_SIZE, size - start), offset=start)
+        parts.append(np.flatnonzero(block == 0x0A).astype(np.int64) + (start + 1))
+    offsets = np.concatenate(parts)
+    if offsets[-1] != size:
+        # 最后一行没有换行符
+        offsets = np.append(offsets, size)
+    return offsets
+
+
+class LineIndexCache:
+    """行偏移索引缓存（按文件变更戳校验，LRU淘汰）"""
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path, stamp, mm, size):
+        key = str(file_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.stamp == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = LineIndex(stamp, build_line_index(mm, size))
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+
+line_index_cache = LineIndexCache()
+
+
+def read_window(file_path, offset=None, length=None, line=None, count=None, max_bytes=1024 * 1024):
+    """
+    读取文件的一个窗口
+    按字节：offset/length；按行：line（从0开始）/count。两者都省略时从文件开头读取 max_bytes
+    :param max_bytes: 单次返回的最大字节数（按行读取时超出部分截断，并在结果中注明）
+    :return: 结果字典，data 为窗口内容（bytes）
+    """
+    stamp = file_stamp(file_path)
+    if stamp is None:
+        return {'error': 'File not found', 'status': 404}
+    size = stamp[2]
+
+    result = {'total_bytes': size, 'status': 200}
+    if size == 0:
+        # 空文件无法 mmap
+        result.update({'data': b'', 'offset': 0, 'length': 0})
+        if line is not None:
+            result.update({'line': 0, 'count': 0, 'total_lines': 0})
+        return result
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # 文件可能在 stat 之后变化，以实际映射的大小为准
+        size = len(mm)
+        result['total_bytes'] = size
+        if line is not None:
+            index = line_index_cache.get(file_path, stamp, mm, size)
+            total_lines = index.line_count
+            line = min(max(line, 0), total_lines)
+            count = total_lines - line if count is None else max(count, 0)
+            stop_line = min(line + count, total_lines)
+            start = int(index.offsets[line])
+            stop = int(index.offsets[stop_line])
+            if stop - start > max_bytes:
+                # 截断到窗口内最后一个完整行（单行超长时按字节截断）
+                limit = start + max_bytes
+                stop_line = max(line, int(np.searchsorted(index.offsets, limit, side='right')) - 1)
+                stop = int(index.offsets[stop_line]) if stop_line > line else limit
+                result['truncated'] = True
+            result.update({'line': line, 'count': stop_line - line, 'total_lines': total_lines})
+        else:
+            start = min(max(offset or 0, 0), size)
+            stop = min(start + (max_bytes if length is None else max(min(length, max_bytes), 0)), size)
+            if length is not None and length > max_bytes:
+                result['truncated'] = True
+        result.update({'data': mm[start:stop], 'offset': start, 'length': stop - start})
+    return result
@@ -0,0 +1,79 @@
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class UploadProgressRegistry:
+    """
+    上传进度登记表：upload_id -> 每个文件的已接收字节数和状态
+    已结束的上传保留一段时间以便客户端读取最终结果
+    """
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def start(self, upload_id=None):
+        upload_id = upload_id or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            # 顺便清理过期记录
+            for key in [k for k, v in self._uploads.items() if v['done'] and now - v['updated'] > self.ttl]:
+                del self._uploads[key]
+            self._uploads[upload_id] = {'files': {}, 'done': False, 'updated': now}
+        return upload_id
+
+    def update(self, upload_id, filename, **fields):
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if upload is None:
+                return
+            upload['files'].setdefault(filename, {'received': 0, 'status': 'receiving'}).update(fields)
+            upload['updated'] = time.time()
+
+    def add_received(self, upload_id, filename, size):
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if upload is not None:
+                upload['files'][filename]['received'] += size
+
+    def finish(self, upload_id):
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if upload is not None:
+                upload['done'] = True
+                upload['updated'] = time.time()
+
+    def get(self, upload_id):
+        with self._lock:
+            upload = self._uploads.get(upload_id)
+            if upload is None:
+                return None
+            files = {name: dict(info) for name, info in upload['files'].items()}
+            return {
+                'upload_id': upload_id,
+                'done': upload['done'],
+                'files': files,
+                'received': sum(info['received'] for info in files.values()),
+                'completed': sum(1 for info in files.values() if info['status'] in ('done', 'error'))
+            }
+
+
+class StreamingUploader:
+    """流式文件夹上传所用的有界线程池和进度登记表"""
+
+    def __init__(self, app=None):
+        self.executor = None
+        self.progress = UploadProgressRegistry()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=app.config.get('UPLOAD_WORKERS', 4),
+                thread_name_prefix='upload'
+            )
+        app.extensions['streaming_uploader'] = self
@@ -0,0 +1,175 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def file_stamp(path):
+    """
+    文件的变更戳 (inode, mtime_ns, size)，文件不存在时返回None
+    （文件被替换为已有内容的硬链接时 inode 也会变化）
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class UrdfCacheEntry:
+    __slots__ = ('result', 'etag', 'stamp', 'dependencies', 'generation')
+
+    def __init__(self, result, etag, stamp, dependencies, generation):
+        self.result = result
+        self.etag = etag
+        self.stamp = stamp
+        self.dependencies = dependencies
+        self.generation = generation
+
+
+class UrdfCache:
+    """
+    处理后的URDF结果缓存（LRU淘汰）
+    条目以URDF路径为键，命中时校验URDF及其引用的所有资源文件的 mtime/size，
+    任何一个发生变化即视为失效；存在未解析的mesh引用时，任何新的文件写入都会使其失效
+    启用共享缓存时结果同时写入共享存储，其他 worker 进程未命中内存时从中读取（同样经过校验），
+    写入计数也保存在共享存储中，任一进程的写入使所有进程中含未解析引用的条目失效
+    """
+
+    def __init__(self, app=None):
+        self.max_entries = 128
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.shared = None
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('URDF_CACHE_SIZE', self.max_entries)
+        store = app.extensions.get('shared_store')
+        self.shared = store if store is not None and store.enabled else None
+        app.extensions['urdf_cache'] = self
+        if self.shared is not None:
+            self.warm()
+
+    def warm(self):
+        """从共享存储载入最近使用的条目，新启动的进程不必重新解析常用的URDF"""
+        for key, value in self.shared.recent('urdf'):
+            self._store(key, self._decode(value))
+
+    @staticmethod
+    def _encode(entry):
+        return {
+            'result': entry.result,
+            'etag': entry.etag,
+            'stamp': entry.stamp,
+            'dependencies': entry.dependencies,
+            'generation': entry.generation
+        }
+
+    @staticmethod
+    def _decode(value):
+        # JSON 中的元组读出后为列表，还原后才能与 file_stamp 的结果比较
+        return UrdfCacheEntry(
+            value['result'], value['etag'],
+            tuple(value['stamp']) if value['stamp'] is not None else None,
+            tuple((path, tuple(stamp) if stamp is not None else None) for path, stamp in value['dependencies']),
+            value['generation']
+        )
+
+    def current_generation(self):
+        if self.shared is not None:
+            return self.shared.generation('urdf')
+        with self._lock:
+            return self._generation
+
+    def notify_write(self):
+        """上传/保存写入新文件后调用，使含未解析引用的条目失效"""
+        if self.shared is not None:
+            self.shared.bump('urdf')
+            return
+        with self._lock:
+            self._generation += 1
+
+    def invalidate(self, file_path):
+        with self._lock:
+            self._entries.pop(str(file_path), None)
+        if self.shared is not None:
+            self.shared.delete('urdf', str(file_path))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _is_valid(self, entry, file_path, generation):
+        if entry.generation is not None and entry.generation != generation:
+            return False
+        if file_stamp(file_path) != entry.stamp:
+            return False
+        for dep_path, dep_stamp in entry.dependencies:
+            if file_stamp(dep_path) != dep_stamp:
+                return False
+        return True
+
+    def get(self, file_path, compute, upload_folder, variant=None):
+        """
+        获取URDF处理结果，未命中或已失效时调用 compute(file_path) 重新生成
+        :param file_path: URDF文件的完整路径
+        :param compute: 处理函数，返回 process_urdf_content 格式的字典
+        :param upload_folder: 上传目录，用于还原 resources 中的相对路径
+        :param variant: 同一文件的不同处理结果（如不同LOD级别）各自缓存
+        :return: (result, etag)，处理失败时 etag 为None
+        """
+        key = str(file_path) if variant is None else f"{file_path}?{variant}"
+        generation = self.current_generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None and self._is_valid(entry, file_path, generation):
+            with self._lock:
+                self.hits += 1
+            return entry.result, entry.etag
+
+        if self.shared is not None:
+            value = self.shared.get('urdf', key)
+            entry = self._decode(value) if value is not None else None
+            if entry is not None and self._is_valid(entry, file_path, generation):
+                with self._lock:
+                    self.hits += 1
+                self._store(key, entry)
+                return entry.result, entry.etag
+
+        with self._lock:
+            self.misses += 1
+        stamp = file_stamp(file_path)
+        result = compute(file_path)
+        if result.get('status') != 200:
+            with self._lock:
+                self._entries.pop(key, None)
+            return result, None
+
+        dependencies = tuple(
+            (path, file_stamp(path))
+            for path in (os.path.join(upload_folder, resource) for resource in result['resources'])
+        )
+        etag = hashlib.sha1(result['content'].encode('utf-8')).hexdigest()
+        entry = UrdfCacheEntry(
+            result, etag, stamp, dependencies,
+            generation if result.get('unresolved') else None
+        )
+
+        self._store(key, entry)
+        if self.shared is not None:
+            self.shared.put('urdf', key, self._encode(entry))
+        return result, etag
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,350 @@
+import sys
+import json
+import struct
+import threading
+from collections import OrderedDict
+import xml.etree.ElementTree as ET
+import numpy as np
+from .file_service import get_processed_urdf_cached
+
+# 编译后的URDF模型：以列式数组表示连杆/关节/几何体，所有名称与URL放入字符串表，表中以下标引用
+#
+# 二进制格式：
+#   MAGIC(8字节) | 版本(uint32 LE) | 头部长度(uint32 LE) | 头部(UTF-8 JSON) | 补齐到8字节 | 各列数据（小端）
+# 头部: {"name", "strings", "counts", "columns": [{"table", "name", "dtype", "shape", "offset"}]}
+# offset 为相对整个文件起始位置的绝对偏移且按8字节对齐，浏览器可直接用 TypedArray 视图读取
+MODEL_MAGIC = b'URDFMODL'
+MODEL_VERSION = 1
+
+JOINT_TYPE_CODES = {'fixed': 0, 'revolute': 1, 'continuous': 2, 'prismatic': 3, 'floating': 4, 'planar': 5}
+GEOMETRY_TYPE_CODES = {'box': 0, 'cylinder': 1, 'sphere': 2, 'mesh': 3}
+GEOMETRY_ROLES = {'visual': 0, 'collision': 1}
+
+
+class StringTable:
+    """字符串驻留表：相同的名称/URL只保存一次，-1 表示无"""
+
+    __slots__ = ('strings', '_index')
+
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def add(self, value):
+        if value is None:
+            return -1
+        value = sys.intern(value)
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+
+def _floats(text, count, default=0.0):
+    values = [float(v) for v in text.split()] if text else []
+    return (values + [default] * count)[:count]
+
+
+def _origin(element):
+    origin = element.find('origin') if element is not None else None
+    if origin is None:
+        return [0.0] * 6
+    return _floats(origin.get('xyz'), 3) + _floats(origin.get('rpy'), 3)
+
+
+def _geometry_size(shape):
+    tag = shape.tag
+    if tag == 'box':
+        return _floats(shape.get('size'), 3)
+    if tag == 'cylinder':
+        return [float(shape.get('radius', 0)), float(shape.get('length', 0)), 0.0]
+    if tag == 'sphere':
+        return [float(shape.get('radius', 0)), 0.0, 0.0]
+    # mesh: 缩放
+    return _floats(shape.get('scale'), 3, 1.0)
+
+
+def _rgba(material, named_colors):
+    if material is None:
+        return [np.nan] * 4
+    color = material.find('color')
+    if color is not None:
+        return _floats(color.get('rgba'), 4, 1.0)
+    return named_colors.get(material.get('name'), [np.nan] * 4)
+
+
+class CompiledUrdf:
+    """
+    URDF的紧凑表示：
+      links:      name, parent(父连杆下标), parent_joint, mass, inertial_origin(6), inertia(ixx ixy ixz iyy iyz izz),
+                  geometry_start/geometry_count（几何体表中的区间）
+      joints:     name, type, parent, child, origin(xyz rpy), axis(3), limit(lower upper effort velocity),
+                  mimic(被模仿关节下标), mimic_multiplier, mimic_offset
+      geometries: link, role(0 visual / 1 collision), type, origin(6), size(3), mesh, material, rgba(4)
+    缺失的数值用 NaN 表示（JSON 中为 null），缺失的下标用 -1 表示
+    """
+
+    __slots__ = ('name', 'strings', 'links', 'joints', 'geometries', 'roots', '_binary')
+
+    def __init__(self, root):
+        strings = StringTable()
+        self.strings = strings
+        self.name = root.get('name')
+        self._binary = None
+
+        named_colors = {}
+        for material in root.findall('material'):
+            color = material.find('color')
+            if color is not None:
+                named_colors[material.get('name')] = _floats(color.get('rgba'), 4, 1.0)
+
+        link_elements = root.findall('link')
+        link_index = {link.get('name'): i for i, link in enumerate(link_elements)}
+        link_count = len(link_elements)
+
+        links = {
+            'name': np.array([strings.add(link.get('name')) for link in link_elements], dtype=np.int32),
+            'parent': np.full(link_count, -1, dtype=np.int32),
+            'parent_joint': np.full(link_count, -1, dtype=np.int32),
+            'mass': np.full(link_count, np.nan),
+            'inertial_origin': np.zeros((link_count, 6)),
+            'inertia': np.full((link_count, 6), np.nan),
+            'geometry_start': np.zeros(link_count, dtype=np.int32),
+            'geometry_count': np.zeros(link_count, dtype=np.int32),
+        }
+
+        geometry_rows = []
+        for i, link in enumerate(link_elements):
+            inertial = link.find('inertial')
+            if inertial is not None:
+                mass = inertial.find('mass')
+                if mass is not None:
+                    links['mass'][i] = float(mass.get('value', 'nan'))
+                links['inertial_origin'][i] = _origin(inertial)
+                inertia = inertial.find('inertia')
+                if inertia is not None:
+                    links['inertia'][i] = [
+                        float(inertia.get(key, 0)) for key in ('ixx', 'ixy', 'ixz', 'iyy', 'iyz', 'izz')
+                    ]
+
+            links['geometry_start'][i] = len(geometry_rows)
+            for role, code in GEOMETRY_ROLES.items():
+                for element in link.findall(role):
+                    geometry = element.find('geometry')
+                    shape = None if geometry is None else next(
+                        (child for child in geometry if child.tag in GEOMETRY_TYPE_CODES), None
+                    )
+                    if shape is None:
+                        continue
+                    material = element.find('material') if role == 'visual' else None
+                    geometry_rows.append((
+                        i, code, GEOMETRY_TYPE_CODES[shape.tag], _origin(element), _geometry_size(shape),
+                        strings.add(shape.get('filename')) if shape.tag == 'mesh' else -1,
+                        strings.add(material.get('name')) if material is not None else -1,
+                        _rgba(material, named_colors)
+                    ))
+            links['geometry_count'][i] = len(geometry_rows) - links['geometry_start'][i]
+
+        columns = list(zip(*geometry_rows)) if geometry_rows else [()] * 8
+        self.geometries = {
+            'link': np.array(columns[0], dtype=np.int32),
+            'role': np.array(columns[1], dtype=np.uint8),
+            'type': np.array(columns[2], dtype=np.uint8),
+            'origin': np.array(columns[3], dtype=np.float64).reshape(-1, 6),
+            'size': np.array(columns[4], dtype=np.float64).reshape(-1, 3),
+            'mesh': np.array(columns[5], dtype=np.int32),
+            'material': np.array(columns[6], dtype=np.int32),
+            'rgba': np.array(columns[7], dtype=np.float64).reshape(-1, 4),
+        }
+
+        joint_elements = root.findall('joint')
+        joint_index = {joint.get('name'): j for j, joint in enumerate(joint_elements)}
+        joint_count = len(joint_elements)
+        joints = {
+            'name': np.array([strings.add(joint.get('name')) for joint in joint_elements], dtype=np.int32),
+            'type': np.zeros(joint_count, dtype=np.uint8),
+            'parent': np.full(joint_count, -1, dtype=np.int32),
+            'child': np.full(joint_count, -1, dtype=np.int32),
+            'origin': np.zeros((joint_count, 6)),
+            'axis': np.tile([1.0, 0.0, 0.0], (joint_count, 1)),
+            'limit': np.full((joint_count, 4), np.nan),
+            'mimic': np.full(joint_count, -1, dtype=np.int32),
+            'mimic_multiplier': np.ones(joint_count),
+            'mimic_offset': np.zeros(joint_count),
+        }
+        for j, joint in enumerate(joint_elements):
+            name = joint.get('name')
+            joint_type = joint.get('type', 'fixed')
+            if joint_type not in JOINT_TYPE_CODES:
+                raise ValueError(f"Unsupported joint type '{joint_type}' in joint '{name}'")
+            joints['type'][j] = JOINT_TYPE_CODES[joint_type]
+            parent, child = joint.find('parent'), joint.find('child')
+            if parent is None or child is None:
+                raise ValueError(f"Joint '{name}' is missing parent or child")
+            try:
+                parent_link, child_link = link_index[parent.get('link')], link_index[child.get('link')]
+            except KeyError as e:
+                raise ValueError(f"Joint '{name}' references unknown link {e}")
+            if links['parent_joint'][child_link] != -1:
+                raise ValueError(f"Link '{child.get('link')}' has more than one parent joint")
+            joints['parent'][j], joints['child'][j] = parent_link, child_link
+            links['parent'][child_link], links['parent_joint'][child_link] = parent_link, j
+
+            joints['origin'][j] = _origin(joint)
+            axis = joint.find('axis')
+            if axis is not None:
+                joints['axis'][j] = _floats(axis.get('xyz'), 3)
+            limit = joint.find('limit')
+            if limit is not None:
+                joints['limit'][j] = [
+                    float(limit.get(key)) if limit.get(key) is not None else np.nan
+                    for key in ('lower', 'upper', 'effort', 'velocity')
+                ]
+            mimic = joint.find('mimic')
+            if mimic is not None:
+                joints['mimic'][j] = joint_index.get(mimic.get('joint'), -1)
+                joints['mimic_multiplier'][j] = float(mimic.get('multiplier', 1))
+                joints['mimic_offset'][j] = float(mimic.get('offset', 0))
+
+        self.links = links
+        self.joints = joints
+        self.roots = [i for i in range(link_count) if links['parent'][i] == -1]
+
+    @classmethod
+    def from_string(cls, content):
+        return cls(ET.fromstring(content))
+
+    def _tables(self):
+        return (('links', self.links), ('joints', self.joints), ('geometries', self.geometries))
+
+    def to_json(self):
+        """列式JSON：每张表是 列名 -> 数组，NaN 输出为 null"""
+        tables = {}
+        for table_name, table in self._tables():
+            tables[table_name] = {
+                column: _json_column(values) for column, values in table.items()
+            }
+        return {
+            'format': 'urdf-model',
+            'version': MODEL_VERSION,
+            'name': self.name,
+            'strings': self.strings.strings,
+            'roots': self.roots,
+            'joint_types': list(JOINT_TYPE_CODES),
+            'geometry_types': list(GEOMETRY_TYPE_CODES),
+            **tables
+        }
+
+    def to_binary(self):
+        """紧凑二进制布局（结果缓存在实例上）"""
+        if self._binary is not None:
+            return self._binary
+
+        columns = []
+        blobs = []
+        for table_name, table in self._tables():
+            for column, values in table.items():
+                data = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+                columns.append({
+                    'table': table_name,
+                    'name': column,
+                    'dtype': data.dtype.str.lstrip('<|'),
+                    'shape': list(data.shape),
+                })
+                blobs.append(data.tobytes())
+
+        header = {
+            'name': self.name,
+            'strings': self.strings.strings,
+            'roots': self.roots,
+            'joint_types': list(JOINT_TYPE_CODES),
+            'geometry_types': list(GEOMETRY_TYPE_CODES),
+            'counts': {
+                'links': len(self.links['name']),
+                'joints': len(self.joints['name']),
+                'geometries': len(self.geometries['link'])
+            },
+            'columns': columns
+        }
+        # 偏移依赖头部长度，而头部又包含偏移：先用占位偏移估算，再迭代直到长度稳定
+        prefix_length = len(MODEL_MAGIC) + 8
+        offsets = [0] * len(blobs)
+        while True:
+            for column, offset in zip(columns, offsets):
+                column['offset'] = offset
+            header_bytes = json.dumps(header, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+            position = _align(prefix_length + len(header_bytes))
+            new_offsets = []
+            for blob in blobs:
+                new_offsets.append(position)
+                position = _align(position + len(blob))
+            if new_offsets == offsets:
+                break
+            offsets = new_offsets
+
+        parts = [MODEL_MAGIC, struct.pack('<II', MODEL_VERSION, len(header_bytes)), header_bytes]
+        position = prefix_length + len(header_bytes)
+        for blob, offset in zip(blobs, offsets):
+            parts.append(bytes(offset - position))
+            parts.append(blob)
+            position = offset + len(blob)
+        self._binary = b''.join(parts)
+        return self._binary
+
+
+def _align(position, alignment=8):
+    return -(-position // alignment) * alignment
+
+
+def _json_column(values):
+    if values.dtype.kind == 'f' and np.isnan(values).any():
+        values = values.astype(object)
+        values[np.isnan(values.astype(np.float64))] = None
+    return values.tolist()
+
+
+class CompiledModelCache:
+    """编译结果缓存：以处理后URDF内容的 ETag 为键，内容不变即可复用（LRU淘汰）"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag, content):
+        with self._lock:
+            model = self._entries.get(etag)
+            if model is not None:
+                self._entries.move_to_end(etag)
+                self.hits += 1
+                return model
+            self.misses += 1
+        model = CompiledUrdf.from_string(content)
+        with self._lock:
+            self._entries[etag] = model
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return model
+
+
+model_cache = CompiledModelCache()
+
+
+def get_compiled_model(file_path, lod=None):
+    """
+    获取URDF的编译模型（mesh 路径已替换为带版本号的资源URL）
+    :param file_path: URDF文件的完整路径
+    :param lod: mesh细节级别（low/medium/full）
+    :return: (CompiledUrdf, ETag, None) 或 (None, None, 错误字典)
+    """
+    result, etag = get_processed_urdf_cached(file_path, lod)
+    if etag is None:
+        return None, None, result
+    try:
+        model = model_cache.get(etag, result['content'])
+    except (ET.ParseError, ValueError) as e:
+        return None, None, {'error': f"Error compiling URDF: {str(e)}", 'status': 400}
+    return model, etag, None
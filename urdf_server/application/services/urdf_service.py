@@ -3,14 +3,44 @@ from pathlib import Path
 from flask import current_app
 import logging
 from datetime import datetime
+from .file_service import notify_files_written
+from .post_processing import schedule_version_compaction
+from .urdf_versions import VersionConflict
+from ..extensions import blob_store, urdf_versions
 
-def save_urdf_file(content, filename):
+def write_urdf_head(file_path, content):
+    """
+    写入URDF的最新内容（写临时文件再替换，读取方不会看到写了一半的文件）
+    
+    Args:
+        file_path (Path): 上传目录中的文件路径
+        content (str): URDF文件内容
+    """
+    data = content.encode('utf-8')
+    if blob_store.enabled:
+        # 启用内容寻址存储时内容相同的保存只写元数据
+        blob_store.store_bytes(data, file_path)
+    else:
+        tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+
+def _after_commit(relative_path, info):
+    """新版本写入后更新缓存和索引，版本过多时提交压缩任务"""
+    if info.get('stored') is None:
+        return []
+    return notify_files_written([relative_path]) + schedule_version_compaction(relative_path, info['versions'])
+
+def save_urdf_file(content, filename, base_version=None):
     """
     保存URDF文件到指定目录
     
     Args:
         content (str): URDF文件内容
         filename (str): 文件名
+        base_version (int): 编辑器打开的版本号。给出时作为该文件的新版本保存（版本不是最新时冲突），
+            否则与原来一样另存为新文件（重名时添加时间戳）
         
     Returns:
         dict: 包含操作结果的字典
@@ -23,22 +53,100 @@ def save_urdf_file(content, filename):
         # 获取上传目录路径
         file_path = Path(current_app.config['UPLOAD_FOLDER']) / filename
         
-        # 如果文件已存在，添加时间戳
-        if file_path.exists():
+        if base_version is not None:
+            if not urdf_versions.enabled:
+                return {'error': 'URDF versioning is disabled', 'status': 400}
+            if not file_path.exists():
+                return {'error': 'File not found', 'status': 404}
+        elif file_path.exists():
+            # 如果文件已存在，添加时间戳
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             name, ext = file_path.stem, file_path.suffix
             filename = f"{name}_{timestamp}{ext}"
             file_path = Path(current_app.config['UPLOAD_FOLDER']) / filename
         
-        # 写入文件内容
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        if not urdf_versions.enabled:
+            write_urdf_head(file_path, content)
+            return {
+                'message': 'File saved successfully',
+                'filename': filename,
+                'jobs': notify_files_written([filename]),
+                'status': 200
+            }
         
-        return {
-            'message': 'File saved successfully',
-            'filename': filename,
-            'status': 200
-        }
+        try:
+            info = urdf_versions.commit(file_path, write_urdf_head, content=content, base_version=base_version)
+        except VersionConflict as e:
+            return {'error': str(e), 'version': e.head, 'status': 409}
+        
+        return dict(
+            info,
+            message='File saved successfully',
+            filename=filename,
+            jobs=_after_commit(filename, info),
+            status=200
+        )
     except Exception as e:
         logging.error(f"Error saving URDF file: {str(e)}")
-        return {'error': str(e), 'status': 500} 
\ No newline at end of file
+        return {'error': str(e), 'status': 500}
+
+def patch_urdf_file(file_path, base_version, edits=None, elements=None):
+    """
+    增量保存：只提交相对 base_version 改动的文本区间或元素
+    
+    Args:
+        file_path (Path): 上传目录中的URDF文件路径
+        base_version (int): 编辑所基于的版本号
+        edits (list): 文本编辑 [{"start": 0, "end": 10, "text": "..."}]，位置相对 base_version 的全文，以 Unicode 码位计
+        elements (list): 元素修改 [{"tag": "link", "name": "base", "xml": "<link .../>"}]，xml 为 null 时删除
+        
+    Returns:
+        dict: 包含新版本号的结果字典
+    """
+    if not urdf_versions.enabled:
+        return {'error': 'URDF versioning is disabled', 'status': 400}
+    relative_path = str(file_path.relative_to(current_app.config['UPLOAD_FOLDER'])).replace('\\', '/')
+    try:
+        info = urdf_versions.commit(
+            file_path, write_urdf_head, edits=edits or [], elements=elements, base_version=base_version
+        )
+    except VersionConflict as e:
+        return {'error': str(e), 'version': e.head, 'status': 409}
+    except FileNotFoundError:
+        return {'error': 'File not found', 'status': 404}
+    except ValueError as e:
+        return {'error': str(e), 'status': 400}
+    
+    return dict(info, filename=relative_path, jobs=_after_commit(relative_path, info), status=200)
+
+def list_urdf_versions(file_path):
+    """
+    列出URDF的版本
+    
+    Returns:
+        dict: {"head": 最新版本号, "versions": [...]}，文件从未经由版本存储保存时 head 为 None
+    """
+    if not urdf_versions.enabled:
+        return {'error': 'URDF versioning is disabled', 'status': 400}
+    head, _ = urdf_versions.read_head(file_path)
+    return {
+        'head': head,
+        'versions': urdf_versions.history(file_path),
+        'status': 200
+    }
+
+def get_urdf_version(file_path, version):
+    """
+    读取指定版本的全文（最新版本直接读取文件；文件在版本存储之外被修改过时先记为新版本）
+    
+    Returns:
+        dict: {"content": 全文, "version": 版本号}
+    """
+    if not urdf_versions.enabled:
+        return {'error': 'URDF versioning is disabled', 'status': 400}
+    head, content = urdf_versions.read_head(file_path)
+    if version != head:
+        content = urdf_versions.get(file_path, version)
+    if content is None:
+        return {'error': f'Version {version} not found', 'status': 404}
+    return {'content': content, 'version': version, 'status': 200}
\ No newline at end of file
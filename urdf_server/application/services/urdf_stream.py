@@ -0,0 +1,200 @@
+import os
+import json
+import codecs
+import logging
+from pathlib import Path
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+from flask import current_app
+from .file_service import resolve_mesh_path, versioned_resource_url
+
+logger = logging.getLogger(__name__)
+
+# 大文件的流式处理：边解析边输出，峰值内存与文件大小无关（只累积资源路径列表）
+#   - URDF 用 iterparse 逐个元素读取，元素输出后立即从树中移除
+#   - 输出仍是与非流式接口相同结构的 JSON，只是分块生成
+READ_SIZE = 64 * 1024
+FLUSH_SIZE = 64 * 1024
+
+_ATTRIB_ENTITIES = {'"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#09;'}
+
+
+def should_stream(file_path, requested):
+    """
+    :param requested: 查询参数 stream 的值；未指定时超过 URDF_STREAM_THRESHOLD 的文件自动使用流式模式
+    """
+    if requested is not None:
+        return requested.lower() in ('1', 'true', 'yes')
+    threshold = current_app.config.get('URDF_STREAM_THRESHOLD', 8 * 1024 * 1024)
+    try:
+        return os.path.getsize(file_path) > threshold
+    except OSError:
+        return False
+
+
+def _json_string_body(text):
+    """JSON 字符串字面量去掉首尾引号的部分，用于分块拼接一个长字符串"""
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+class _XmlWriter:
+    """把 iterparse 事件序列化为 XML 文本（与 ET.tostring 一样不输出声明和注释）"""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.namespaces = {}
+        self._pending_ns = []
+        self._open_tag = None  # 尚未闭合的开始标签，遇到内容时补 '>'，直接结束时输出 '/>'
+
+    def _write(self, text):
+        if text:
+            self.parts.append(text)
+            self.size += len(text)
+
+    def _name(self, name):
+        if name[:1] == '{':
+            uri, local = name[1:].split('}', 1)
+            prefix = self.namespaces.get(uri)
+            return f"{prefix}:{local}" if prefix else local
+        return name
+
+    def _close_open_tag(self):
+        if self._open_tag is not None:
+            self._write(self._open_tag + '>')
+            self._open_tag = None
+
+    def start_ns(self, prefix, uri):
+        self.namespaces[uri] = prefix
+        self._pending_ns.append((prefix, uri))
+
+    def start(self, element):
+        self._close_open_tag()
+        attrs = [
+            f' xmlns:{prefix}="{escape(uri, _ATTRIB_ENTITIES)}"' if prefix else f' xmlns="{escape(uri, _ATTRIB_ENTITIES)}"'
+            for prefix, uri in self._pending_ns
+        ]
+        self._pending_ns = []
+        attrs.extend(
+            f' {self._name(key)}="{escape(value, _ATTRIB_ENTITIES)}"' for key, value in element.attrib.items()
+        )
+        self._open_tag = f"<{self._name(element.tag)}{''.join(attrs)}"
+
+    def text(self, text):
+        if text:
+            self._close_open_tag()
+            self._write(escape(text))
+
+    def end(self, element):
+        if self._open_tag is not None:
+            self._write(self._open_tag + ' />')
+            self._open_tag = None
+        else:
+            self._write(f"</{self._name(element.tag)}>")
+
+    def take(self):
+        text = ''.join(self.parts)
+        self.parts = []
+        self.size = 0
+        return text
+
+
+def iter_processed_urdf(file_path, lod=None):
+    """
+    流式版本的 process_urdf_content：逐块生成与 /urdf 接口相同结构的 JSON
+    {"content": "...", "resources": [...], "unresolved": [...], "status": 200}
+    解析中途出错时（响应头已经发出）在 JSON 末尾给出 error 字段，status 为 500
+    :param file_path: URDF文件的完整路径
+    :param lod: mesh细节级别（low/medium/full）
+    """
+    upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
+    base_url = "/api/files/resource"
+    if lod == 'full':
+        lod = None
+    resources = []
+    unresolved = []
+    shared_paths = {}  # 同一mesh被多次引用时共用同一个字符串对象
+    writer = _XmlWriter()
+    error = None
+
+    yield '{"content": "'
+    try:
+        # 栈中每项为 [元素, 最后一个已输出的子元素]；子元素的 tail 要等到下一个兄弟或父元素结束时才完整
+        stack = []
+        for event, item in ET.iterparse(str(file_path), events=('start-ns', 'start', 'end')):
+            if event == 'start-ns':
+                writer.start_ns(*item)
+                continue
+
+            if event == 'start':
+                if stack:
+                    frame = stack[-1]
+                    if frame[1] is None:
+                        writer.text(frame[0].text)
+                    else:
+                        writer.text(frame[1].tail)
+                        frame[0].remove(frame[1])
+                        frame[1] = None
+                if item.tag == 'mesh' and 'filename' in item.attrib:
+                    original_path = item.attrib['filename']
+                    resolved = resolve_mesh_path(original_path, file_path, upload_folder)
+                    if resolved:
+                        full_path, relative_path = resolved
+                        resources.append(shared_paths.setdefault(relative_path, relative_path))
+                        item.attrib['filename'] = versioned_resource_url(base_url, relative_path, full_path, lod)
+                    else:
+                        unresolved.append(original_path)
+                writer.start(item)
+                stack.append([item, None])
+            else:
+                element, last_child = stack.pop()
+                if last_child is None:
+                    writer.text(element.text)
+                else:
+                    writer.text(last_child.tail)
+                    element.remove(last_child)
+                writer.end(element)
+                if stack:
+                    # 已输出的元素只保留到它的 tail 被输出为止
+                    if stack[-1][1] is not None:
+                        stack[-1][0].remove(stack[-1][1])
+                    stack[-1][1] = element
+                    element.text = None
+                    element.attrib.clear()
+
+            if writer.size >= FLUSH_SIZE:
+                yield _json_string_body(writer.take())
+    except (ET.ParseError, OSError) as e:
+        logger.warning("Streaming URDF processing failed for %s: %s", file_path, e)
+        error = f"Error processing URDF file: {str(e)}"
+
+    tail = {'resources': resources, 'unresolved': unresolved, 'status': 200}
+    if error:
+        tail.update({'error': error, 'status': 500})
+    yield _json_string_body(writer.take()) + '", ' + json.dumps(tail, ensure_ascii=False)[1:]
+
+
+def iter_file_content(file_path):
+    """
+    流式版本的 /content 接口：按块读取并增量解码，逐块生成 {"content": "...", "filename": "..."}
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    yield '{"content": "'
+    error = None
+    try:
+        with open(file_path, 'rb') as f:
+            while True:
+                data = f.read(READ_SIZE)
+                text = decoder.decode(data, final=not data)
+                if text:
+                    yield _json_string_body(text)
+                if not data:
+                    break
+    except (OSError, UnicodeDecodeError) as e:
+        logger.warning("Streaming file content failed for %s: %s", file_path, e)
+        error = str(e)
+
+    tail = {'filename': os.path.basename(file_path)}
+    if error:
+        tail['error'] = error
+    yield '", ' + json.dumps(tail, ensure_ascii=False)[1:]
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import uuid
+import struct
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, wait
+from .package_index import PackageIndex
+from ..utils.file_util import is_within
+
+# 批量校验URDF：每个文件在后台任务队列的共享进程池中独立检查，结果逐个返回
+# 子进程不访问应用状态，package 索引快照随任务传入，子进程按快照标识缓存，同一批校验只解析一次
+#
+# 检查项：
+#   xml      - XML 是否良构、根元素是否为 <robot>
+#   graph    - 连杆/关节重名、关节引用不存在的连杆、连杆有多个父关节、存在环、不连通（多个根连杆）
+#   mesh     - package:// 与相对路径引用能否解析
+#   readable - mesh 文件能否读取（空文件、二进制STL长度与三角形数不符等）
+
+_resolver = None
+_resolver_token = None
+
+# 判断 STL 格式时读取的文件头/尾字节数
+STL_PROBE_SIZE = 4096
+
+
+def _use_snapshot(token, snapshot):
+    """
+    :param token: 快照标识，每次批量校验生成一个
+    :param snapshot: 序列化后的 {"root": 上传目录, "packages": package 索引快照}
+    """
+    global _resolver, _resolver_token
+    if token != _resolver_token:
+        data = json.loads(snapshot)
+        _resolver = PackageIndex.from_snapshot(data['root'], data['packages'])
+        _resolver_token = token
+
+
+def _validate_task(token, snapshot, full_path, relative_path):
+    _use_snapshot(token, snapshot)
+    return validate_urdf_file(full_path, relative_path)
+
+
+def _resolve_mesh(original_path, urdf_path):
+    if original_path.startswith('package://'):
+        return _resolver.resolve(original_path[len('package://'):])
+    full_path = os.path.normpath(os.path.join(os.path.dirname(urdf_path), original_path))
+    return full_path if os.path.exists(full_path) and is_within(full_path, _resolver.root) else None
+
+
+def _looks_like_text(data):
+    return data.isascii() and b'\0' not in data
+
+
+def _check_mesh_readable(full_path):
+    """
+    :return: 问题描述，可读时返回None
+    """
+    try:
+        size = os.path.getsize(full_path)
+        with open(full_path, 'rb') as f:
+            head = f.read(STL_PROBE_SIZE)
+            f.seek(max(0, size - STL_PROBE_SIZE))
+            tail = f.read(STL_PROBE_SIZE)
+    except OSError as e:
+        return f"unreadable: {e.strerror or e}"
+    if size == 0:
+        return 'empty file'
+    if not str(full_path).lower().endswith('.stl'):
+        return None
+
+    # 与 mesh_lod.load_stl 相同的判断：大小与声明的三角形数一致时为二进制，否则按 ASCII 处理
+    # （很多导出工具写的二进制STL头部也以 solid 开头，不能据此判断）
+    if size >= 84:
+        count = struct.unpack('<I', head[80:84])[0]
+        if size == 84 + count * 50:
+            return None
+    if head.lstrip().startswith(b'solid') and _looks_like_text(head):
+        if b'endsolid' not in tail:
+            return 'truncated ASCII STL (missing endsolid)'
+        return None
+    if size < 84:
+        return 'truncated binary STL header'
+    return f"binary STL declares {count} triangles but file size is {size} bytes"
+
+
+def _check_graph(root, errors, warnings):
+    links = [link.get('name') for link in root.findall('link')]
+    link_set = set()
+    for name in links:
+        if not name:
+            errors.append({'check': 'graph', 'message': 'link without a name'})
+        elif name in link_set:
+            errors.append({'check': 'graph', 'message': f"duplicate link '{name}'"})
+        link_set.add(name)
+
+    joint_names = set()
+    parent_of = {}
+    children = {}
+    joints = root.findall('joint')
+    for joint in joints:
+        name = joint.get('name')
+        if name in joint_names:
+            errors.append({'check': 'graph', 'message': f"duplicate joint '{name}'"})
+        joint_names.add(name)
+        parent, child = joint.find('parent'), joint.find('child')
+        parent = parent.get('link') if parent is not None else None
+        child = child.get('link') if child is not None else None
+        if parent is None or child is None:
+            errors.append({'check': 'graph', 'message': f"joint '{name}' is missing parent or child"})
+            continue
+        for link in (parent, child):
+            if link not in link_set:
+                errors.append({'check': 'graph', 'message': f"joint '{name}' references unknown link '{link}'"})
+        if child in parent_of:
+            errors.append({'check': 'graph', 'message': f"link '{child}' has more than one parent joint"})
+            continue
+        parent_of[child] = parent
+        children.setdefault(parent, []).append(child)
+
+    roots = [name for name in dict.fromkeys(links) if name and name not in parent_of]
+    if not roots and links:
+        errors.append({'check': 'graph', 'message': 'kinematic loop: no root link'})
+    elif len(roots) > 1:
+        errors.append({
+            'check': 'graph',
+            'message': f"tree is not connected: {len(roots)} root links ({', '.join(roots[:10])})"
+        })
+
+    # 从根出发遍历，未访问到的连杆位于环上
+    visited = set()
+    stack = list(roots)
+    while stack:
+        name = stack.pop()
+        if name in visited:
+            continue
+        visited.add(name)
+        stack.extend(children.get(name, ()))
+    in_loop = [name for name in dict.fromkeys(links) if name and name not in visited]
+    if in_loop and roots:
+        errors.append({'check': 'graph', 'message': f"kinematic loop through links: {', '.join(in_loop[:10])}"})
+    if not links:
+        warnings.append({'check': 'graph', 'message': 'robot has no links'})
+    return len(links), len(joints)
+
+
+def validate_urdf_file(full_path, relative_path):
+    """
+    校验单个URDF文件（在子进程中执行）
+    :return: 报告字典 {path, valid, errors, warnings, links, joints, meshes}
+    """
+    started = time.perf_counter()
+    errors = []
+    warnings = []
+    report = {'path': relative_path, 'links': 0, 'joints': 0, 'meshes': 0}
+    try:
+        root = ET.parse(full_path).getroot()
+    except ET.ParseError as e:
+        line, column = e.position
+        errors.append({'check': 'xml', 'message': f"{e}", 'line': line, 'column': column})
+        root = None
+    except OSError as e:
+        errors.append({'check': 'xml', 'message': f"unreadable: {e.strerror or e}"})
+        root = None
+
+    if root is not None:
+        if root.tag != 'robot':
+            errors.append({'check': 'xml', 'message': f"root element is <{root.tag}>, expected <robot>"})
+        report['links'], report['joints'] = _check_graph(root, errors, warnings)
+
+        checked = {}
+        for mesh in root.iter('mesh'):
+            original_path = mesh.get('filename')
+            report['meshes'] += 1
+            if not original_path:
+                errors.append({'check': 'mesh', 'message': '<mesh> without filename'})
+                continue
+            if original_path in checked:
+                continue
+            resolved = _resolve_mesh(original_path, full_path)
+            checked[original_path] = resolved
+            if resolved is None:
+                errors.append({'check': 'mesh', 'message': f"unresolved mesh reference '{original_path}'"})
+                continue
+            problem = _check_mesh_readable(resolved)
+            if problem:
+                errors.append({'check': 'readable', 'message': f"{original_path}: {problem}"})
+
+    report.update({
+        'valid': not errors,
+        'errors': errors,
+        'warnings': warnings,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)
+    })
+    return report
+
+
+def find_urdf_files(root, relative_dir=''):
+    """遍历 relative_dir 下的所有URDF，按路径排序"""
+    base = Path(root) / relative_dir
+    if base.is_file():
+        yield str(base), os.path.relpath(base, root).replace('\\', '/')
+        return
+    for dirpath, dirnames, filenames in os.walk(base):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.lower().endswith('.urdf'):
+                full_path = os.path.join(dirpath, filename)
+                yield full_path, os.path.relpath(full_path, root).replace('\\', '/')
+
+
+def iter_validation_reports(executor, root, packages, relative_dir='', max_in_flight=16):
+    """
+    在进程池中并行校验 relative_dir 下的所有URDF，按完成顺序逐个产出报告，最后产出汇总
+    同时在途的任务数有上限，文件再多内存也不会随之增长，也不会占满与后台任务共用的进程池
+    :param executor: 进程池（JobQueue.cpu_executor()）
+    :param root: 上传目录
+    :param packages: package 索引快照（PackageIndex.snapshot()）
+    :param max_in_flight: 同时提交的任务数上限
+    """
+    token = uuid.uuid4().hex
+    snapshot = json.dumps({'root': str(root), 'packages': packages})
+    summary = {'summary': True, 'files': 0, 'valid': 0, 'invalid': 0, 'errors': 0}
+    started = time.perf_counter()
+
+    pending = set()
+    try:
+        for full_path, relative_path in find_urdf_files(root, relative_dir):
+            pending.add(executor.submit(_validate_task, token, snapshot, full_path, relative_path))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    report = future.result()
+                    _count(summary, report)
+                    yield report
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                report = future.result()
+                _count(summary, report)
+                yield report
+    finally:
+        # 客户端中途断开时取消尚未开始的任务
+        for future in pending:
+            future.cancel()
+
+    summary['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    yield summary
+
+
+def _count(summary, report):
+    summary['files'] += 1
+    summary['valid' if report['valid'] else 'invalid'] += 1
+    summary['errors'] += len(report['errors'])
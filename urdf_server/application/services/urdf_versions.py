@@ -0,0 +1,421 @@
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT, DELTA = 'snapshot', 'delta'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY, head INTEGER NOT NULL, sha256 TEXT NOT NULL, size INTEGER NOT NULL, updated REAL NOT NULL
+);
+-- snapshot 的 payload 为压缩后的全文，delta 为相对上一版本的压缩编辑列表 [[start, end, text], ...]
+CREATE TABLE IF NOT EXISTS versions (
+    path TEXT NOT NULL, version INTEGER NOT NULL, kind TEXT NOT NULL, payload BLOB NOT NULL,
+    sha256 TEXT NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL,
+    PRIMARY KEY (path, version)
+);
+'''
+
+
+class VersionConflict(Exception):
+    """保存所基于的版本不是当前最新版本"""
+
+    def __init__(self, head):
+        super().__init__(f"Document has been modified, current version is {head}")
+        self.head = head
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def normalize_edits(text, edits):
+    """
+    检查文本编辑并按位置排序
+    :param edits: [{"start": 起始字符位置, "end": 结束字符位置, "text": 替换文本}, ...]，位置都相对原文，
+        以 Unicode 码位计（不是 JavaScript 字符串的 UTF-16 下标）
+    :return: [(start, end, text), ...]；位置越界或区间重叠时抛出 ValueError
+    """
+    normalized = []
+    for edit in edits:
+        try:
+            start, end, replacement = edit['start'], edit['end'], edit.get('text', '')
+        except (KeyError, TypeError):
+            raise ValueError('Each edit needs start, end and text')
+        if not isinstance(start, int) or not isinstance(end, int) or not isinstance(replacement, str):
+            raise ValueError('Edit start/end must be integers and text a string')
+        if not 0 <= start <= end <= len(text):
+            raise ValueError(f"Edit range {start}-{end} is outside the document (length {len(text)})")
+        normalized.append((start, end, replacement))
+    normalized.sort(key=lambda edit: (edit[0], edit[1]))
+    for previous, current in zip(normalized, normalized[1:]):
+        if current[0] < previous[1]:
+            raise ValueError(f"Overlapping edits at {current[0]}")
+    return normalized
+
+
+def apply_edits(text, edits):
+    """按位置应用已排序且不重叠的编辑 [(start, end, text), ...]"""
+    parts, position = [], 0
+    for start, end, replacement in edits:
+        parts.append(text[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
+
+
+def diff_text(old, new):
+    """
+    去掉公共前缀和后缀，得到单个替换区间（编辑器的一次保存通常只改动一处，线性时间）
+    :return: [(start, end, text)]，内容相同时为空列表
+    """
+    if old == new:
+        return []
+    limit = min(len(old), len(new))
+    # 二分查找公共前缀/后缀长度：切片比较在 C 中完成，避免逐字符的 Python 循环
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[:middle] == new[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = low
+    low, high = 0, limit - prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[len(old) - middle:] == new[len(new) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    suffix = low
+    return [(prefix, len(old) - suffix, new[prefix:len(new) - suffix])]
+
+
+def _tag_end(data, index):
+    """从 index 处的 '<' 开始找到标签结束的 '>'（跳过属性值中的引号内容）"""
+    quote = None
+    for i in range(index, len(data)):
+        c = data[i]
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in (0x22, 0x27):
+            quote = c
+        elif c == 0x3e:
+            return i + 1
+    raise ValueError('Unterminated tag')
+
+
+def locate_elements(text):
+    """
+    定位根元素的直接子元素在原文中的位置（expat 给出字节偏移，不构建树）
+    :return: ({(标签, name属性): (起始字符位置, 结束字符位置)}, 根元素结束标签的字符位置)
+    """
+    data = text.encode('utf-8')
+    parser = expat.ParserCreate()
+    spans, stack, starts = {}, [], []
+    root_end = [None]
+
+    def start_element(tag, attrs):
+        if len(stack) == 1:
+            starts.append((tag, attrs.get('name'), parser.CurrentByteIndex))
+        stack.append(tag)
+
+    def end_element(tag):
+        stack.pop()
+        index = parser.CurrentByteIndex
+        if len(stack) == 1:
+            tag, name, start = starts.pop()
+            # 空元素 <x/> 到开始标签结束为止，否则结束事件的位置指向 </x>
+            end = _tag_end(data, start)
+            if data[end - 2] != 0x2f:
+                end = _tag_end(data, index)
+            spans[(tag, name)] = (start, end)
+        elif not stack:
+            root_end[0] = index
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    try:
+        parser.Parse(data, True)
+    except expat.ExpatError as e:
+        raise ValueError(f"Current version is not well-formed XML: {e}")
+
+    if len(data) == len(text):
+        to_char = lambda offset: offset
+    else:
+        to_char = lambda offset: len(data[:offset].decode('utf-8'))
+    spans = {key: (to_char(start), to_char(end)) for key, (start, end) in spans.items()}
+    return spans, to_char(root_end[0]) if root_end[0] is not None else len(text)
+
+
+def element_edits(text, elements):
+    """
+    把元素级修改转换为文本编辑
+    :param elements: [{"tag": "link", "name": "base_link", "xml": "<link ...>...</link>"}, ...]
+                     xml 为 null 时删除该元素；元素不存在时插入到根元素末尾
+    :return: [{"start", "end", "text"}, ...]
+    """
+    spans, root_end = locate_elements(text)
+    edits = []
+    for element in elements:
+        if not isinstance(element, dict) or not isinstance(element.get('tag'), str):
+            raise ValueError('Each element needs a tag')
+        key = (element['tag'], element.get('name'))
+        xml = element.get('xml')
+        if xml is not None:
+            try:
+                ET.fromstring(xml)
+            except ET.ParseError as e:
+                raise ValueError(f"Invalid XML for <{key[0]} name={key[1]!r}>: {e}")
+        span = spans.get(key)
+        if span is not None:
+            edits.append({'start': span[0], 'end': span[1], 'text': xml or ''})
+        elif xml is not None:
+            edits.append({'start': root_end, 'end': root_end, 'text': f"  {xml}\n"})
+        else:
+            raise ValueError(f"Element <{key[0]} name={key[1]!r}> not found")
+    return edits
+
+
+class UrdfVersionStore:
+    """
+    URDF 的版本存储（SQLite）：每个文档由若干完整快照和其间的增量（文本编辑列表）组成
+    上传目录中的文件始终是最新版本的完整内容（物化的 head），读取最新版本不经过本存储；
+    历史版本从不晚于它的最近快照开始依次应用增量还原
+      - 增量链超过 snapshot_interval 或增量不比全文小多少时写入快照，限制还原历史版本的代价
+      - 版本数超过 keep 时由后台任务压缩：最早保留的版本改写为快照，更早的版本删除
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.root = None
+        self.db_file = None
+        self.snapshot_interval = 50
+        self.keep = 200
+        self._local = threading.local()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('URDF_VERSIONING_ENABLED', True)
+        self.root = Path(app.config['UPLOAD_FOLDER'])
+        self.db_file = Path(app.config['URDF_VERSION_FILE'])
+        self.snapshot_interval = app.config.get('URDF_VERSION_SNAPSHOT_INTERVAL', self.snapshot_interval)
+        self.keep = app.config.get('URDF_VERSION_KEEP', self.keep)
+        if self.enabled:
+            self.db_file.parent.mkdir(parents=True, exist_ok=True)
+            self._connect().executescript(SCHEMA)
+        app.extensions['urdf_versions'] = self
+
+    def _connect(self):
+        # sqlite 连接不能跨线程共享，每个线程各自持有一个连接；事务由 BEGIN IMMEDIATE 显式控制
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.path != self.db_file:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.path = conn, self.db_file
+        return conn
+
+    def _relative(self, full_path):
+        return str(Path(full_path).relative_to(self.root)).replace('\\', '/')
+
+    def _insert(self, conn, path, version, kind, payload, text):
+        sha256, size = _sha256(text), len(text.encode('utf-8'))
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO versions (path, version, kind, payload, sha256, size, created) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (path, version, kind, zlib.compress(payload, 6), sha256, size, now)
+        )
+        conn.execute(
+            'INSERT OR REPLACE INTO documents (path, head, sha256, size, updated) VALUES (?, ?, ?, ?, ?)',
+            (path, version, sha256, size, now)
+        )
+        return {'version': version, 'sha256': sha256, 'size': size, 'stored': kind}
+
+    def _snapshot(self, conn, path, version, text):
+        return self._insert(conn, path, version, SNAPSHOT, text.encode('utf-8'), text)
+
+    def _sync_head(self, conn, path, full_path):
+        """
+        head 在本存储之外被修改过（如重新上传）时，把当前文件记为一个快照版本（在事务内调用）
+        :return: (版本号, 当前文件内容)；文件不存在时内容为 None
+        """
+        row = conn.execute('SELECT head, sha256 FROM documents WHERE path = ?', (path,)).fetchone()
+        head, head_sha = row if row else (0, None)
+        try:
+            current = Path(full_path).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            current = None
+        if current is not None and _sha256(current) != head_sha:
+            head += 1
+            self._snapshot(conn, path, head, current)
+        return head, current
+
+    def read_head(self, full_path):
+        """
+        读取最新版本的全文：文件与记录的 head 不一致时先把文件记为新版本，返回的内容与版本号始终对应
+        :return: (版本号, 全文)；文档没有版本记录时返回 (None, None)，文件不存在时全文为 None
+        """
+        path = self._relative(full_path)
+        conn = self._connect()
+        row = conn.execute('SELECT head, sha256 FROM documents WHERE path = ?', (path,)).fetchone()
+        if row is None:
+            return None, None
+        try:
+            current = Path(full_path).read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return row[0], None
+        if _sha256(current) == row[1]:
+            return row[0], current
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            head, current = self._sync_head(conn, path, full_path)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return head, current
+
+    def commit(self, full_path, write, content=None, edits=None, elements=None, base_version=None):
+        """
+        保存新版本：给出全文，或相对 base_version 的文本编辑 / 元素修改
+        head 在本存储之外被修改过（如重新上传）时，先把当前文件记为一个快照版本
+        :param full_path: 上传目录中的文件路径
+        :param write: write(full_path, text) 写入物化的 head（在事务内调用，失败时不记录版本）
+        :param base_version: 编辑所基于的版本；None 表示不检查（仅全文保存）
+        :return: 版本信息字典；内容没有变化时 stored 为 None
+        """
+        path = self._relative(full_path)
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            head, current = self._sync_head(conn, path, full_path)
+
+            if base_version is not None and base_version != head:
+                raise VersionConflict(head)
+            if current is None and content is None:
+                raise FileNotFoundError(path)
+
+            if content is not None:
+                delta = diff_text(current, content) if current is not None else None
+                text = content
+            else:
+                if elements:
+                    edits = list(edits or []) + element_edits(current, elements)
+                delta = normalize_edits(current, edits or [])
+                text = apply_edits(current, delta)
+
+            if current is not None and text == current:
+                conn.execute('COMMIT')
+                return {'version': head, 'sha256': _sha256(text), 'size': len(text.encode('utf-8')), 'stored': None}
+
+            write(full_path, text)
+            version = head + 1
+            last_snapshot = conn.execute(
+                'SELECT MAX(version) FROM versions WHERE path = ? AND kind = ?', (path, SNAPSHOT)
+            ).fetchone()[0] or 0
+            payload = json.dumps(delta, ensure_ascii=False).encode('utf-8') if delta is not None else None
+            if payload is None or version - last_snapshot >= self.snapshot_interval or len(payload) * 2 > len(text):
+                info = self._snapshot(conn, path, version, text)
+            else:
+                info = self._insert(conn, path, version, DELTA, payload, text)
+            info['versions'] = conn.execute(
+                'SELECT COUNT(*) FROM versions WHERE path = ?', (path,)
+            ).fetchone()[0]
+            conn.execute('COMMIT')
+            return info
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+    def head(self, full_path):
+        """:return: 当前版本号，文档没有版本记录时为 None"""
+        row = self._connect().execute(
+            'SELECT head FROM documents WHERE path = ?', (self._relative(full_path),)
+        ).fetchone()
+        return row[0] if row else None
+
+    def history(self, full_path):
+        """:return: [{version, stored, sha256, size, created}]，从新到旧"""
+        rows = self._connect().execute(
+            'SELECT version, kind, sha256, size, created FROM versions WHERE path = ? ORDER BY version DESC',
+            (self._relative(full_path),)
+        ).fetchall()
+        return [
+            {'version': version, 'stored': kind, 'sha256': sha256, 'size': size, 'created': created}
+            for version, kind, sha256, size, created in rows
+        ]
+
+    def _reconstruct(self, conn, path, version):
+        rows = conn.execute(
+            'SELECT version, kind, payload FROM versions WHERE path = ? AND version <= ? AND version >= '
+            '(SELECT MAX(version) FROM versions WHERE path = ? AND version <= ? AND kind = ?) ORDER BY version',
+            (path, version, path, version, SNAPSHOT)
+        ).fetchall()
+        if not rows or rows[-1][0] != version:
+            return None
+        text = None
+        for _, kind, payload in rows:
+            payload = zlib.decompress(payload).decode('utf-8')
+            if kind == SNAPSHOT:
+                text = payload
+            else:
+                text = apply_edits(text, [tuple(edit) for edit in json.loads(payload)])
+        return text
+
+    def get(self, full_path, version):
+        """
+        还原指定版本的全文
+        :return: 文本；版本不存在（或已被压缩删除）时返回 None
+        """
+        return self._reconstruct(self._connect(), self._relative(full_path), version)
+
+    def compact(self, full_path):
+        """
+        只保留最近 keep 个版本：最早保留的版本改写为快照，之前的版本删除
+        :return: 删除的版本数
+        """
+        path = self._relative(full_path)
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT head FROM documents WHERE path = ?', (path,)).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return 0
+            oldest = row[0] - self.keep + 1
+            kind = conn.execute(
+                'SELECT kind FROM versions WHERE path = ? AND version = ?', (path, oldest)
+            ).fetchone()
+            if kind is None:
+                conn.execute('COMMIT')
+                return 0
+            if kind[0] != SNAPSHOT:
+                text = self._reconstruct(conn, path, oldest)
+                conn.execute(
+                    'UPDATE versions SET kind = ?, payload = ? WHERE path = ? AND version = ?',
+                    (SNAPSHOT, zlib.compress(text.encode('utf-8'), 6), path, oldest)
+                )
+            removed = conn.execute(
+                'DELETE FROM versions WHERE path = ? AND version < ?', (path, oldest)
+            ).rowcount
+            conn.execute('COMMIT')
+            return removed
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
@@ -1,6 +1,66 @@
+import os
+import time
+from pathlib import Path
 from flask import current_app
 
 
 def is_allowed_file(filename):
     return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
\ No newline at end of file
+           filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
+
+
+def file_etag(st):
+    """
+    根据 inode + mtime + size 生成强 ETag（不读取文件内容）
+    :param st: os.stat 结果
+    """
+    return f"{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}"
+
+
+def is_within(path, root):
+    """
+    path 解析符号链接和 .. 之后是否仍位于 root 目录之内
+    """
+    try:
+        Path(path).resolve().relative_to(Path(root).resolve())
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+def prune_folder(folder, max_bytes=0, max_age=0):
+    """
+    清理派生文件目录：删除超过 max_age 秒未修改的文件，总大小超过 max_bytes 时按最久未修改优先淘汰
+    （0 表示不限制）
+    """
+    now = time.time()
+    files = []
+    total = 0
+    with os.scandir(folder) as it:
+        for entry in it:
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            if max_age and now - st.st_mtime > max_age:
+                _remove(entry.path)
+                continue
+            files.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+
+    if max_bytes and total > max_bytes:
+        files.sort()
+        for _, size, path in files:
+            if total <= max_bytes:
+                break
+            _remove(path)
+            total -= size
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
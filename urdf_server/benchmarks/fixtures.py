@@ -0,0 +1,124 @@
+import os
+import random
+import struct
+from pathlib import Path
+
+# 生成合成的 ROS package 目录树，用于基准测试
+# 布局：
+#   pkg_000/package.xml
+#   pkg_000/urdf/robot_000.urdf          每个 package 一个URDF，连杆数由 links 决定
+#   pkg_000/meshes/d0/d1/.../mesh_000.stl  mesh 放在 depth 层子目录中
+# URDF 的连杆依次引用本 package 和其他 package 的 mesh（package:// 路径），
+# 同一组参数和随机种子总是生成完全相同的内容
+
+
+def random_triangles(rng, count):
+    """在单位立方体内随机生成三角形，返回 [(法向量, 顶点1, 顶点2, 顶点3)]"""
+    triangles = []
+    for _ in range(count):
+        points = [(rng.random(), rng.random(), rng.random()) for _ in range(3)]
+        triangles.append(((0.0, 0.0, 1.0),) + tuple(points))
+    return triangles
+
+
+def write_ascii_stl(path, triangles, name='mesh'):
+    lines = [f'solid {name}']
+    for normal, *points in triangles:
+        lines.append(f'  facet normal {normal[0]:e} {normal[1]:e} {normal[2]:e}')
+        lines.append('    outer loop')
+        for x, y, z in points:
+            lines.append(f'      vertex {x:e} {y:e} {z:e}')
+        lines.append('    endloop')
+        lines.append('  endfacet')
+    lines.append(f'endsolid {name}')
+    Path(path).write_text('\n'.join(lines) + '\n', encoding='ascii')
+
+
+def write_binary_stl(path, triangles):
+    with open(path, 'wb') as f:
+        f.write(b'synthetic benchmark mesh'.ljust(80, b'\0'))
+        f.write(struct.pack('<I', len(triangles)))
+        for normal, *points in triangles:
+            f.write(struct.pack('<12fH', *normal, *points[0], *points[1], *points[2], 0))
+
+
+def mesh_dir(depth):
+    return '/'.join(['meshes'] + [f'd{level}' for level in range(depth)])
+
+
+def robot_urdf(name, meshes):
+    """
+    生成串联结构的URDF
+    :param meshes: 每个连杆引用的 mesh（package:// 路径）
+    """
+    parts = ['<?xml version="1.0"?>', f'<robot name="{name}">', '  <link name="base_link"/>']
+    for i, mesh in enumerate(meshes):
+        parts.append(f'  <link name="link_{i}">')
+        for tag in ('visual', 'collision'):
+            parts.append(f'    <{tag}><origin xyz="0 0 0.05" rpy="0 0 0"/>'
+                         f'<geometry><mesh filename="{mesh}" scale="0.001 0.001 0.001"/></geometry></{tag}>')
+        parts.append('    <inertial><mass value="1.0"/>'
+                     '<inertia ixx="0.01" ixy="0" ixz="0" iyy="0.01" iyz="0" izz="0.01"/></inertial>')
+        parts.append('  </link>')
+        parent = 'base_link' if i == 0 else f'link_{i - 1}'
+        parts.append(
+            f'  <joint name="joint_{i}" type="revolute"><parent link="{parent}"/><child link="link_{i}"/>'
+            f'<origin xyz="0 0 0.1" rpy="0 0 0"/><axis xyz="0 0 1"/>'
+            f'<limit lower="-3.14" upper="3.14" effort="10" velocity="1"/></joint>'
+        )
+    parts.append('</robot>')
+    return '\n'.join(parts) + '\n'
+
+
+def generate_tree(root, packages=10, depth=2, meshes=10, links=20, triangles=500, stl_format='mixed', seed=0):
+    """
+    在 root 下生成合成的 package 目录树
+    :param packages: package 数量
+    :param depth: mesh 所在子目录的层数
+    :param meshes: 每个 package 的 mesh 数量
+    :param links: 每个URDF的连杆数（决定URDF大小和引用的mesh数）
+    :param triangles: 每个 mesh 的三角形数
+    :param stl_format: ascii、binary 或 mixed（交替）
+    :param seed: 随机种子
+    :return: 概况字典（路径列表与文件数/字节数），供基准场景选取请求目标
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    summary = {'urdfs': [], 'meshes': [], 'directories': [], 'files': 0, 'bytes': 0}
+
+    for p in range(packages):
+        package = f'pkg_{p:03d}'
+        mesh_folder = root / package / mesh_dir(depth)
+        mesh_folder.mkdir(parents=True, exist_ok=True)
+        (root / package / 'urdf').mkdir(exist_ok=True)
+        (root / package / 'package.xml').write_text(
+            f'<?xml version="1.0"?>\n<package format="2"><name>{package}</name><version>0.0.0</version></package>\n'
+        )
+        for m in range(meshes):
+            path = mesh_folder / f'mesh_{m:03d}.stl'
+            binary = stl_format == 'binary' or (stl_format == 'mixed' and m % 2 == 1)
+            if binary:
+                write_binary_stl(path, random_triangles(rng, triangles))
+            else:
+                write_ascii_stl(path, random_triangles(rng, triangles), name=path.stem)
+            summary['meshes'].append(path.relative_to(root).as_posix())
+        summary['directories'].append(f'{package}/{mesh_dir(depth)}')
+
+    # 每个URDF主要引用本 package 的 mesh，每隔几个连杆引用一次其他 package，覆盖跨 package 的解析
+    for p in range(packages):
+        package = f'pkg_{p:03d}'
+        references = []
+        for i in range(links):
+            owner = p if i % 4 or packages == 1 else rng.randrange(packages)
+            references.append(
+                f'package://pkg_{owner:03d}/{mesh_dir(depth)}/mesh_{rng.randrange(max(meshes, 1)):03d}.stl'
+            )
+        path = root / package / 'urdf' / f'robot_{p:03d}.urdf'
+        path.write_text(robot_urdf(f'robot_{p:03d}', references if meshes else []), encoding='utf-8')
+        summary['urdfs'].append(path.relative_to(root).as_posix())
+
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            summary['files'] += 1
+            summary['bytes'] += os.path.getsize(os.path.join(dirpath, filename))
+    return summary
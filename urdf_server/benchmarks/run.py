@@ -0,0 +1,344 @@
+"""
+基准测试：在合成的上传目录上通过 Flask 测试客户端驱动 create_app，输出 JSON 结果
+
+在 urdf_server 目录下运行：
+    python -m benchmarks.run --packages 20 --meshes 20 --output before.json
+    python -m benchmarks.run --packages 20 --meshes 20 --output after.json --baseline before.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from .fixtures import generate_tree, robot_urdf, write_ascii_stl, write_binary_stl, mesh_dir, random_triangles
+
+SCENARIOS = (
+    'list', 'list_cold', 'urdf', 'urdf_cold', 'resource', 'resource_gzip', 'resource_304',
+    'upload_folder', 'save'
+)
+
+
+def peak_rss():
+    """进程的峰值常驻内存（字节），不支持的平台返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, errors, body_bytes):
+    values = sorted(latencies)
+    ms = lambda value: round(value * 1000, 4) if value is not None else None
+    return {
+        'requests': len(values),
+        'errors': errors,
+        'mean_ms': ms(sum(values) / len(values)) if values else None,
+        'p50_ms': ms(percentile(values, 0.50)),
+        'p90_ms': ms(percentile(values, 0.90)),
+        'p99_ms': ms(percentile(values, 0.99)),
+        'max_ms': ms(values[-1]) if values else None,
+        'throughput_rps': round(len(values) / elapsed, 2) if elapsed > 0 else None,
+        'bytes_per_request': round(body_bytes / len(values)) if values else 0
+    }
+
+
+def make_config(base_dir):
+    """把 Config 中的上传目录和缓存目录（及其下的所有路径）重定向到 base_dir"""
+    from config import Config
+
+    cache_folder = Config.CACHE_FOLDER
+    overrides = {
+        'UPLOAD_FOLDER': base_dir / 'uploads',
+        'REQUEST_PROFILING': False,
+        'ALLOWED_EXTENSIONS': set(Config.ALLOWED_EXTENSIONS) | {'stl'}
+    }
+    for key in dir(Config):
+        value = getattr(Config, key)
+        if key.isupper() and isinstance(value, Path) and (value == cache_folder or cache_folder in value.parents):
+            overrides[key] = base_dir / 'cache' / value.relative_to(cache_folder)
+    return type('BenchmarkConfig', (Config,), overrides)
+
+
+class Runner:
+    def __init__(self, app, fixture, iterations, warmup, seed):
+        self.app = app
+        self.client = app.test_client()
+        self.fixture = fixture
+        self.iterations = iterations
+        self.warmup = warmup
+        self.rng = random.Random(seed)
+
+    def measure(self, request, prepare=None, expect=(200,)):
+        """
+        执行 warmup + iterations 次请求
+        :param request: request(i) -> 响应对象
+        :param prepare: prepare(i)，每次请求前执行，不计入耗时（如清空缓存）
+        """
+        for i in range(self.warmup):
+            if prepare:
+                prepare(i)
+            request(i).close()
+
+        latencies = []
+        errors = 0
+        body_bytes = 0
+        elapsed = 0.0
+        for i in range(self.iterations):
+            if prepare:
+                prepare(i)
+            started = time.perf_counter()
+            response = request(i)
+            body = response.get_data()
+            duration = time.perf_counter() - started
+            response.close()
+            elapsed += duration
+            latencies.append(duration)
+            body_bytes += len(body)
+            if response.status_code not in expect:
+                errors += 1
+        return summarize(latencies, elapsed, errors, body_bytes)
+
+    def wait_for_jobs(self):
+        """等待写入触发的后台任务完成，避免影响下一个场景，返回等待时间（毫秒）"""
+        from application.extensions import job_queue
+        started = time.perf_counter()
+        job_ids = [job['job_id'] for job in job_queue.list(limit=100000) if job['status'] in ('queued', 'running')]
+        job_queue.wait(job_ids, timeout=600)
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    # ---- 场景 ----
+
+    def scenario_list(self):
+        directories = [''] + self.fixture['directories']
+        return self.measure(lambda i: self.client.get(
+            '/api/files/list', query_string={'path': directories[i % len(directories)], 'per_page': 50}
+        ))
+
+    def scenario_list_cold(self):
+        from application.extensions import directory_listing
+        directories = [''] + self.fixture['directories']
+        return self.measure(
+            lambda i: self.client.get(
+                '/api/files/list', query_string={'path': directories[i % len(directories)], 'per_page': 50}
+            ),
+            prepare=lambda i: directory_listing.invalidate(directories[i % len(directories)])
+        )
+
+    def scenario_urdf(self):
+        urdfs = self.fixture['urdfs']
+        return self.measure(lambda i: self.client.get(f'/api/files/{urdfs[i % len(urdfs)]}/urdf'))
+
+    def scenario_urdf_cold(self):
+        # 每次清空缓存，测量完整的解析、mesh 路径解析和序列化
+        from application.extensions import urdf_cache
+        urdfs = self.fixture['urdfs']
+        return self.measure(
+            lambda i: self.client.get(f'/api/files/{urdfs[i % len(urdfs)]}/urdf'),
+            prepare=lambda i: urdf_cache.clear()
+        )
+
+    def scenario_resource(self):
+        meshes = self.fixture['meshes']
+        return self.measure(lambda i: self.client.get(
+            f'/api/files/resource/{meshes[i % len(meshes)]}', headers={'Accept-Encoding': 'identity'}
+        ))
+
+    def scenario_resource_gzip(self):
+        meshes = self.fixture['meshes']
+        return self.measure(lambda i: self.client.get(
+            f'/api/files/resource/{meshes[i % len(meshes)]}', headers={'Accept-Encoding': 'gzip'}
+        ))
+
+    def scenario_resource_304(self):
+        meshes = self.fixture['meshes']
+        etags = {}
+        for path in meshes:
+            response = self.client.get(f'/api/files/resource/{path}', headers={'Accept-Encoding': 'identity'})
+            etags[path] = response.headers.get('ETag')
+            response.close()
+        return self.measure(
+            lambda i: self.client.get(
+                f'/api/files/resource/{meshes[i % len(meshes)]}',
+                headers={'Accept-Encoding': 'identity', 'If-None-Match': etags[meshes[i % len(meshes)]]}
+            ),
+            expect=(304,)
+        )
+
+    def scenario_upload_folder(self, files_per_upload=5, triangles=500):
+        # 预先生成上传内容，不计入耗时；一半 ASCII、一半二进制
+        payloads = []
+        scratch = Path(tempfile.mkdtemp())
+        try:
+            for n in range(files_per_upload):
+                path = scratch / f'mesh_{n}.stl'
+                if n % 2:
+                    write_binary_stl(path, random_triangles(self.rng, triangles))
+                else:
+                    write_ascii_stl(path, random_triangles(self.rng, triangles))
+                payloads.append((path.name, path.read_bytes()))
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+        # warmup 与正式测量各自写入新的目录
+        counter = iter(range(10 ** 9))
+
+        def upload(i):
+            folder = f'bench_upload/{next(counter):05d}/{mesh_dir(1)}'
+            files = [(io.BytesIO(data), f'{folder}/{name}') for name, data in payloads]
+            return self.client.post(
+                '/api/files/upload-folder', data={'files': files}, content_type='multipart/form-data'
+            )
+
+        result = self.measure(upload)
+        result['files_per_request'] = files_per_upload
+        result['background_ms'] = self.wait_for_jobs()
+        return result
+
+    def scenario_save(self):
+        meshes = [f'package://{path}' for path in self.fixture['meshes'][:20]]
+        content = robot_urdf('bench_save', meshes)
+        counter = iter(range(10 ** 9))
+        result = self.measure(lambda i: self.client.post(
+            '/api/files/save', json={'filename': f'bench_save/robot_{next(counter):06d}.urdf', 'content': content}
+        ))
+        result['background_ms'] = self.wait_for_jobs()
+        return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(result, baseline):
+    """与之前的结果对比，返回每个场景 p50/p90/吞吐量的变化比例（正数表示变慢/吞吐下降）"""
+    changes = {}
+    for name, current in result['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if not previous:
+            continue
+        change = {}
+        for key in ('p50_ms', 'p90_ms', 'p99_ms'):
+            if current.get(key) and previous.get(key):
+                change[key] = round(current[key] / previous[key] - 1, 4)
+        if current.get('throughput_rps') and previous.get('throughput_rps'):
+            change['throughput_rps'] = round(current['throughput_rps'] / previous['throughput_rps'] - 1, 4)
+        changes[name] = change
+    return changes
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='URDF server benchmarks')
+    parser.add_argument('--packages', type=int, default=10, help='number of synthetic packages')
+    parser.add_argument('--depth', type=int, default=2, help='directory depth of the mesh folders')
+    parser.add_argument('--meshes', type=int, default=10, help='meshes per package')
+    parser.add_argument('--links', type=int, default=20, help='links per URDF (controls URDF size)')
+    parser.add_argument('--triangles', type=int, default=500, help='triangles per mesh')
+    parser.add_argument('--stl-format', choices=('ascii', 'binary', 'mixed'), default='mixed')
+    parser.add_argument('--iterations', type=int, default=200, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=10, help='unmeasured requests per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', help='directory for the generated tree (default: a temporary directory)')
+    parser.add_argument('--keep', action='store_true', help='keep the generated tree')
+    parser.add_argument('--output', help='write the JSON result to this file instead of stdout')
+    parser.add_argument('--baseline', help='previous JSON result to compare against')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)}")
+
+    base_dir = Path(args.workdir or tempfile.mkdtemp(prefix='urdf-bench-')).absolute()
+    config = make_config(base_dir)
+    try:
+        started = time.perf_counter()
+        fixture = generate_tree(
+            config.UPLOAD_FOLDER, packages=args.packages, depth=args.depth, meshes=args.meshes,
+            links=args.links, triangles=args.triangles, stl_format=args.stl_format, seed=args.seed
+        )
+        fixture_seconds = time.perf_counter() - started
+
+        from application import create_app
+        from application.extensions import job_queue
+        started = time.perf_counter()
+        app = create_app(config)
+        startup_seconds = time.perf_counter() - started
+        # 启动时的后台任务（如恢复的任务）结束后再开始测量
+        runner = Runner(app, fixture, args.iterations, args.warmup, args.seed)
+        runner.wait_for_jobs()
+
+        result = {
+            'meta': {
+                'revision': git_revision(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'parameters': {key: value for key, value in vars(args).items()
+                               if key not in ('output', 'baseline', 'workdir', 'keep')},
+                'fixture': {key: fixture[key] for key in ('files', 'bytes')},
+                'fixture_seconds': round(fixture_seconds, 3),
+                'startup_seconds': round(startup_seconds, 3)
+            },
+            'scenarios': {}
+        }
+        for name in scenarios:
+            rss_before = peak_rss()
+            scenario = getattr(runner, f'scenario_{name}')()
+            scenario['peak_rss_bytes'] = peak_rss()
+            if rss_before is not None:
+                scenario['peak_rss_growth_bytes'] = scenario['peak_rss_bytes'] - rss_before
+            result['scenarios'][name] = scenario
+            print(f"{name:>14}: p50 {scenario['p50_ms']} ms, p99 {scenario['p99_ms']} ms, "
+                  f"{scenario['throughput_rps']} req/s, {scenario['errors']} errors", file=sys.stderr)
+        job_queue.shutdown()
+    finally:
+        if not args.keep:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            result['comparison'] = compare(result, json.load(f))
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n', encoding='utf-8')
+    else:
+        print(text)
+    return 1 if any(s['errors'] for s in result['scenarios'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
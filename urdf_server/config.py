@@ -5,4 +5,95 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-fallback-key')
     UPLOAD_FOLDER = Path('C:/uploads').absolute()
     ALLOWED_EXTENSIONS = {'urdf', 'txt', 'pdf'}
-    MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB
+    # 派生数据（索引、缓存等）目录，放在上传目录之外，避免出现在文件列表中
+    CACHE_FOLDER = Path('C:/uploads_cache').absolute()
+    PACKAGE_INDEX_FILE = CACHE_FOLDER / 'package_index.json'
+    PACKAGE_INDEX_RESCAN_INTERVAL = 60  # package:// 解析未命中时重新扫描上传目录的最短间隔（秒）
+    URDF_CACHE_SIZE = 128  # 处理后URDF的最大缓存条目数
+    LISTING_CACHE_SIZE = 256  # 目录列表的最大缓存目录数
+    LISTING_CACHE_TTL = 30  # 目录列表最长缓存时间（秒），在应用之外原地修改的文件在此之后显示新的大小/时间
+    LIST_MAX_PER_PAGE = 1000
+    RESOURCE_MAX_AGE = 365 * 24 * 3600  # 带版本号(?v=)的资源URL的缓存时间
+    # mesh 预压缩（gzip，安装 brotli 时同时生成 br）
+    MESH_COMPRESSION_ENABLED = True
+    MESH_VARIANT_FOLDER = CACHE_FOLDER / 'variants'
+    MESH_COMPRESS_EXTENSIONS = {'stl', 'dae', 'obj'}
+    MESH_COMPRESS_MIN_SIZE = 1024
+    MESH_VARIANT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2GB
+    MESH_VARIANT_MAX_AGE = 30 * 24 * 3600  # 30天
+    # STL mesh 多级细节（LOD）：数值为包围盒最长边上的聚类网格数
+    MESH_LOD_ENABLED = True
+    MESH_LOD_FOLDER = CACHE_FOLDER / 'lod'
+    MESH_LOD_RESOLUTIONS = {'low': 32, 'medium': 128}
+    MESH_LOD_MIN_FACES = 5000  # 三角形数低于该值的 mesh 不做简化
+    MESH_LOD_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2GB
+    MESH_LOD_MAX_AGE = 30 * 24 * 3600  # 30天
+    # 内容寻址存储：上传目录中的文件为指向 blob 的硬链接，相同内容只保存一份
+    BLOB_STORE_ENABLED = True
+    BLOB_FOLDER = CACHE_FOLDER / 'blobs'
+    BLOB_MANIFEST_FILE = CACHE_FOLDER / 'manifest.sqlite3'
+    BLOB_GC_INTERVAL = 24 * 3600  # 回收不再被引用的 blob 的间隔（写入文件时检查），0 表示不回收
+    BLOB_GC_GRACE = 3600  # 最近写入的 blob 可能正在链接，超过该时间才回收
+    UPLOAD_WORKERS = 4  # 文件夹上传时并发完成文件写入的线程数
+    # 分块上传：会话目录、块大小及未提交会话的有效期
+    UPLOAD_SESSION_FOLDER = CACHE_FOLDER / 'upload_sessions'
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+    UPLOAD_CHUNK_MAX_SIZE = 64 * 1024 * 1024
+    UPLOAD_SESSION_TTL = 24 * 3600
+    UPLOAD_SESSION_MAX_SIZE = 20 * 1024 * 1024 * 1024  # 单个分块上传会话声明的最大文件大小（20GB）
+    FK_MAX_CONFIGURATIONS = 10000  # 单次批量正运动学请求的最大构型数
+    # 自碰撞检测：单次请求的最大构型数，间隙查询的默认最大距离（米）
+    COLLISION_MAX_CONFIGURATIONS = 1000
+    COLLISION_MAX_DISTANCE = 0.05
+    # 超过该大小的文件在 /urdf 与 /content 接口中使用流式输出（iterparse + 分块响应）
+    URDF_STREAM_THRESHOLD = 8 * 1024 * 1024
+    TEXT_WINDOW_MAX_BYTES = 1024 * 1024  # /text 接口单次返回的最大字节数
+    METADATA_INDEX_FILE = CACHE_FOLDER / 'metadata.sqlite3'  # URDF元数据检索索引
+    # 后台任务：I/O 线程数、CPU 密集任务（含批量校验）共用的进程数、任务日志及已完成任务的保留时间
+    JOB_IO_WORKERS = 4
+    JOB_CPU_WORKERS = 2
+    JOB_JOURNAL_FILE = CACHE_FOLDER / 'jobs.sqlite3'
+    JOB_HISTORY_TTL = 24 * 3600
+    JOB_LEASE_TTL = 60  # 多进程共用任务日志时未完成任务的租约时长（秒），所属进程退出后超过该时间才由其他进程接手
+    # mesh 几何信息（包围盒、三角形数等），按内容标识存放在缓存目录中
+    MESH_METADATA_ENABLED = True
+    MESH_METADATA_FOLDER = CACHE_FOLDER / 'mesh_meta'
+    # 运行指标（/metrics）与单请求性能分析（请求头 X-Profile: 1，None 表示仅在调试模式下允许）
+    METRICS_ENABLED = True
+    REQUEST_PROFILING = None
+    PROFILE_FOLDER = CACHE_FOLDER / 'profiles'
+    PROFILE_STATS_LIMIT = 40
+    # 目录变更事件（/api/files/changes）：保留的事件数、目录监视的检查间隔和完整比较间隔（秒）、
+    # 无订阅后继续监视的时间、长轮询最长等待时间、SSE 心跳间隔和单次连接的最长时间
+    CHANGE_FEED_ENABLED = True
+    CHANGE_FEED_HISTORY = 1000
+    CHANGE_FEED_POLL_INTERVAL = 2.0
+    CHANGE_FEED_RESCAN_INTERVAL = 30.0
+    CHANGE_FEED_WATCH_TTL = 60.0
+    CHANGE_FEED_TIMEOUT = 25
+    CHANGE_FEED_HEARTBEAT = 15
+    CHANGE_FEED_STREAM_DURATION = 300
+    # URDF 版本存储：快照 + 增量，上传目录中的文件始终是最新版本
+    # 增量链超过 SNAPSHOT_INTERVAL 时写入快照；每个文档保留最近 KEEP 个版本，更早的由后台任务压缩删除
+    URDF_VERSIONING_ENABLED = True
+    URDF_VERSION_FILE = CACHE_FOLDER / 'versions.sqlite3'
+    URDF_VERSION_SNAPSHOT_INTERVAL = 50
+    URDF_VERSION_KEEP = 200
+    # 多进程部署（gunicorn/waitress 等）时各 worker 共享的缓存：package 索引、处理后的URDF、目录列表
+    # 保存在同一个 SQLite 文件中（WAL + mmap），重启后新进程从中预热最近使用的条目
+    SHARED_CACHE_ENABLED = False
+    SHARED_CACHE_FILE = CACHE_FOLDER / 'shared.sqlite3'
+    SHARED_CACHE_MAX_ENTRIES = 4096  # 每类缓存的最大条目数
+    SHARED_CACHE_WARM_ENTRIES = 256  # 启动时预热的条目数
+    SHARED_CACHE_MMAP_SIZE = 256 * 1024 * 1024
+
+
+class ProductionConfig(Config):
+    """生产部署：多个 worker 进程共享缓存，关闭调试与单请求性能分析"""
+    DEBUG = False
+    SHARED_CACHE_ENABLED = True
+    REQUEST_PROFILING = False
+    # 共享缓存承担大部分命中，每个进程的内存缓存可以小一些
+    URDF_CACHE_SIZE = 32
+    LISTING_CACHE_SIZE = 64
\ No newline at end of file
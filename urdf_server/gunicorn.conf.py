@@ -0,0 +1,10 @@
+# gunicorn 默认配置（在 urdf_server 目录中运行 gunicorn wsgi:app 时自动加载），部署说明见 README
+import os
+
+bind = os.environ.get('URDF_SERVER_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('URDF_SERVER_WORKERS', 4))
+# SSE 变更流长时间占用处理线程，必须使用多线程 worker
+worker_class = 'gthread'
+threads = int(os.environ.get('URDF_SERVER_THREADS', 16))
+# 不使用 preload：每个 worker 各自创建应用（线程池、进程池、SQLite 连接不能跨 fork 共享）
+preload_app = False
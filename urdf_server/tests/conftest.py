@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import Config  # noqa: E402
+
+
+def ascii_stl(triangles=50):
+    """生成可被压缩的 ASCII STL 内容"""
+    lines = ['solid test']
+    for i in range(triangles):
+        lines += [
+            '  facet normal 0 0 1', '    outer loop',
+            f'      vertex {i} 0 0', '      vertex 0 1 0', f'      vertex 0 0 {i + 1}',
+            '    endloop', '  endfacet'
+        ]
+    lines.append('endsolid test')
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """以临时目录创建应用，关键字参数覆盖配置项"""
+    def factory(**settings):
+        # 所有派生数据目录都放到临时目录中，与 Config 中 CACHE_FOLDER 下的相对位置相同
+        cache_folder = tmp_path / 'cache'
+        overrides = {
+            'TESTING': True,
+            'UPLOAD_FOLDER': tmp_path / 'uploads',
+            'ALLOWED_EXTENSIONS': {'urdf', 'txt', 'pdf', 'stl'},
+            'CHANGE_FEED_ENABLED': False,
+        }
+        for name in dir(Config):
+            value = getattr(Config, name)
+            if isinstance(value, Path) and (value == Config.CACHE_FOLDER or Config.CACHE_FOLDER in value.parents):
+                overrides[name] = cache_folder / value.relative_to(Config.CACHE_FOLDER)
+        overrides.update(settings)
+
+        from application import create_app
+        return create_app(type('TestConfig', (Config,), overrides))
+    return factory
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def upload_folder(app):
+    return Path(app.config['UPLOAD_FOLDER'])
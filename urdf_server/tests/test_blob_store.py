@@ -0,0 +1,83 @@
+import io
+import os
+
+
+def upload(client, name, data):
+    response = client.post('/api/files/upload', data={'file': (io.BytesIO(data), name)})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def blob_names(blob_store):
+    return {blob.name for blob in blob_store.folder.glob('??/*')}
+
+
+def test_overwritten_and_deleted_files_release_blobs(app, client, upload_folder):
+    blob_store = app.extensions['blob_store']
+    # 回收由测试直接调用；宽限期为0时后台回收会删除正在链接的 blob
+    blob_store.gc_interval = 0
+    blob_store.gc_grace = 0
+
+    upload(client, 'a.txt', b'first')
+    first = blob_names(blob_store)
+    upload(client, 'a.txt', b'second')
+    upload(client, 'b.txt', b'kept')
+    assert len(blob_names(blob_store)) == 3
+
+    blob_store.collect_garbage()
+    remaining = blob_names(blob_store)
+    assert not first & remaining
+    assert len(remaining) == 2
+
+    (upload_folder / 'b.txt').unlink()
+    blob_store.collect_garbage()
+    assert len(blob_names(blob_store)) == 1
+    assert (upload_folder / 'a.txt').read_bytes() == b'second'
+
+
+def test_collection_is_scheduled_from_writes(app, client):
+    blob_store = app.extensions['blob_store']
+    assert blob_store.gc_due()
+    result = upload(client, 'a.txt', b'data')
+    assert app.extensions['job_queue'].wait(result['jobs'], timeout=30)
+    assert not blob_store.gc_due()
+    assert blob_names(blob_store)
+
+
+def test_duplicate_upload_keeps_existing_digests(app, client, upload_folder):
+    blob_store = app.extensions['blob_store']
+    blob_store.gc_interval = 0
+
+    upload(client, 'a.txt', b'same')
+    a = upload_folder / 'a.txt'
+    digest = blob_store.digest_for(a, a.stat())
+    assert digest
+
+    # 复用 blob 不能改动共享 inode 的元数据，否则 a.txt 的清单记录失效
+    upload(client, 'b.txt', b'same')
+    b = upload_folder / 'b.txt'
+    assert blob_store.digest_for(a, a.stat()) == digest
+    assert blob_store.digest_for(b, b.stat()) == digest
+    assert blob_store.prune_manifest() == 0
+
+
+def test_reused_blob_is_within_grace_period(app, client, upload_folder):
+    blob_store = app.extensions['blob_store']
+    blob_store.gc_interval = 0
+    blob_store.gc_grace = 3600
+
+    upload(client, 'a.txt', b'same')
+    (upload_folder / 'a.txt').unlink()
+    blob = next(blob_store.folder.glob('??/*'))
+    os.utime(blob, (0, 0))
+
+    # 宽限期以清单中的复用时间为准，而不是 blob 的 mtime
+    upload(client, 'b.txt', b'same')
+    (upload_folder / 'b.txt').unlink()
+    assert blob.stat().st_mtime == 0
+    blob_store.collect_garbage()
+    assert blob.exists()
+
+    blob_store.gc_grace = 0
+    blob_store.collect_garbage()
+    assert not blob.exists()
@@ -0,0 +1,99 @@
+import json
+import struct
+
+import pytest
+
+from application.services.bundle_service import BUNDLE_MAGIC, BUNDLE_VERSION
+from conftest import ascii_stl
+
+URDF = '''<robot name="arm">
+  <link name="base"><visual><geometry><mesh filename="meshes/base.stl"/></geometry></visual></link>
+  <link name="tool"><visual><geometry><mesh filename="meshes/tool.stl"/></geometry></visual></link>
+  <joint name="j1" type="fixed"><parent link="base"/><child link="tool"/></joint>
+</robot>
+'''
+
+
+@pytest.fixture
+def robot(upload_folder):
+    meshes = upload_folder / 'arm' / 'meshes'
+    meshes.mkdir(parents=True)
+    (meshes / 'base.stl').write_text(ascii_stl(10))
+    (meshes / 'tool.stl').write_text(ascii_stl(20))
+    (upload_folder / 'arm' / 'arm.urdf').write_text(URDF)
+    return upload_folder / 'arm'
+
+
+def parse_bundle(data):
+    assert data[:len(BUNDLE_MAGIC)] == BUNDLE_MAGIC
+    version, table_length = struct.unpack_from('<II', data, len(BUNDLE_MAGIC))
+    assert version == BUNDLE_VERSION
+    start = len(BUNDLE_MAGIC) + 8
+    return json.loads(data[start:start + table_length])
+
+
+def test_bundle_entries_slice_to_files(client, robot):
+    response = client.get('/api/files/arm/arm.urdf/bundle')
+    assert response.status_code == 200
+    data = response.data
+    assert len(data) == response.content_length
+
+    table = parse_bundle(data)
+    entries = table['entries']
+    urdf = entries[table['urdf']]
+    assert b'<robot' in data[urdf['offset']:urdf['offset'] + urdf['length']]
+
+    meshes = {entry['name']: entry for entry in entries if entry['url']}
+    assert sorted(meshes) == ['arm/meshes/base.stl', 'arm/meshes/tool.stl']
+    for name, entry in meshes.items():
+        assert data[entry['offset']:entry['offset'] + entry['length']] == (robot.parent / name).read_bytes()
+    assert entries[-1]['offset'] + entries[-1]['length'] == len(data)
+
+
+def test_bundle_range_and_etag(client, robot):
+    full = client.get('/api/files/arm/arm.urdf/bundle')
+    etag = full.headers['ETag']
+
+    partial = client.get('/api/files/arm/arm.urdf/bundle', headers={'Range': 'bytes=100-199'})
+    assert partial.status_code == 206
+    assert partial.data == full.data[100:200]
+    assert partial.headers['Content-Range'] == f'bytes 100-199/{len(full.data)}'
+
+    # If-Range 与当前 ETag 不一致时返回完整内容
+    stale = client.get('/api/files/arm/arm.urdf/bundle', headers={'Range': 'bytes=100-199', 'If-Range': '"stale"'})
+    assert stale.status_code == 200
+    assert stale.data == full.data
+
+    beyond = client.get('/api/files/arm/arm.urdf/bundle', headers={'Range': f'bytes={len(full.data)}-'})
+    assert beyond.status_code == 416
+    assert beyond.headers['Content-Range'] == f'bytes */{len(full.data)}'
+
+    assert client.get('/api/files/arm/arm.urdf/bundle', headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_bundle_etag_changes_with_mesh(client, robot):
+    before = client.get('/api/files/arm/arm.urdf/bundle').headers['ETag']
+    (robot / 'meshes' / 'tool.stl').write_text(ascii_stl(30))
+    response = client.get('/api/files/arm/arm.urdf/bundle')
+    assert response.headers['ETag'] != before
+    entry = next(e for e in parse_bundle(response.data)['entries'] if e['name'] == 'arm/meshes/tool.stl')
+    assert response.data[entry['offset']:entry['offset'] + entry['length']] == ascii_stl(30).encode()
+
+
+def test_bundle_skips_files_outside_upload_folder(client, robot, tmp_path):
+    secret = tmp_path / 'secret.stl'
+    secret.write_text('top secret')
+    (robot / 'meshes' / 'link.stl').symlink_to(secret)
+    (robot / 'evil.urdf').write_text('''<robot name="evil">
+  <link name="a"><visual><geometry><mesh filename="../../secret.stl"/></geometry></visual></link>
+  <link name="b"><visual><geometry><mesh filename="package://arm/../../secret.stl"/></geometry></visual></link>
+  <link name="c"><visual><geometry><mesh filename="meshes/link.stl"/></geometry></visual></link>
+  <link name="d"><visual><geometry><mesh filename="meshes/base.stl"/></geometry></visual></link>
+</robot>
+''')
+    response = client.get('/api/files/arm/evil.urdf/bundle')
+    assert response.status_code == 200
+    assert b'top secret' not in response.data
+    table = parse_bundle(response.data)
+    assert [entry['name'] for entry in table['entries'] if entry['url']] == ['arm/meshes/base.stl']
+    assert sorted(table['unresolved']) == ['../../secret.stl', 'meshes/link.stl', 'package://arm/../../secret.stl']
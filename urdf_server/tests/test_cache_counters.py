@@ -0,0 +1,33 @@
+import threading
+
+import numpy as np
+
+from application.services.collision import BVHCache
+
+
+def hammer(get, threads=8, calls=2000):
+    def worker():
+        for i in range(calls):
+            get(i)
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return threads * calls
+
+
+def test_bvh_cache_counts_every_lookup():
+    cache = BVHCache(max_entries=4)
+    triangles = np.zeros((1, 3, 3))
+    total = hammer(lambda i: cache.get(i % 8, 0, lambda: triangles))
+    assert cache.hits + cache.misses == total
+
+
+def test_mesh_metadata_counts_every_lookup(app):
+    store = app.extensions['mesh_metadata']
+    store.store('known', {'triangles': 1})
+    store.hits = store.misses = 0
+    total = hammer(lambda i: store.lookup('known' if i % 2 else f'missing-{i}'))
+    assert store.hits + store.misses == total
+    assert store.hits == total // 2
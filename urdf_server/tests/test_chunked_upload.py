@@ -0,0 +1,85 @@
+import os
+import errno
+import hashlib
+
+import pytest
+
+DATA = bytes(range(256)) * 40  # 10240 字节
+CHUNK = 4096
+
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def upload_chunks(client, data, filename='big/part.bin.txt', order=None):
+    session = client.post('/api/files/uploads', json={
+        'filename': filename, 'size': len(data), 'chunk_size': CHUNK, 'sha256': sha256(data)
+    }).get_json()
+    assert session['total_chunks'] == 3
+    for index in order or range(session['total_chunks']):
+        chunk = data[index * CHUNK:(index + 1) * CHUNK]
+        response = client.put(
+            f"/api/files/uploads/{session['session_id']}/chunks/{index}",
+            data=chunk, headers={'X-Chunk-SHA256': sha256(chunk)}
+        )
+        assert response.status_code == 200
+    return session['session_id']
+
+
+@pytest.mark.parametrize('blob_store_enabled', [True, False])
+def test_commit_out_of_order_chunks(make_app, blob_store_enabled):
+    app = make_app(BLOB_STORE_ENABLED=blob_store_enabled)
+    client = app.test_client()
+    session_id = upload_chunks(client, DATA, order=[2, 0, 1])
+
+    response = client.post(f'/api/files/uploads/{session_id}/commit')
+    assert response.status_code == 200
+    assert (app.config['UPLOAD_FOLDER'] / 'big' / 'part.bin.txt').read_bytes() == DATA
+    assert client.get(f'/api/files/uploads/{session_id}').status_code == 404
+
+
+def test_commit_reports_missing_chunks(client):
+    session_id = upload_chunks(client, DATA, order=[0, 2])
+    response = client.post(f'/api/files/uploads/{session_id}/commit')
+    assert response.status_code == 409
+    assert response.get_json()['missing'] == [1]
+
+
+def test_rejects_corrupt_chunk(client):
+    session = client.post('/api/files/uploads', json={
+        'filename': 'a.txt', 'size': len(DATA), 'chunk_size': CHUNK
+    }).get_json()
+    response = client.put(
+        f"/api/files/uploads/{session['session_id']}/chunks/0",
+        data=DATA[:CHUNK], headers={'X-Chunk-SHA256': sha256(b'other')}
+    )
+    assert response.status_code == 422
+    assert client.get(f"/api/files/uploads/{session['session_id']}").get_json()['received'] == []
+
+
+def test_rejects_oversized_session(make_app):
+    client = make_app(UPLOAD_SESSION_MAX_SIZE=1024).test_client()
+    response = client.post('/api/files/uploads', json={'filename': 'a.txt', 'size': 1025})
+    assert response.status_code == 413
+
+
+@pytest.mark.parametrize('blob_store_enabled', [True, False])
+def test_commit_across_filesystems(make_app, monkeypatch, blob_store_enabled):
+    app = make_app(BLOB_STORE_ENABLED=blob_store_enabled)
+    client = app.test_client()
+    session_id = upload_chunks(client, DATA)
+
+    # 会话目录中的文件不能直接 rename 到其他目录（模拟不同文件系统）
+    sessions = str(app.config['UPLOAD_SESSION_FOLDER'])
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if str(src).startswith(sessions) and not str(dst).startswith(sessions):
+            raise OSError(errno.EXDEV, 'Invalid cross-device link')
+        return real_replace(src, dst)
+    monkeypatch.setattr(os, 'replace', replace)
+
+    response = client.post(f'/api/files/uploads/{session_id}/commit')
+    assert response.status_code == 200
+    assert (app.config['UPLOAD_FOLDER'] / 'big' / 'part.bin.txt').read_bytes() == DATA
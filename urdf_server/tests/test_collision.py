@@ -0,0 +1,65 @@
+import numpy as np
+
+from application.services.collision import triangle_distance, triangles_intersect
+
+# base 为 1m 立方体；tool 为 0.2m 立方体，经由无几何的 slider 沿 x 轴移动，初始位于 x=2
+URDF = '''<robot name="slider">
+  <link name="base"><collision><geometry><box size="1 1 1"/></geometry></collision></link>
+  <link name="slider"/>
+  <link name="tool"><collision><geometry><box size="0.2 0.2 0.2"/></geometry></collision></link>
+  <joint name="slide" type="prismatic">
+    <parent link="base"/><child link="slider"/>
+    <origin xyz="2 0 0"/><axis xyz="1 0 0"/><limit lower="-3" upper="3" effort="1" velocity="1"/>
+  </joint>
+  <joint name="mount" type="fixed"><parent link="slider"/><child link="tool"/></joint>
+</robot>
+'''
+
+TRIANGLE = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0]], dtype=np.float64)
+
+
+def test_triangle_distance_parallel_and_crossing():
+    lifted = TRIANGLE + [0, 0, 1]
+    assert np.allclose(triangle_distance(TRIANGLE[None], lifted[None]), [1.0])
+    assert not triangles_intersect(TRIANGLE[None], lifted[None])[0]
+
+    # 竖直三角形穿过水平三角形内部
+    crossing = np.array([[[0.2, 0.2, -1], [0.2, 0.2, 1], [0.3, 0.3, 0]]])
+    assert triangles_intersect(TRIANGLE[None], crossing)[0]
+    assert np.allclose(triangle_distance(TRIANGLE[None], crossing), [0.0])
+
+
+def test_triangle_distance_matches_sampling():
+    rng = np.random.default_rng(0)
+    A = rng.normal(size=(20, 3, 3))
+    B = rng.normal(size=(20, 3, 3)) + [3, 0, 0]
+    # 在两个三角形上密集采样得到的距离只会偏大，且与精确值相差不超过采样间隔
+    w = np.stack(np.meshgrid(np.linspace(0, 1, 41), np.linspace(0, 1, 41)), -1).reshape(-1, 2)
+    w = w[w.sum(axis=1) <= 1]
+    bary = np.column_stack([1 - w.sum(axis=1), w])
+    exact = triangle_distance(A, B)
+    for k in range(len(A)):
+        pa, pb = bary @ A[k], bary @ B[k]
+        sampled = np.sqrt(((pa[:, None] - pb[None]) ** 2).sum(-1)).min()
+        assert exact[k] <= sampled + 1e-9
+        assert sampled - exact[k] < 0.3
+
+
+def test_collisions_endpoint(client, upload_folder):
+    (upload_folder / 'slider.urdf').write_text(URDF)
+    response = client.post('/api/kinematics/slider.urdf/collisions', json={
+        'configurations': [[0.0], [-1.5]], 'distance': True, 'max_distance': 2.0
+    })
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['collision'] == [False, True]
+    assert result['pairs'] == [[], [['base', 'tool']]]
+    # x=2 处两个立方体表面相距 2 - 0.5 - 0.1；x=0.5 处 tool 跨过 base 的表面
+    assert abs(result['min_distance'][0] - 1.4) < 1e-9
+    assert result['min_distance'][1] == 0
+    assert result['closest'][0] == ['base', 'tool']
+
+    ignored = client.post('/api/kinematics/slider.urdf/collisions', json={
+        'configurations': [[-1.5]], 'ignore': [['tool', 'base']]
+    }).get_json()
+    assert ignored['collision'] == [False]
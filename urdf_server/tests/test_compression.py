@@ -0,0 +1,24 @@
+from conftest import ascii_stl
+
+
+def test_first_request_is_compressed(client, upload_folder):
+    # 直接写入上传目录，不经过上传钩子，第一次请求时还没有预压缩版本
+    mesh = upload_folder / 'meshes' / 'part.stl'
+    mesh.parent.mkdir(parents=True)
+    mesh.write_text(ascii_stl())
+
+    response = client.get('/api/files/resource/meshes/part.stl', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers.get('Content-Encoding') == 'gzip'
+    assert len(response.data) < mesh.stat().st_size
+    assert 'Accept-Encoding' in response.headers.get('Vary', '')
+
+
+def test_identity_when_not_accepted(client, upload_folder):
+    mesh = upload_folder / 'part.stl'
+    mesh.write_text(ascii_stl())
+
+    response = client.get('/api/files/resource/part.stl', headers={'Accept-Encoding': 'identity'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == mesh.read_bytes()
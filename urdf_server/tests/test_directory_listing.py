@@ -0,0 +1,25 @@
+def listed_sizes(client):
+    return {item['name']: item['size'] for item in client.get('/api/files/list').get_json()['files']}
+
+
+def test_in_place_edit_shows_up_after_ttl(app, client, upload_folder):
+    listing_cache = app.extensions['directory_listing']
+    notes = upload_folder / 'notes.txt'
+    notes.write_text('short')
+    assert listed_sizes(client) == {'notes.txt': 5}
+
+    # 原地修改不改变目录 mtime，缓存有效期内仍是旧结果
+    with open(notes, 'a') as f:
+        f.write(' and longer')
+    assert listed_sizes(client) == {'notes.txt': 5}
+
+    for listing in listing_cache._entries.values():
+        listing.scanned -= listing_cache.ttl
+    assert listed_sizes(client) == {'notes.txt': 16}
+
+
+def test_new_entries_invalidate_immediately(client, upload_folder):
+    (upload_folder / 'a.txt').write_text('a')
+    assert list(listed_sizes(client)) == ['a.txt']
+    (upload_folder / 'b.txt').write_text('b')
+    assert list(listed_sizes(client)) == ['a.txt', 'b.txt']
@@ -0,0 +1,48 @@
+import threading
+
+from application.services.job_queue import JobQueue
+
+
+def test_resume_skips_jobs_leased_by_another_worker(app):
+    release = threading.Event()
+    started = []
+
+    def handler(ctx, name):
+        started.append(name)
+        release.wait(10)
+        return name
+
+    # 两个队列共用同一个任务日志，相当于两个 worker 进程
+    original = app.extensions['job_queue']
+    first, second = JobQueue(), JobQueue()
+    for queue in (first, second):
+        queue.init_app(app)
+        queue.register('block', handler)
+    try:
+        job_id = first.submit('block', name='a')
+        assert second.resume() == 0
+
+        # 租约过期（所属进程已退出）后由其他进程接手
+        with first._connect() as conn:
+            conn.execute('UPDATE jobs SET lease = 0 WHERE id = ?', (job_id,))
+        assert second.resume() == 1
+        assert second.resume() == 0
+    finally:
+        release.set()
+        for queue in (first, second):
+            queue.shutdown()
+        app.extensions['job_queue'] = original
+    assert started.count('a') == 2
+
+
+def _worker_state():
+    from application.extensions import job_queue
+    from application.services.job_queue import worker_config
+    return dict(worker_config), job_queue.app is None
+
+
+def test_cpu_workers_get_config_without_creating_the_app(app):
+    queue = app.extensions['job_queue']
+    config, no_app = queue.cpu_executor().submit(_worker_state).result(timeout=60)
+    assert config == {'UPLOAD_FOLDER': str(app.config['UPLOAD_FOLDER'])}
+    assert no_app
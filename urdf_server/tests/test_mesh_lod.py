@@ -0,0 +1,68 @@
+import os
+import time
+
+from conftest import ascii_stl
+
+
+def lod_jobs(app, path):
+    return [job for job in app.extensions['job_queue'].list()
+            if job['kind'] == 'build_lod' and job['args']['path'] == path]
+
+
+def wait_for_lod_jobs(app, path):
+    queue = app.extensions['job_queue']
+    assert queue.wait([job['job_id'] for job in lod_jobs(app, path)], timeout=60)
+
+
+def test_lod_is_built_in_the_background(app, client, upload_folder):
+    app.extensions['mesh_lod'].min_faces = 50
+    original = ascii_stl(400).encode()
+    (upload_folder / 'big.stl').write_bytes(original)
+
+    # 未生成时立即发送原文件，不能按版本号长期缓存
+    response = client.get('/api/files/resource/big.stl?lod=low', headers={'Accept-Encoding': 'identity'})
+    assert response.status_code == 200
+    assert response.data == original
+    assert not response.cache_control.immutable
+    assert len(lod_jobs(app, 'big.stl')) == 1
+
+    wait_for_lod_jobs(app, 'big.stl')
+    response = client.get('/api/files/resource/big.stl?lod=low', headers={'Accept-Encoding': 'identity'})
+    assert response.data[:15] == b'urdf_server LOD'
+    assert response.headers['ETag'].endswith('.lod-low"')
+
+
+def test_failed_lod_build_is_not_retried(app, client, upload_folder):
+    (upload_folder / 'broken.stl').write_bytes(b'\x01' * 300)
+    response = client.get('/api/files/resource/broken.stl?lod=low')
+    assert response.data == b'\x01' * 300
+    wait_for_lod_jobs(app, 'broken.stl')
+
+    for _ in range(3):
+        response = client.get('/api/files/resource/broken.stl?lod=low')
+        assert response.status_code == 200
+        assert response.data == b'\x01' * 300
+    assert len(lod_jobs(app, 'broken.stl')) == 1
+    assert list(app.extensions['mesh_lod'].folder.glob('*.failed'))
+
+
+def test_small_mesh_uses_original(app, client, upload_folder):
+    (upload_folder / 'small.stl').write_text(ascii_stl(10))
+    response = client.get('/api/files/resource/small.stl?lod=low', headers={'Accept-Encoding': 'identity'})
+    assert response.status_code == 200
+    assert response.data == (upload_folder / 'small.stl').read_bytes()
+
+
+def test_prune_removes_old_artifacts(app):
+    mesh_lod = app.extensions['mesh_lod']
+    mesh_lod.max_age = 3600
+    old = mesh_lod.folder / 'old.low.stl'
+    new = mesh_lod.folder / 'new.low.stl'
+    old.write_bytes(b'x')
+    new.write_bytes(b'x')
+    past = time.time() - 7200
+    os.utime(old, (past, past))
+
+    mesh_lod.prune()
+    assert not old.exists()
+    assert new.exists()
@@ -0,0 +1,35 @@
+import time
+
+from conftest import ascii_stl
+
+
+def wait_for_jobs(client, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        counts = client.application.extensions['job_queue'].counts()
+        if not counts['queued'] and not counts['running']:
+            return counts
+        time.sleep(0.05)
+    raise AssertionError('background jobs did not finish')
+
+
+def test_failed_analysis_is_not_resubmitted(client, upload_folder):
+    (upload_folder / 'broken.stl').write_bytes(b'\0' * 200)
+    failed = wait_for_jobs(client)['failed']
+
+    client.get('/api/files/list')
+    assert wait_for_jobs(client)['failed'] == failed + 1
+
+    for _ in range(3):
+        response = client.get('/api/files/list')
+        assert response.get_json()['files'][0]['geometry'] is None
+    assert wait_for_jobs(client)['failed'] == failed + 1
+
+
+def test_analysis_result_in_listing(client, upload_folder):
+    (upload_folder / 'part.stl').write_text(ascii_stl(3))
+
+    client.get('/api/files/list')
+    wait_for_jobs(client)
+    geometry = client.get('/api/files/list').get_json()['files'][0]['geometry']
+    assert geometry['triangles'] == 3
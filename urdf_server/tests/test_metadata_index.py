@@ -0,0 +1,21 @@
+from application import create_app
+
+
+def restart(app):
+    """用同样的配置重新创建应用，相当于重启服务"""
+    return create_app(type('RestartConfig', (), dict(app.config)))
+
+
+def test_urdf_added_outside_the_app_is_indexed_on_restart(app, upload_folder):
+    (upload_folder / 'robots').mkdir()
+    (upload_folder / 'robots' / 'arm.urdf').write_text('<robot name="outside_arm"><link name="base"/></robot>')
+    assert app.extensions['metadata_index'].search(robot='outside_arm')[1] == 0
+
+    restarted = restart(app)
+    job_queue = restarted.extensions['job_queue']
+    sync_jobs = [job.id for job in job_queue._jobs.values() if job.kind == 'sync_metadata']
+    assert job_queue.wait(sync_jobs, timeout=30)
+
+    results, total = restarted.extensions['metadata_index'].search(robot='outside_arm')
+    assert total == 1
+    assert results[0]['path'] == 'robots/arm.urdf'
@@ -0,0 +1,17 @@
+from conftest import ascii_stl
+
+
+def test_resolves_package_copied_outside_the_app(app, upload_folder):
+    package_index = app.extensions['package_index']
+    assert package_index.resolve('late_pkg/meshes/a.stl') is None
+
+    # 在应用之外复制进上传目录，没有经过上传钩子
+    mesh = upload_folder / 'vendor' / 'late_pkg' / 'meshes' / 'a.stl'
+    mesh.parent.mkdir(parents=True)
+    mesh.write_text(ascii_stl(1))
+
+    # 距离上次重新扫描不足间隔时不再扫描
+    assert package_index.resolve('late_pkg/meshes/a.stl') is None
+    package_index._last_rescan = None
+    assert package_index.resolve('late_pkg/meshes/a.stl') == mesh
+    assert package_index.roots('late_pkg') == ['vendor/late_pkg']
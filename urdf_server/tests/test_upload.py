@@ -0,0 +1,21 @@
+import io
+
+
+def test_folder_upload_keeps_structure(client, upload_folder):
+    response = client.post('/api/files/upload-folder', data={'files': [
+        (io.BytesIO(b'<robot name="r"/>'), 'robot/urdf/r.urdf'),
+        (io.BytesIO(b'notes'), 'robot/readme.txt'),
+    ]})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert sorted(item['filename'] for item in result['uploaded_files']) == ['robot/readme.txt', 'robot/urdf/r.urdf']
+    assert (upload_folder / 'robot' / 'urdf' / 'r.urdf').read_bytes() == b'<robot name="r"/>'
+
+    listing = client.get('/api/files/list?path=robot').get_json()
+    assert [item['name'] for item in listing['files']] == ['urdf', 'readme.txt']
+
+
+def test_folder_upload_rejects_escaping_paths(client, upload_folder):
+    response = client.post('/api/files/upload-folder', data={'files': [(io.BytesIO(b'x'), '../escape.txt')]})
+    assert response.status_code == 400
+    assert not (upload_folder.parent / 'escape.txt').exists()
@@ -0,0 +1,64 @@
+import json
+import struct
+
+from conftest import ascii_stl
+from application.services.urdf_validation import _check_mesh_readable
+
+
+def binary_stl(count, header=b'binary'):
+    data = header.ljust(80, b' ') + struct.pack('<I', count)
+    for i in range(count):
+        data += struct.pack('<12fH', 0, 0, 1, i, 0, 0, 0, 1, 0, 0, 0, 1, 0)
+    return data
+
+
+def test_binary_stl_with_solid_header(tmp_path):
+    mesh = tmp_path / 'part.stl'
+    mesh.write_bytes(binary_stl(3, header=b'solid exported by cad'))
+    assert _check_mesh_readable(mesh) is None
+
+    # 截断的二进制STL，头部同样以 solid 开头
+    mesh.write_bytes(binary_stl(3, header=b'solid exported by cad')[:-20])
+    assert 'declares 3 triangles' in _check_mesh_readable(mesh)
+
+
+def test_ascii_stl(tmp_path):
+    mesh = tmp_path / 'part.stl'
+    mesh.write_text(ascii_stl(200))
+    assert _check_mesh_readable(mesh) is None
+
+    mesh.write_text(ascii_stl(200)[:-200])
+    assert 'endsolid' in _check_mesh_readable(mesh)
+
+
+def test_empty_and_short_files(tmp_path):
+    mesh = tmp_path / 'part.stl'
+    mesh.write_bytes(b'')
+    assert _check_mesh_readable(mesh) == 'empty file'
+    mesh.write_bytes(b'\x00' * 40)
+    assert _check_mesh_readable(mesh) == 'truncated binary STL header'
+
+
+def test_validation_requests_share_the_job_queue_pool(app, client, upload_folder):
+    (upload_folder / 'pkg' / 'meshes').mkdir(parents=True)
+    (upload_folder / 'pkg' / 'meshes' / 'part.stl').write_text(ascii_stl(3))
+    (upload_folder / 'pkg' / 'ok.urdf').write_text(
+        '<robot name="ok"><link name="a"><visual><geometry>'
+        '<mesh filename="package://pkg/meshes/part.stl"/></geometry></visual></link></robot>'
+    )
+    (upload_folder / 'pkg' / 'bad.urdf').write_text(
+        '<robot name="bad"><link name="a"><visual><geometry>'
+        '<mesh filename="../../outside.stl"/></geometry></visual></link></robot>'
+    )
+    app.extensions['package_index'].rebuild()
+
+    executor = app.extensions['job_queue'].cpu_executor()
+    for _ in range(2):
+        response = client.get('/api/validate?path=pkg')
+        assert response.status_code == 200
+        reports = [json.loads(line) for line in response.data.splitlines()]
+        by_path = {report['path']: report for report in reports if not report.get('summary')}
+        assert by_path['pkg/ok.urdf']['valid']
+        assert by_path['pkg/bad.urdf']['errors'][0]['check'] == 'mesh'
+        assert reports[-1]['files'] == 2
+    assert app.extensions['job_queue'].cpu_executor() is executor
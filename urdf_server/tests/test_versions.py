@@ -0,0 +1,138 @@
+import random
+
+import pytest
+
+BASE = '''<?xml version="1.0"?>
+<robot name="arm">
+  <link name="base"/>
+  <link name="tool"><visual><geometry><box size="1 1 1"/></geometry></visual></link>
+  <joint name="j1" type="fixed"><parent link="base"/><child link="tool"/></joint>
+</robot>
+'''
+
+
+def save(client, content, base_version=None):
+    return client.post('/api/files/save', json={
+        'filename': 'arm.urdf', 'content': content, 'base_version': base_version
+    })
+
+
+def version_text(client, version):
+    response = client.get(f'/api/files/arm.urdf/versions/{version}')
+    assert response.status_code == 200
+    return response.get_json()['content']
+
+
+@pytest.fixture
+def saved(client):
+    response = save(client, BASE)
+    assert response.status_code == 200
+    return response.get_json()['version']
+
+
+def test_every_version_round_trips(app, client, upload_folder, saved):
+    app.extensions['urdf_versions'].snapshot_interval = 4
+    rng = random.Random(0)
+    texts = {saved: BASE}
+    head, text = saved, BASE
+    for i in range(12):
+        start = rng.randrange(len(text))
+        end = min(len(text), start + rng.randrange(5))
+        insert = f'<!-- edit {i} ü -->'
+        response = client.patch('/api/files/arm.urdf/versions', json={
+            'base_version': head, 'edits': [{'start': start, 'end': end, 'text': insert}]
+        })
+        assert response.status_code == 200, response.get_json()
+        text = text[:start] + insert + text[end:]
+        head = response.get_json()['version']
+        texts[head] = text
+
+    assert (upload_folder / 'arm.urdf').read_text(encoding='utf-8') == text
+    history = client.get('/api/files/arm.urdf/versions').get_json()
+    assert history['head'] == head
+    assert {entry['stored'] for entry in history['versions']} == {'snapshot', 'delta'}
+    for version, expected in texts.items():
+        assert version_text(client, version) == expected
+
+
+def test_element_patch(client, upload_folder, saved):
+    response = client.patch('/api/files/arm.urdf/versions', json={
+        'base_version': saved,
+        'elements': [{'tag': 'link', 'name': 'base', 'xml': '<link name="base"><inertial/></link>'}]
+    })
+    assert response.status_code == 200
+    content = (upload_folder / 'arm.urdf').read_text(encoding='utf-8')
+    assert '<link name="base"><inertial/></link>' in content
+    assert content.replace('<link name="base"><inertial/></link>', '<link name="base"/>') == BASE
+
+
+def test_stale_base_version_conflicts(client, saved):
+    assert save(client, BASE.replace('arm', 'arm2'), saved).status_code == 200
+    response = save(client, BASE.replace('arm', 'arm3'), saved)
+    assert response.status_code == 409
+    assert response.get_json()['version'] == saved + 1
+
+    response = client.patch('/api/files/arm.urdf/versions', json={
+        'base_version': saved, 'edits': [{'start': 0, 'end': 0, 'text': ' '}]
+    })
+    assert response.status_code == 409
+
+
+def test_overlapping_edits_rejected(client, saved):
+    response = client.patch('/api/files/arm.urdf/versions', json={
+        'base_version': saved,
+        'edits': [{'start': 10, 'end': 20, 'text': 'a'}, {'start': 15, 'end': 25, 'text': 'b'}]
+    })
+    assert response.status_code == 400
+    assert version_text(client, saved) == BASE
+
+
+def test_compaction_keeps_recent_versions(app, client, saved):
+    store = app.extensions['urdf_versions']
+    store.keep = 5
+    store.snapshot_interval = 3
+    head, texts = saved, {}
+    for i in range(10):
+        content = BASE.replace('arm', f'arm{i}')
+        head = save(client, content, head).get_json()['version']
+        texts[head] = content
+
+    store.compact(app.config['UPLOAD_FOLDER'] / 'arm.urdf')
+    history = client.get('/api/files/arm.urdf/versions').get_json()['versions']
+    assert [entry['version'] for entry in history] == list(range(head, head - 5, -1))
+    for version in range(head - 4, head + 1):
+        assert version_text(client, version) == texts[version]
+    assert client.get(f'/api/files/arm.urdf/versions/{head - 5}').status_code == 404
+
+
+def test_external_edit_becomes_a_new_head(client, upload_folder, saved):
+    outside = BASE.replace('<link name="base"/>', '<link name="base_moved"/>')
+    (upload_folder / 'arm.urdf').write_text(outside, encoding='utf-8')
+
+    # 读取时文件与记录的 head 不一致：文件记为新版本，原来的 head 仍可按版本号读取
+    history = client.get('/api/files/arm.urdf/versions').get_json()
+    assert history['head'] == saved + 1
+    assert version_text(client, saved) == BASE
+    assert version_text(client, saved + 1) == outside
+
+    start = outside.index('base_moved')
+    response = client.patch('/api/files/arm.urdf/versions', json={
+        'base_version': saved + 1, 'edits': [{'start': start, 'end': start + len('base_moved'), 'text': 'root'}]
+    })
+    assert response.status_code == 200
+    assert (upload_folder / 'arm.urdf').read_text(encoding='utf-8') == outside.replace('base_moved', 'root')
+
+
+def test_edit_offsets_are_code_points(client, upload_folder):
+    text = BASE.replace('<link name="base"/>', '<!-- 🤖 base -->\n  <link name="base"/>')
+    version = save(client, text).get_json()['version']
+    # 同样的替换区间，在 JavaScript 的 UTF-16 下标中 emoji 占两个单元
+    start = text.index('tool')
+    response = client.patch('/api/files/arm.urdf/versions', json={
+        'base_version': version, 'edits': [{'start': start, 'end': start + len('tool'), 'text': '🦾'}]
+    })
+    assert response.status_code == 200
+    expected = text[:start] + '🦾' + text[start + len('tool'):]
+    assert (upload_folder / 'arm.urdf').read_text(encoding='utf-8') == expected
+    assert version_text(client, response.get_json()['version']) == expected
+    assert version_text(client, version) == text
@@ -0,0 +1,6 @@
+import os
+from application import create_app
+
+# 生产部署入口：gunicorn wsgi:app（默认配置见 gunicorn.conf.py），部署说明见 README
+# 配置类可通过环境变量 URDF_SERVER_CONFIG 指定，默认为 config.ProductionConfig
+app = create_app(os.environ.get('URDF_SERVER_CONFIG', 'config.ProductionConfig'))